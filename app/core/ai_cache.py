@@ -1,7 +1,10 @@
 import json
 import time
 import hashlib
+import threading
 from pathlib import Path
+from app.core.persistence import persistence
+from app.core.metrics import cache_hit
 
 CACHE_FILE = Path(__file__).resolve().parent.parent.parent / "data" / "ai_cache.json"
 
@@ -9,6 +12,14 @@ class AICache:
     def __init__(self):
         self.cache_file = CACHE_FILE
         self.cache = self._load_cache()
+        # AI 批次并发执行时多个线程会同时写缓存
+        self._lock = threading.RLock()
+        # 是否由本进程落盘 (多 worker 时只有 leader 写文件)
+        self.persist = True
+        # 不落盘时 (follower) 写入的条目: key -> 写入时的 version，经共享状态发布给 leader 落盘
+        self.version = 0
+        self._unsynced = {}
+        persistence.register("ai_cache", self.cache_file, self._snapshot, indent=2)
 
     def _load_cache(self):
         if self.cache_file.exists():
@@ -19,11 +30,57 @@ class AICache:
                 return {}
         return {}
 
-    def _save_cache(self):
-        # Ensure directory exists
-        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.cache_file, 'w', encoding='utf-8') as f:
-            json.dump(self.cache, f, ensure_ascii=False, indent=2)
+    def _snapshot(self):
+        with self._lock:
+            return dict(self.cache)
+
+    def _save_cache(self, *keys):
+        # 由 persistence 服务在后台合并写入；follower 记下新条目，由共享状态同步发布
+        if self.persist:
+            persistence.mark_dirty("ai_cache")
+        elif keys:
+            self.version += 1
+            for key in keys:
+                self._unsynced[key] = self.version
+
+    def set_persist(self, enabled):
+        """
+        开启 / 关闭落盘。开启时 (成为 leader) 先合并磁盘上由上一任 leader 写入的条目，
+        再写出合并结果，避免用本进程较旧的副本覆盖文件
+        """
+        self.persist = enabled
+        if not enabled:
+            return
+        on_disk = self._load_cache()
+        with self._lock:
+            for key, entry in on_disk.items():
+                current = self.cache.get(key)
+                if current is None or entry.get('timestamp', 0) > current.get('timestamp', 0):
+                    self.cache[key] = entry
+            self._save_cache()
+
+    def unsynced_changes(self):
+        """本进程未发布的写入: (version, {key: 条目副本})；没有时返回 None"""
+        with self._lock:
+            if not self._unsynced:
+                return None
+            return self.version, {key: dict(self.cache[key]) for key in self._unsynced if key in self.cache}
+
+    def mark_synced(self, version):
+        with self._lock:
+            self._unsynced = {key: v for key, v in self._unsynced.items() if v > version}
+
+    def apply_shared(self, entries):
+        """应用其他 worker 发布的条目 (时间戳较新的覆盖)，leader 随后落盘"""
+        with self._lock:
+            changed = False
+            for key, entry in entries.items():
+                current = self.cache.get(key)
+                if current is None or entry.get('timestamp', 0) > current.get('timestamp', 0):
+                    self.cache[key] = entry
+                    changed = True
+            if changed:
+                self._save_cache()
 
     def get(self, key, max_age_seconds=86400):
         """
@@ -33,29 +90,48 @@ class AICache:
             entry = self.cache[key]
             timestamp = entry.get('timestamp', 0)
             if time.time() - timestamp < max_age_seconds:
+                cache_hit("ai_cache", True)
                 return entry.get('data')
+        cache_hit("ai_cache", False)
         return None
 
     def set(self, key, data):
         """
         Set cache data with current timestamp.
         """
-        self.cache[key] = {
-            'timestamp': int(time.time()),
-            'data': data
-        }
-        self._save_cache()
+        with self._lock:
+            self.cache[key] = {
+                'timestamp': int(time.time()),
+                'data': data
+            }
+            self._save_cache(key)
+
+    def set_many(self, items):
+        """
+        Set multiple entries with a single write to disk.
+        """
+        if not items:
+            return
+        now = int(time.time())
+        with self._lock:
+            for key, data in items.items():
+                self.cache[key] = {
+                    'timestamp': now,
+                    'data': data
+                }
+            self._save_cache(*items)
         
     def cleanup(self, max_age_seconds=604800):
         """
         Remove entries older than max_age_seconds (default 7 days).
         """
         now = time.time()
-        initial_count = len(self.cache)
-        self.cache = {k: v for k, v in self.cache.items() if now - v.get('timestamp', 0) < max_age_seconds}
-        if len(self.cache) < initial_count:
-            self._save_cache()
-            return initial_count - len(self.cache)
+        with self._lock:
+            initial_count = len(self.cache)
+            self.cache = {k: v for k, v in self.cache.items() if now - v.get('timestamp', 0) < max_age_seconds}
+            if len(self.cache) < initial_count:
+                self._save_cache()
+                return initial_count - len(self.cache)
         return 0
 
     def get_timestamp(self, key):
@@ -0,0 +1,304 @@
+import json
+import heapq
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from app.core.metrics import cache_hit
+
+# Paths
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+DATA_DIR = BASE_DIR / "data"
+STORE_FILE = DATA_DIR / "analysis_cache.jsonl"
+LEGACY_FILE = DATA_DIR / "analysis_cache.json"
+
+
+def compute_expiry(prompt_type, timestamp):
+    """
+    根据 promptType 计算缓存的失效时间点 (写入时计算一次)
+    - min_trading_signal: 当日有效，盘前(09:30前)写入的在开盘后失效
+    - day_trading_signal: 当日有效
+    - 其他类型: 15:00 前写入的在收盘后失效，否则当日有效
+    """
+    written = datetime.fromtimestamp(timestamp)
+    midnight = (written + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    if prompt_type == 'min_trading_signal':
+        market_open = written.replace(hour=9, minute=30, second=0, microsecond=0)
+        deadline = market_open if written < market_open else midnight
+    elif prompt_type == 'day_trading_signal':
+        deadline = midnight
+    else:
+        market_close = written.replace(hour=15, minute=0, second=0, microsecond=0)
+        deadline = market_close if written < market_close else midnight
+
+    return deadline.timestamp()
+
+
+def prompt_type_from_key(key):
+    """Cache key 格式为 {code}_{promptType}"""
+    parts = key.split('_', 1)
+    return parts[1] if len(parts) == 2 else 'default'
+
+
+class AnalysisStore:
+    """
+    AI 个股分析结果缓存 (/api/analyze_stock)
+    - 每条记录写入时预先计算 expires_at，查询只需一次比较
+    - 变更以 JSONL 追加方式在后台线程落盘，不阻塞请求
+    - 过期记录通过最小堆批量回收，回收后在后台压缩文件
+    """
+
+    def __init__(self, path=STORE_FILE, legacy_path=LEGACY_FILE):
+        self.path = Path(path)
+        self.legacy_path = Path(legacy_path)
+        self.entries = {}
+        self._expiry_heap = []
+        self._log_lines = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._writer = None
+        # 是否由本进程落盘 (多 worker 时只有 leader 写文件)
+        self.persist = True
+        # 不落盘时 (follower) 写入的记录: key -> 写入时的 version，经共享状态发布给 leader 落盘
+        self.version = 0
+        self._unsynced = {}
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _read_records(self):
+        """读取磁盘记录，返回 (key -> record, 行数, 是否从旧版迁移)"""
+        entries = {}
+        lines = 0
+        migrated = False
+
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            # 进程崩溃可能留下半行，跳过即可
+                            continue
+                        lines += 1
+                        entries[record['key']] = record
+            except Exception as e:
+                print(f"Error loading analysis store: {e}")
+        elif self.legacy_path.exists():
+            try:
+                with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                    legacy = json.load(f)
+                for key, value in legacy.items():
+                    ts = value.get('timestamp', 0)
+                    entries[key] = {
+                        "key": key,
+                        "content": value.get('content'),
+                        "timestamp": ts,
+                        "expires_at": compute_expiry(prompt_type_from_key(key), ts)
+                    }
+                migrated = True
+            except Exception as e:
+                print(f"Error migrating legacy analysis cache: {e}")
+        return entries, lines, migrated
+
+    def load(self):
+        """从磁盘加载缓存 (首次运行时迁移旧版 analysis_cache.json)"""
+        entries, lines, migrated = self._read_records()
+        now = time.time()
+        with self._lock:
+            self.entries = {}
+            self._expiry_heap = []
+            for key, record in entries.items():
+                if record.get('expires_at', 0) <= now:
+                    continue
+                self.entries[key] = {
+                    "content": record.get('content'),
+                    "timestamp": record.get('timestamp', 0),
+                    "expires_at": record['expires_at']
+                }
+                self._expiry_heap.append((record['expires_at'], key))
+            heapq.heapify(self._expiry_heap)
+            self._log_lines = lines
+
+        # 迁移或存在大量过期/覆盖行时，重写一次文件
+        if migrated or lines > len(self.entries):
+            self._enqueue(('compact', None))
+
+    def set_persist(self, enabled):
+        """
+        开启 / 关闭落盘。开启时 (成为 leader) 先合并磁盘上由上一任 leader 写入的记录，
+        再压缩重写文件，本进程内存中的结果也随之落盘
+        """
+        self.persist = enabled
+        if not enabled:
+            return
+        records, _, _ = self._read_records()
+        now = time.time()
+        with self._lock:
+            for key, record in records.items():
+                if record.get('expires_at', 0) <= now:
+                    continue
+                current = self.entries.get(key)
+                if current is not None and current['timestamp'] >= record.get('timestamp', 0):
+                    continue
+                self.entries[key] = {
+                    "content": record.get('content'),
+                    "timestamp": record.get('timestamp', 0),
+                    "expires_at": record['expires_at']
+                }
+                heapq.heappush(self._expiry_heap, (record['expires_at'], key))
+        self._enqueue(('compact', None))
+
+    def get(self, key, now=None):
+        """返回未过期的缓存记录 {content, timestamp, expires_at}，否则 None"""
+        entry = self.entries.get(key)
+        if entry is None or entry['expires_at'] <= (now if now is not None else time.time()):
+            cache_hit("analysis_store", False)
+            return None
+        cache_hit("analysis_store", True)
+        return entry
+
+    def set(self, key, content, prompt_type=None, timestamp=None):
+        """写入一条分析结果，仅追加该条记录到磁盘"""
+        ts = timestamp if timestamp is not None else time.time()
+        if prompt_type is None:
+            prompt_type = prompt_type_from_key(key)
+        entry = {
+            "content": content,
+            "timestamp": ts,
+            "expires_at": compute_expiry(prompt_type, ts)
+        }
+        with self._lock:
+            self.entries[key] = entry
+            heapq.heappush(self._expiry_heap, (entry['expires_at'], key))
+            if not self.persist:
+                self.version += 1
+                self._unsynced[key] = self.version
+        self._enqueue(('append', dict(entry, key=key)))
+        return entry
+
+    def unsynced_changes(self):
+        """本进程未发布的写入: (version, {key: 记录副本})；没有时返回 None"""
+        with self._lock:
+            if not self._unsynced:
+                return None
+            return self.version, {key: dict(self.entries[key]) for key in self._unsynced if key in self.entries}
+
+    def mark_synced(self, version):
+        with self._lock:
+            self._unsynced = {key: v for key, v in self._unsynced.items() if v > version}
+
+    def apply_shared(self, records, now=None):
+        """应用其他 worker 发布的记录 (时间戳较新的覆盖，已过期的忽略)，leader 随后追加落盘"""
+        now = now if now is not None else time.time()
+        applied = []
+        with self._lock:
+            for key, record in records.items():
+                if record.get('expires_at', 0) <= now:
+                    continue
+                current = self.entries.get(key)
+                if current is not None and current['timestamp'] >= record.get('timestamp', 0):
+                    continue
+                entry = {
+                    "content": record.get('content'),
+                    "timestamp": record.get('timestamp', 0),
+                    "expires_at": record['expires_at']
+                }
+                self.entries[key] = entry
+                heapq.heappush(self._expiry_heap, (entry['expires_at'], key))
+                applied.append(dict(entry, key=key))
+        for record in applied:
+            self._enqueue(('append', record))
+        return len(applied)
+
+    def purge_expired(self, now=None):
+        """批量回收已过期的记录，返回回收数量"""
+        now = now if now is not None else time.time()
+        removed = 0
+        with self._lock:
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                expires_at, key = heapq.heappop(self._expiry_heap)
+                entry = self.entries.get(key)
+                # 堆中可能残留被覆盖写入前的旧记录
+                if entry is not None and entry['expires_at'] == expires_at:
+                    del self.entries[key]
+                    removed += 1
+        if removed:
+            self._enqueue(('compact', None))
+        return removed
+
+    def flush(self, timeout=None):
+        """等待后台写入完成 (用于退出前或测试)"""
+        if self._writer is None:
+            return
+        deadline = time.time() + timeout if timeout else None
+        while self._queue.unfinished_tasks:
+            if deadline and time.time() > deadline:
+                break
+            time.sleep(0.01)
+
+    def _enqueue(self, op):
+        if not self.persist:
+            return
+        self._queue.put(op)
+        if self._writer is None or not self._writer.is_alive():
+            with self._lock:
+                if self._writer is None or not self._writer.is_alive():
+                    self._writer = threading.Thread(target=self._writer_loop, name="analysis-store-writer", daemon=True)
+                    self._writer.start()
+
+    def _writer_loop(self):
+        while True:
+            ops = [self._queue.get()]
+            # 合并突发写入，一次打开文件
+            while True:
+                try:
+                    ops.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._apply(ops)
+            except Exception as e:
+                print(f"Error persisting analysis store: {e}")
+            finally:
+                for _ in ops:
+                    self._queue.task_done()
+
+    def _apply(self, ops):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 若批次内包含压缩操作，直接重写快照即可覆盖所有追加
+        need_compact = any(kind == 'compact' for kind, _ in ops)
+        if not need_compact and self._log_lines > 2 * len(self.entries) + 100:
+            need_compact = True
+
+        if need_compact:
+            with self._lock:
+                snapshot = [dict(entry, key=key) for key, entry in self.entries.items()]
+            tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for record in snapshot:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._log_lines = len(snapshot)
+            return
+
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for kind, record in ops:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                self._log_lines += 1
+
+
+analysis_store = AnalysisStore()
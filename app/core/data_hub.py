@@ -0,0 +1,163 @@
+import json
+import os
+import time
+from app.core.ws_manager import ConnectionManager
+
+# 可订阅的数据主题
+TOPICS = ("stocks", "limit_up", "broken", "indices", "sentiment")
+# 列表类主题的行主键，按行做增量；不在此表中的主题总是推送全量
+TOPIC_KEYS = {"stocks": "code", "limit_up": "code", "broken": "code", "indices": "name"}
+# 每隔多少次更新推送一次全量快照，供客户端自我校正
+FULL_SNAPSHOT_EVERY = int(os.getenv("WS_FULL_SNAPSHOT_EVERY", "20"))
+
+
+def diff_rows(old_rows, new_rows, key):
+    """
+    计算两份行列表的增量: insert (新增或字段被删除的整行) / update (只含变化字段) /
+    remove (删除的主键) / order (仅当顺序与客户端按规则推导出的不同)
+    行缺少主键或主键重复时无法增量，返回 None
+    """
+    new_keys = [row.get(key) if isinstance(row, dict) else None for row in new_rows]
+    if None in new_keys or len(set(new_keys)) != len(new_keys):
+        return None
+    old_by_key = {row.get(key): row for row in old_rows if isinstance(row, dict)}
+    if None in old_by_key or len(old_by_key) != len(old_rows):
+        return None
+    new_key_set = set(new_keys)
+
+    insert, update = [], {}
+    for row in new_rows:
+        old = old_by_key.get(row[key])
+        if old is None or any(field not in row for field in old):
+            insert.append(row)
+            continue
+        changed = {field: value for field, value in row.items() if field not in old or old[field] != value}
+        if changed:
+            update[str(row[key])] = changed
+    remove = [k for k in old_by_key if k not in new_key_set]
+
+    delta = {"key": key}
+    if insert:
+        delta["insert"] = insert
+    if update:
+        delta["update"] = update
+    if remove:
+        delta["remove"] = remove
+    # 客户端的默认顺序: 旧顺序去掉删除项，新行追加在末尾
+    removed = set(remove)
+    implied = [k for k in old_by_key if k not in removed] + [row[key] for row in insert if row[key] not in old_by_key]
+    if implied != new_keys:
+        delta["order"] = new_keys
+    return delta
+
+
+class DataHub:
+    """
+    行情数据推送 (/ws/data)
+    - 客户端通过 {"action": "subscribe", "topics": [...]} 订阅主题
+    - 生产者调用 publish(topic, data)，内容变化时才推送给订阅了该主题的连接
+    - 每个主题保留最新一份数据，新订阅 / 请求重同步时收到全量快照
+    - 列表类主题平时只推送变化的行与字段 (type=delta)，每 FULL_SNAPSHOT_EVERY 次推送一次全量
+    - 每个主题的 seq 逐次递增，客户端发现不连续时发送 resync
+    """
+
+    def __init__(self):
+        # 慢连接直接断开: 客户端重连后会重新订阅并拿到全量快照
+        self.connections = ConnectionManager("data", overflow="disconnect")
+        self.clients = {}  # websocket -> set(topics)
+        self.latest = {}  # topic -> {"seq", "state", "payload", "full", "updated_at"}
+        self.stats = {"published": 0, "unchanged": 0, "messages": 0, "bytes": 0,
+                      "full_bytes": 0, "deltas": 0, "fulls": 0, "resyncs": 0}
+
+    def has_subscribers(self, topic):
+        return any(topic in topics for ws, topics in self.clients.items() if ws in self.connections.clients)
+
+    async def connect(self, websocket):
+        await self.connections.connect(websocket)
+        self.clients[websocket] = set()
+
+    def disconnect(self, websocket):
+        self.clients.pop(websocket, None)
+        self.connections.disconnect(websocket)
+
+    async def handle(self, websocket, raw):
+        """处理客户端发来的订阅指令"""
+        try:
+            msg = json.loads(raw)
+        except ValueError:
+            return
+        topics = [t for t in msg.get("topics", []) if t in TOPICS]
+        subscribed = self.clients.get(websocket)
+        if subscribed is None:
+            return
+        action = msg.get("action")
+        if action in ("subscribe", "resync"):
+            if action == "subscribe":
+                subscribed.update(topics)
+            else:
+                self.stats["resyncs"] += 1
+            for topic in topics:
+                entry = self.latest.get(topic)
+                if entry is not None and topic in subscribed:
+                    self._send(websocket, entry["full"], entry["full_size"], entry["full_size"])
+        elif action == "unsubscribe":
+            subscribed.difference_update(topics)
+
+    async def publish(self, topic, data):
+        """发布主题最新数据；与上次内容相同则不推送，否则推送增量或全量"""
+        payload = json.dumps(data, ensure_ascii=False)
+        entry = self.latest.get(topic)
+        if entry is not None and entry["payload"] == payload:
+            self.stats["unchanged"] += 1
+            return 0
+
+        # 保存独立副本: 生产者之后原地修改列表也不影响下次比较
+        state = json.loads(payload)
+        seq = entry["seq"] + 1 if entry else 1
+        full = f'{{"type": "data", "topic": "{topic}", "seq": {seq}, "data": {payload}}}'
+
+        message = full
+        key = TOPIC_KEYS.get(topic)
+        if entry is not None and key and seq % FULL_SNAPSHOT_EVERY != 0 \
+                and isinstance(entry["state"], list) and isinstance(state, list):
+            delta = diff_rows(entry["state"], state, key)
+            if delta is not None:
+                delta_message = json.dumps({"type": "delta", "topic": topic, "seq": seq, **delta}, ensure_ascii=False)
+                if len(delta_message) < len(full):
+                    message = delta_message
+
+        full_size = len(full.encode('utf-8'))
+        size = full_size if message is full else len(message.encode('utf-8'))
+        self.latest[topic] = {"seq": seq, "state": state, "payload": payload, "full": full,
+                              "full_size": full_size, "updated_at": time.time()}
+        self.stats["published"] += 1
+        self.stats["deltas" if message is not full else "fulls"] += 1
+
+        # 已被连接管理器移除 (发送失败 / 被踢出) 的连接顺带清理订阅
+        for ws in [ws for ws in self.clients if ws not in self.connections.clients]:
+            self.clients.pop(ws, None)
+        targets = [ws for ws, topics in self.clients.items() if topic in topics]
+        for ws in targets:
+            self._send(ws, message, size, full_size)
+        return len(targets)
+
+    def _send(self, websocket, message, size, full_size):
+        """只入队，由连接各自的写协程发送；size / full_size 用于统计增量节省的流量"""
+        if self.connections.send(websocket, message):
+            self.stats["messages"] += 1
+            self.stats["bytes"] += size
+            self.stats["full_bytes"] += full_size
+
+    def snapshot(self):
+        return {
+            "clients": len(self.clients),
+            "subscribers": {topic: sum(1 for t in self.clients.values() if topic in t) for topic in TOPICS},
+            "topics": {topic: {"seq": entry["seq"], "updated_at": int(entry["updated_at"])}
+                       for topic, entry in self.latest.items()},
+            "saved_ratio": round(1 - self.stats["bytes"] / self.stats["full_bytes"], 3) if self.stats["full_bytes"] else 0,
+            **self.stats,
+            "connections": self.connections.metrics()
+        }
+
+
+data_hub = DataHub()
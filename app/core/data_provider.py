@@ -3,7 +3,9 @@ import requests
 import pandas as pd
 import time
 import json
+import threading
 from datetime import datetime
+from app.core.metrics import timed, upstream, cache_hit
 
 class DataProvider:
     def __init__(self, logger=None):
@@ -11,6 +13,7 @@ class DataProvider:
         self._last_market_df = None
         self._last_market_ts = 0
         self._last_failure_ts = 0
+        self._market_lock = threading.Lock()
         self._base_info_df = None
         self._base_info_ts = 0
 
@@ -83,6 +86,7 @@ class DataProvider:
             
         return []
 
+    @timed("fetch_quotes_sina")
     def _fetch_quotes_sina(self, codes):
         # Prepare base info map for CircMV calculation
         base_map = {}
@@ -107,7 +111,8 @@ class DataProvider:
                 # Use session with trust_env=False to bypass system proxy
                 with requests.Session() as session:
                     session.trust_env = False
-                    resp = session.get(url, headers=headers, timeout=5)
+                    with upstream(url):
+                        resp = session.get(url, headers=headers, timeout=5)
                 
                 resp.encoding = 'gbk'
                 
@@ -184,15 +189,24 @@ class DataProvider:
                 
         return stocks
 
+    @timed("fetch_all_market_data")
     def fetch_all_market_data(self):
         """
         Fetch ALL stocks for market overview and scanning.
         Returns DataFrame.
         """
+        # 市场概况与盘中扫描会并发调用: 只让一个线程真正拉取，其余等待后复用缓存
+        # (同时保护下面临时修改代理环境变量的逻辑)
+        with self._market_lock:
+            return self._fetch_all_market_data()
+
+    def _fetch_all_market_data(self):
         now_ts = time.time()
         
         # Throttle to reduce provider pressure: reuse cache within 5 minutes
-        if self._last_market_df is not None and now_ts - self._last_market_ts < 300:
+        fresh = self._last_market_df is not None and now_ts - self._last_market_ts < 300
+        cache_hit("market_data", fresh)
+        if fresh:
             return self._last_market_df.copy()
 
         # Cooldown on failure: if failed recently (within 60s), return None or stale cache
@@ -293,6 +307,7 @@ class DataProvider:
             self.log(f"[!] Broken Limit Pool failed: {e}")
             return None
 
+    @timed("fetch_indices")
     def fetch_indices(self):
         """Fetch major indices"""
         try:
@@ -301,7 +316,8 @@ class DataProvider:
             
             with requests.Session() as session:
                 session.trust_env = False
-                resp = session.get(url, headers=headers, timeout=5)
+                with upstream(url):
+                    resp = session.get(url, headers=headers, timeout=5)
             
             indices = []
             indices_map = {"sh000001": "上证指数", "sz399001": "深证成指", "sz399006": "创业板指"}
@@ -350,7 +366,8 @@ class DataProvider:
             headers = {
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
             }
-            resp = requests.get(url, headers=headers, timeout=5)
+            with upstream(url):
+                resp = requests.get(url, headers=headers, timeout=5)
             data = resp.json()
             if isinstance(data, list) and len(data) > 0:
                 return data
@@ -375,7 +392,8 @@ class DataProvider:
         }
         
         try:
-            resp = requests.get(url, params=params, timeout=3)
+            with upstream(url):
+                resp = requests.get(url, params=params, timeout=3)
             resp.encoding = 'utf-8'
             data = resp.json()
             
@@ -417,7 +435,8 @@ class DataProvider:
             secid = f"{market}.{raw_code}"
                 
             em_url = f"http://push2.eastmoney.com/api/qt/stock/get?secid={secid}&fields=f14,f127,f116"
-            resp = requests.get(em_url, timeout=3)
+            with upstream(em_url):
+                resp = requests.get(em_url, timeout=3)
             em_data = resp.json()
             if em_data and em_data.get('data'):
                 name = em_data['data'].get('f14', name)
@@ -542,7 +561,8 @@ class DataProvider:
                 url = "http://hq.sinajs.cn/list=" + ",".join(batch)
                 
                 try:
-                    resp = session.get(url, headers=headers, timeout=5)
+                    with upstream(url):
+                        resp = session.get(url, headers=headers, timeout=5)
                     resp.encoding = 'gbk'
                     
                     for line in resp.text.split('\n'):
@@ -651,7 +671,8 @@ class DataProvider:
                         "fields": "f12,f14,f2,f3,f4,f5,f6,f7,f8,f9,f10,f15,f16,f17,f18,f20,f21,f23,f24,f25,f22,f11,f62,f128,f136,f115,f152"
                     }
                     
-                    resp = session.get(url, params=params, headers=headers, timeout=5)
+                    with upstream(url):
+                        resp = session.get(url, params=params, headers=headers, timeout=5)
                     data = resp.json()
                     
                     if not data or 'data' not in data or 'diff' not in data['data']:
@@ -675,7 +696,8 @@ class DataProvider:
                     # Retry once
                     time.sleep(1)
                     try:
-                        resp = session.get(url, params=params, headers=headers, timeout=5)
+                        with upstream(url):
+                            resp = session.get(url, params=params, headers=headers, timeout=5)
                         data = resp.json()
                         if data and 'data' in data and 'diff' in data['data']:
                             rows = data['data']['diff']
@@ -723,7 +745,8 @@ class DataProvider:
 
         with requests.Session() as session:
             session.trust_env = False
-            resp = session.get(url, params=params, headers=headers, timeout=10)
+            with upstream(url):
+                resp = session.get(url, params=params, headers=headers, timeout=10)
         resp.encoding = 'utf-8'
 
         # The API returns JSON text; if blocked, text may start with '<'
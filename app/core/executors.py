@@ -0,0 +1,182 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+
+
+class ExecutorSaturated(RuntimeError):
+    """线程池排队已满 (上游明显卡住时快速失败，而不是无限堆积)"""
+
+
+class BoundedExecutor:
+    """
+    按负载类型隔离的线程池
+    - 固定线程数 + 排队上限，超出上限的提交直接抛 ExecutorSaturated
+    - 记录排队深度、活跃线程数、排队等待时间与执行耗时
+    - run() 供协程使用 (与 asyncio.to_thread 一样传递 contextvars)，submit() 供线程使用
+    """
+
+    def __init__(self, name, max_workers, max_queue):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"exec-{name}")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0,
+                      "wait_total": 0.0, "wait_max": 0.0, "run_total": 0.0, "run_max": 0.0}
+
+    def submit(self, func, *args, **kwargs):
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.stats["rejected"] += 1
+                raise ExecutorSaturated(f"{self.name} executor saturated ({self.queued} queued)")
+            self.queued += 1
+            self.stats["submitted"] += 1
+        future = self._pool.submit(self._call, time.perf_counter(), func, args, kwargs)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future):
+        # 排队中被取消的任务不会进入 _call，在这里归还排队名额
+        if future.cancelled():
+            with self._lock:
+                self.queued -= 1
+
+    async def run(self, func, *args, **kwargs):
+        ctx = contextvars.copy_context()
+        call = functools.partial(ctx.run, func, *args, **kwargs)
+        return await asyncio.wrap_future(self.submit(call))
+
+    def _call(self, submitted_at, func, args, kwargs):
+        started = time.perf_counter()
+        wait = started - submitted_at
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self.stats["wait_total"] += wait
+            self.stats["wait_max"] = max(self.stats["wait_max"], wait)
+        failed = False
+        try:
+            return func(*args, **kwargs)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.active -= 1
+                self.stats["failed" if failed else "completed"] += 1
+                self.stats["run_total"] += elapsed
+                self.stats["run_max"] = max(self.stats["run_max"], elapsed)
+
+    def shutdown(self, wait=False):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def metrics(self):
+        with self._lock:
+            done = self.stats["completed"] + self.stats["failed"]
+            started = done + self.active
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "queue_depth": self.queued,
+                "submitted": self.stats["submitted"],
+                "completed": self.stats["completed"],
+                "failed": self.stats["failed"],
+                "rejected": self.stats["rejected"],
+                "avg_wait_ms": round(self.stats["wait_total"] / started * 1000, 2) if started else 0.0,
+                "max_wait_ms": round(self.stats["wait_max"] * 1000, 2),
+                "avg_run_ms": round(self.stats["run_total"] / done * 1000, 2) if done else 0.0,
+                "max_run_ms": round(self.stats["run_max"] * 1000, 2)
+            }
+
+
+class TaskBatch:
+    """
+    在共享线程池上提交一组任务 (如一次复盘的 AI 批次 / 指标补全)，同时运行的不超过 limit 个，
+    其余在本地等待、前一个结束后再提交，避免单次任务占满共享线程池的排队名额
+    cancel() 丢弃尚未开始的任务 (任务被取消或出错时调用)
+    """
+
+    def __init__(self, executor, limit):
+        self.executor = executor
+        self.limit = max(1, limit)
+        self._pending = deque()
+        self._running = set()
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        proxy = Future()
+        with self._lock:
+            self._pending.append((proxy, func, args, kwargs))
+        self._fill()
+        return proxy
+
+    def _fill(self):
+        while True:
+            with self._lock:
+                if len(self._running) >= self.limit or not self._pending:
+                    return
+                proxy, func, args, kwargs = self._pending.popleft()
+                if not proxy.set_running_or_notify_cancel():
+                    continue
+                self._running.add(proxy)
+            try:
+                inner = self.executor.submit(func, *args, **kwargs)
+            except ExecutorSaturated as e:
+                self._finish(proxy)
+                proxy.set_exception(e)
+                continue
+            inner.add_done_callback(lambda inner, proxy=proxy: self._relay(inner, proxy))
+
+    def _relay(self, inner, proxy):
+        self._finish(proxy)
+        if inner.cancelled():
+            proxy.set_exception(CancelledError())
+        elif inner.exception() is not None:
+            proxy.set_exception(inner.exception())
+        else:
+            proxy.set_result(inner.result())
+        self._fill()
+
+    def _finish(self, proxy):
+        with self._lock:
+            self._running.discard(proxy)
+
+    def cancel(self):
+        with self._lock:
+            pending, self._pending = self._pending, deque()
+        for proxy, _, _, _ in pending:
+            proxy.cancel()
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, str(default)))
+
+
+# 行情 / 新闻等上游接口 (秒级，数量多)
+market_io = BoundedExecutor("market_io", _env_int("EXEC_MARKET_IO_WORKERS", 16), _env_int("EXEC_MARKET_IO_QUEUE", 256))
+# DeepSeek 调用 (可达数十秒，单独隔离，避免拖住行情刷新)
+llm = BoundedExecutor("llm", _env_int("EXEC_LLM_WORKERS", 8), _env_int("EXEC_LLM_QUEUE", 64))
+# 本地文件读写 / 缓存加载
+disk = BoundedExecutor("disk", _env_int("EXEC_DISK_WORKERS", 4), _env_int("EXEC_DISK_QUEUE", 128))
+# 纯计算 (搜索 / 指标)
+cpu = BoundedExecutor("cpu", _env_int("EXEC_CPU_WORKERS", os.cpu_count() or 2), _env_int("EXEC_CPU_QUEUE", 128))
+
+EXECUTORS = {e.name: e for e in (market_io, llm, disk, cpu)}
+
+
+def executor_metrics():
+    return {name: executor.metrics() for name, executor in EXECUTORS.items()}
+
+
+def shutdown_executors():
+    for executor in EXECUTORS.values():
+        executor.shutdown()
@@ -0,0 +1,56 @@
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from app.core import executors
+
+
+def fan_out(sources, logger=None, executor=None):
+    """
+    并发执行互不依赖的数据源，每个源独立超时，容忍部分失败
+    sources: {name: (func, timeout_seconds, default)}，func 为无参函数
+    返回 (results, report)
+        results: {name: 结果}，超时或异常的源取 default
+        report: {name: {"status": "ok" | "timeout" | "error", "elapsed": 秒}}
+    总耗时约等于最慢的一个源 (或其超时)，而不是所有源之和
+    各源在共享的 executor (默认 market_io) 中执行；超时的源尚未开始则取消，
+    已在运行的无法强行中止，会在后台线程中自然结束，结果被丢弃
+    """
+    if not sources:
+        return {}, {}
+
+    executor = executor or executors.market_io
+    started = time.time()
+    futures = {}
+    for key, (func, _, _) in sources.items():
+        try:
+            futures[key] = executor.submit(func)
+        except executors.ExecutorSaturated as e:
+            # 线程池排队已满: 该源按失败处理
+            futures[key] = Future()
+            futures[key].set_exception(e)
+    finished = {}
+    for key, future in futures.items():
+        future.add_done_callback(lambda _, key=key: finished.setdefault(key, time.time() - started))
+
+    results = {}
+    report = {}
+    # 所有源同时开始，按各自的绝对截止时间等待
+    for key, (_, timeout, default) in sorted(sources.items(), key=lambda kv: kv[1][1]):
+        remaining = max(0.0, started + timeout - time.time())
+        try:
+            results[key] = futures[key].result(timeout=remaining)
+            report[key] = {"status": "ok", "elapsed": round(finished.get(key, time.time() - started), 3)}
+        except FutureTimeoutError:
+            futures[key].cancel()
+            results[key] = default
+            report[key] = {"status": "timeout", "elapsed": round(time.time() - started, 3)}
+            msg = f"[!] {key} 超时 ({timeout}s)，使用部分结果继续"
+            print(msg)
+            if logger: logger(msg)
+        except Exception as e:
+            results[key] = default
+            report[key] = {"status": "error", "elapsed": round(finished.get(key, time.time() - started), 3)}
+            msg = f"[!] {key} 获取失败: {e}"
+            print(msg)
+            if logger: logger(msg)
+
+    return results, report
@@ -0,0 +1,152 @@
+import asyncio
+import json
+from app.core.executors import llm
+
+
+class _SharedStream:
+    """一次流式生成的共享缓冲区，后加入的订阅者先回放已产出的片段"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.chunks = []
+        self.done = False
+        self.error = None  # 生成失败时的异常，订阅者读完已产出的片段后抛出
+        self._changed = loop.create_future()
+
+    def _notify(self):
+        if not self._changed.done():
+            self._changed.set_result(None)
+        self._changed = self.loop.create_future()
+
+    def push(self, chunk):
+        self.chunks.append(chunk)
+        self._notify()
+
+    def close(self):
+        self.done = True
+        self._notify()
+
+    def drain(self, producer):
+        """在工作线程中运行同步生成器，把片段交回事件循环"""
+        for chunk in producer():
+            self.loop.call_soon_threadsafe(self.push, chunk)
+
+    async def subscribe(self):
+        index = 0
+        while True:
+            while index < len(self.chunks):
+                yield self.chunks[index]
+                index += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await asyncio.shield(self._changed)
+
+    async def result(self):
+        """等待生成结束，返回完整文本 (供非流式调用方复用同一次生成)"""
+        return "".join([chunk async for chunk in self.subscribe()])
+
+
+class InflightCoalescer:
+    """
+    相同 key 的并发请求合并 (single-flight)
+    第一个调用者真正执行，其余调用者等待同一个结果，避免重复消耗 AI 调用
+    同一 namespace / key 下流式与非流式调用互相复用: 非流式调用方等待进行中的流式生成结束
+    取完整文本，流式调用方等待进行中的非流式结果后一次性下发
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._streams = {}
+        self.stats = {}
+
+    def _stats(self, namespace):
+        stats = self.stats.setdefault(namespace, {"calls": 0, "executed": 0, "coalesced": 0})
+        stats["calls"] += 1
+        return stats
+
+    async def run(self, namespace, key, factory):
+        """
+        namespace: 统计分组 (如 analyze_stock)
+        key: 缓存 key，相同 key 的并发调用共享一次执行
+        factory: 无参协程函数，返回实际执行的 awaitable
+        """
+        stats = self._stats(namespace)
+
+        full_key = (namespace, key)
+        shared = self._streams.get(full_key)
+        if shared is not None:
+            stats["coalesced"] += 1
+            return await shared.result()
+        task = self._pending.get(full_key)
+        if task is not None:
+            stats["coalesced"] += 1
+        else:
+            stats["executed"] += 1
+            task = asyncio.ensure_future(factory())
+            self._pending[full_key] = task
+
+            def _release(done_task):
+                if self._pending.get(full_key) is done_task:
+                    del self._pending[full_key]
+
+            task.add_done_callback(_release)
+
+        # shield: 某个调用方断开不会取消其他调用方共享的任务
+        return await asyncio.shield(task)
+
+    def stream(self, namespace, key, producer):
+        """
+        流式版本: producer 为同步生成器函数，只在线程中运行一次，
+        并发订阅者共享同一份输出。返回异步迭代器
+        即使所有订阅者断开，生成也会继续直到完成 (保证结果能写入缓存)
+        生成失败时，订阅者在收到已产出的片段后得到该异常
+        """
+        stats = self._stats(namespace)
+
+        full_key = (namespace, key)
+        shared = self._streams.get(full_key)
+        if shared is not None:
+            stats["coalesced"] += 1
+            return shared.subscribe()
+        task = self._pending.get(full_key)
+        if task is not None:
+            stats["coalesced"] += 1
+            return self._replay(task)
+
+        stats["executed"] += 1
+        shared = _SharedStream(asyncio.get_running_loop())
+        self._streams[full_key] = shared
+
+        async def _run():
+            try:
+                await llm.run(shared.drain, producer)
+            except Exception as e:
+                print(f"Shared stream {full_key} failed: {e}")
+                shared.error = e
+            finally:
+                if self._streams.get(full_key) is shared:
+                    del self._streams[full_key]
+                shared.close()
+
+        shared.task = asyncio.ensure_future(_run())
+        return shared.subscribe()
+
+    @staticmethod
+    async def _replay(task):
+        result = await asyncio.shield(task)
+        if result is None:
+            return
+        # 结构化结果 (如 trading_signal 的 dict) 以 JSON 文本下发
+        yield result if isinstance(result, str) else json.dumps(result, ensure_ascii=False)
+
+    def snapshot(self):
+        return {
+            "in_flight": len(self._pending) + len(self._streams),
+            "namespaces": {ns: dict(v) for ns, v in self.stats.items()},
+            "duplicate_calls_avoided": sum(v["coalesced"] for v in self.stats.values())
+        }
+
+
+ai_inflight = InflightCoalescer()
@@ -0,0 +1,214 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from app.core.log_pipeline import log_pipeline
+
+# 进度日志的最小间隔 (秒)，避免刷屏
+PROGRESS_LOG_INTERVAL = 3.0
+
+_local = threading.local()
+
+
+class JobCancelled(BaseException):
+    """
+    任务被取消 (在检查点抛出)
+    与 asyncio.CancelledError 一样继承 BaseException，不会被任务内部宽泛的 except Exception 吞掉
+    """
+
+
+class JobContext:
+    """运行中任务的上下文: 取消标记与进度"""
+
+    def __init__(self, name, label=None):
+        self.name = name
+        self.label = label or name
+        self.started_at = time.time()
+        self.cancel_event = threading.Event()
+        self.done = 0
+        self.total = 0
+        self.message = ""
+        self._last_log = 0
+
+    def check(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled(f"{self.label} 已取消")
+
+    def eta(self):
+        if not self.total or not self.done:
+            return None
+        elapsed = time.time() - self.started_at
+        return max(0.0, elapsed / self.done * (self.total - self.done))
+
+    def progress(self, done, total, message=""):
+        self.done, self.total, self.message = done, total, message
+        now = time.time()
+        if done < total and now - self._last_log < PROGRESS_LOG_INTERVAL:
+            return
+        self._last_log = now
+        eta = self.eta()
+        eta_str = f"，预计剩余 {eta:.0f}s" if eta is not None and done < total else ""
+        percent = done * 100 // total if total else 0
+        log_pipeline.emit(f"[{self.label}] 进度 {done}/{total} ({percent}%){eta_str}{' - ' + message if message else ''}")
+
+    def snapshot(self):
+        eta = self.eta()
+        return {
+            "label": self.label,
+            "elapsed": round(time.time() - self.started_at, 1),
+            "done": self.done,
+            "total": self.total,
+            "message": self.message,
+            "eta": round(eta, 1) if eta is not None else None,
+            "cancelling": self.cancel_event.is_set()
+        }
+
+
+def current_job():
+    """当前线程正在执行的任务上下文 (不在任务中时为 None)"""
+    return getattr(_local, "job", None)
+
+
+def checkpoint():
+    """取消检查点: 任务已被取消时抛出 JobCancelled"""
+    job = current_job()
+    if job is not None:
+        job.check()
+
+
+def report_progress(done, total, message=""):
+    job = current_job()
+    if job is not None:
+        job.progress(done, total, message)
+
+
+class _Run:
+    def __init__(self, func, args, kwargs, label):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.label = label
+        self.future = Future()
+        self.context = None
+
+
+class _JobState:
+    def __init__(self):
+        self.current = None
+        self.pending = deque()
+        self.stats = {"started": 0, "completed": 0, "failed": 0, "cancelled": 0, "coalesced": 0, "queued": 0}
+
+
+class ExclusiveJobRunner:
+    """
+    互斥任务执行器 (复盘分析 / 龙虎榜同步)
+    - 每种任务一把命名锁，同一时间只运行一个实例
+    - 重复请求按策略处理: coalesce 合并到正在运行的那次 (共享结果)，queue 排队在其结束后运行
+      (排队中的相同参数请求只保留一个)
+    - 任务在线程中运行，通过 checkpoint() / report_progress() 支持中途取消与进度 / ETA 日志
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, name, func, *args, policy="coalesce", label=None, **kwargs):
+        """返回 (status, future)，status 为 started / coalesced / queued"""
+        with self._lock:
+            state = self._jobs.setdefault(name, _JobState())
+            if state.current is not None:
+                if policy == "queue":
+                    for run in state.pending:
+                        if run.args == args and run.kwargs == kwargs:
+                            state.stats["coalesced"] += 1
+                            return "queued", run.future
+                    run = _Run(func, args, kwargs, label or name)
+                    state.pending.append(run)
+                    state.stats["queued"] += 1
+                    log_pipeline.emit(f"[{run.label}] 已有任务运行中，已排队 (第 {len(state.pending)} 位)")
+                    return "queued", run.future
+                state.stats["coalesced"] += 1
+                log_pipeline.emit(f"[{state.current.label}] 任务运行中，本次请求合并到当前任务")
+                return "coalesced", state.current.future
+            run = _Run(func, args, kwargs, label or name)
+            # 在锁内建立上下文: 提交后立即到达的 cancel() 也能看到并取消该任务
+            run.context = JobContext(name, run.label)
+            state.current = run
+            state.stats["started"] += 1
+        self._start(name, run)
+        return "started", run.future
+
+    def run(self, name, func, *args, policy="coalesce", label=None, **kwargs):
+        """阻塞版本 (调用方已在工作线程中)，返回任务结果"""
+        _, future = self.submit(name, func, *args, policy=policy, label=label, **kwargs)
+        return future.result()
+
+    def is_running(self, name):
+        state = self._jobs.get(name)
+        return state is not None and state.current is not None
+
+    def cancel(self, name):
+        """取消正在运行的任务及其排队请求；返回是否有任务被取消"""
+        with self._lock:
+            state = self._jobs.get(name)
+            if state is None:
+                return False
+            cancelled = False
+            while state.pending:
+                run = state.pending.popleft()
+                run.future.cancel()
+                state.stats["cancelled"] += 1
+                cancelled = True
+            if state.current is not None:
+                state.current.context.cancel_event.set()
+                cancelled = True
+        if cancelled:
+            log_pipeline.emit(f"[{name}] 已请求取消，将在下一个检查点停止")
+        return cancelled
+
+    def _start(self, name, run):
+        thread = threading.Thread(target=self._execute, args=(name, run), name=f"job-{name}", daemon=True)
+        thread.start()
+
+    def _execute(self, name, run):
+        _local.job = run.context
+        state = self._jobs[name]
+        outcome = "completed"
+        try:
+            # 线程启动前已被取消则不再执行
+            run.context.check()
+            result = run.func(*run.args, **run.kwargs)
+            run.future.set_result(result)
+        except JobCancelled as e:
+            outcome = "cancelled"
+            log_pipeline.emit(f"[{run.label}] {e}")
+            run.future.set_result(None)
+        except Exception as e:
+            outcome = "failed"
+            run.future.set_exception(e)
+        finally:
+            _local.job = None
+
+        with self._lock:
+            state.stats[outcome] += 1
+            state.current = state.pending.popleft() if state.pending else None
+            next_run = state.current
+            if next_run is not None:
+                next_run.context = JobContext(name, next_run.label)
+                state.stats["started"] += 1
+        if next_run is not None:
+            self._start(name, next_run)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: {
+                    "running": state.current.context.snapshot() if state.current and state.current.context else None,
+                    "pending": len(state.pending),
+                    **state.stats
+                }
+                for name, state in self._jobs.items()
+            }
+
+
+job_runner = ExclusiveJobRunner()
@@ -0,0 +1,225 @@
+import asyncio
+import heapq
+import inspect
+import random
+import time
+from datetime import datetime, timedelta
+
+
+class IntervalTrigger:
+    """固定间隔 (上一次运行结束后开始计时，与原先的 sleep 循环一致)"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def next_time(self, now):
+        return now + self.seconds
+
+    def describe(self):
+        return f"every {self.seconds:g}s"
+
+
+class CronTrigger:
+    """每天固定时刻，可限定星期 (0=周一)"""
+
+    def __init__(self, hour, minute=0, second=0, weekdays=None):
+        self.hour = hour
+        self.minute = minute
+        self.second = second
+        self.weekdays = set(weekdays) if weekdays is not None else None
+
+    def next_time(self, now):
+        candidate = datetime.fromtimestamp(now).replace(hour=self.hour, minute=self.minute, second=self.second, microsecond=0)
+        if candidate.timestamp() <= now:
+            candidate += timedelta(days=1)
+        while self.weekdays is not None and candidate.weekday() not in self.weekdays:
+            candidate += timedelta(days=1)
+        return candidate.timestamp()
+
+    def describe(self):
+        return f"daily {self.hour:02d}:{self.minute:02d}:{self.second:02d}"
+
+
+class DynamicTrigger:
+    """由函数计算下一次运行时间 (如随配置与时段变化的复盘周期)"""
+
+    def __init__(self, func, description="dynamic"):
+        self.func = func
+        self.description = description
+
+    def next_time(self, now):
+        return self.func(now)
+
+    def describe(self):
+        return self.description
+
+
+class Job:
+    def __init__(self, name, func, trigger, condition=None, jitter=0, error_backoff=None, executor=None):
+        self.name = name
+        self.func = func
+        self.executor = executor
+        self.trigger = trigger
+        self.condition = condition
+        self.jitter = jitter
+        self.error_backoff = error_backoff
+        self.token = 0  # 重新调度后旧的堆条目作废
+        self.running = False
+        self.next_run = None
+        self.last_run = None
+        self.last_duration = 0.0
+        self.total_duration = 0.0
+        self.runs = 0
+        self.errors = 0
+        self.skipped = 0
+        self.overlaps = 0
+        self.last_error = None
+
+    def snapshot(self):
+        return {
+            "trigger": self.trigger.describe(),
+            "running": self.running,
+            "next_run": datetime.fromtimestamp(self.next_run).strftime("%Y-%m-%d %H:%M:%S") if self.next_run else None,
+            "last_run": datetime.fromtimestamp(self.last_run).strftime("%Y-%m-%d %H:%M:%S") if self.last_run else None,
+            "last_duration": round(self.last_duration, 3),
+            "avg_duration": round(self.total_duration / self.runs, 3) if self.runs else 0.0,
+            "runs": self.runs,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "overlaps": self.overlaps,
+            "last_error": self.last_error
+        }
+
+
+class JobScheduler:
+    """
+    后台任务调度器 (最小堆)
+    - 所有周期任务注册为 Job: 间隔 / 每日定时 / 动态触发，可附加运行条件 (如交易时段) 与随机抖动
+    - 调度协程只睡到最近一个任务的到期时间，没有空转轮询
+    - 同一个任务运行期间不会再次触发；下一次运行时间在本次结束后计算
+    - 同步函数在线程池中执行 (可指定按负载隔离的 executor)，协程函数直接在事件循环中执行
+    """
+
+    def __init__(self):
+        self.jobs = {}
+        self._heap = []
+        self._seq = 0
+        self._wakeup = None
+        self._task = None
+
+    def add_job(self, name, func, trigger, condition=None, jitter=0, error_backoff=None, run_immediately=False,
+                executor=None):
+        job = Job(name, func, trigger, condition, jitter, error_backoff, executor)
+        self.jobs[name] = job
+        self._schedule(job, time.time() if run_immediately else None)
+        return job
+
+    def start(self):
+        """在事件循环内调用 (startup)"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        """停止调度并清空任务 (失去 leader 身份时)；正在运行的任务结束后不再排期"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._heap.clear()
+        self.jobs.clear()
+
+    def reschedule(self, name, at=None):
+        """按当前配置重新计算下一次运行时间 (运行中的任务结束后自然会重新计算)"""
+        job = self.jobs.get(name)
+        if job is None or job.running:
+            return
+        self._schedule(job, at)
+
+    def run_now(self, name):
+        """立即运行 (忽略运行条件)；任务正在运行时不重复启动，返回 False"""
+        job = self.jobs.get(name)
+        if job is None:
+            return False
+        if job.running:
+            job.overlaps += 1
+            return False
+        job.token += 1
+        self._launch(job)
+        return True
+
+    def _schedule(self, job, at=None):
+        now = time.time()
+        if at is None:
+            at = job.trigger.next_time(now)
+            if job.jitter:
+                at += random.uniform(0, job.jitter)
+        job.token += 1
+        job.next_run = at
+        self._seq += 1
+        heapq.heappush(self._heap, (at, self._seq, job.name, job.token))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, _, name, token = heapq.heappop(self._heap)
+                job = self.jobs.get(name)
+                if job is None or token != job.token or job.running:
+                    continue
+                if job.condition is not None and not job.condition():
+                    job.skipped += 1
+                    self._schedule(job)
+                    continue
+                self._launch(job)
+
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _launch(self, job):
+        job.running = True
+        job.next_run = None
+        asyncio.create_task(self._execute(job))
+
+    async def _execute(self, job):
+        start = time.time()
+        job.last_run = start
+        failed = False
+        try:
+            if inspect.iscoroutinefunction(job.func):
+                await job.func()
+            elif job.executor is not None:
+                await job.executor.run(job.func)
+            else:
+                await asyncio.to_thread(job.func)
+            job.last_error = None
+        except Exception as e:
+            failed = True
+            job.errors += 1
+            job.last_error = str(e)
+            print(f"[Scheduler] Job {job.name} failed: {e}")
+        finally:
+            duration = time.time() - start
+            job.runs += 1
+            job.last_duration = duration
+            job.total_duration += duration
+            job.running = False
+
+        if self.jobs.get(job.name) is not job:
+            # 调度器已停止 / 任务已被替换
+            return
+        if failed and job.error_backoff:
+            self._schedule(job, time.time() + job.error_backoff)
+        else:
+            self._schedule(job)
+
+    def snapshot(self):
+        return {name: job.snapshot() for name, job in self.jobs.items()}
+
+
+scheduler = JobScheduler()
@@ -0,0 +1,112 @@
+import json
+from collections import deque
+from pathlib import Path
+
+# Paths
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+KEYWORDS_FILE = BASE_DIR / "data" / "news_keywords.json"
+
+# 默认关键词 (可在 data/news_keywords.json 中覆盖/扩充，格式同下)
+DEFAULT_KEYWORDS = {
+    # 主题 -> 关键词，命中任一关键词即视为相关并返回该主题
+    "themes": {
+        "大盘": ["A股", "股市", "证券", "沪指", "深成指", "创业板"],
+        "涨跌停": ["涨停", "跌停"],
+        "监管政策": ["证监会", "央行"],
+        "板块题材": ["板块", "概念", "龙头"],
+        "资金": ["资金"],
+    },
+    # 排除分组 -> 关键词，命中即视为无关
+    "exclude": {
+        "境外市场": ["美股", "恒指", "港股", "外汇"],
+    }
+}
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick 多模式匹配
+    所有主题关键词与排除词编译进同一个自动机，一次扫描文本即可找出全部命中，
+    单条新闻的匹配代价只与文本长度有关，与关键词数量无关
+    """
+
+    def __init__(self, themes=None, exclude=None):
+        self.themes = themes or {}
+        self.exclude = exclude or {}
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]  # 节点 -> [(kind, group, keyword)]
+        for kind, groups in (("theme", self.themes), ("exclude", self.exclude)):
+            for group, keywords in groups.items():
+                for keyword in keywords:
+                    if keyword:
+                        self._add(keyword, (kind, group, keyword))
+        self._build()
+
+    def _add(self, keyword, payload):
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = nxt
+        self._output[node].append(payload)
+
+    def _build(self):
+        # BFS 构建失败指针，并把后缀节点的输出合并进来
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                if self._fail[child] == child:
+                    self._fail[child] = 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def iter_matches(self, text):
+        """逐个产出命中 (end, kind, group, keyword)，end 为关键词末字符之后的下标"""
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for i, ch in enumerate(text or ''):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for kind, group, keyword in output[node]:
+                yield i + 1, kind, group, keyword
+
+    def match(self, text):
+        """
+        返回 {"themes": [...], "excluded": [...], "keywords": [...]}
+        themes / excluded 为命中的分组名 (按首次命中顺序)，keywords 为命中的关键词
+        """
+        themes, excluded, keywords = [], [], []
+        for _, kind, group, keyword in self.iter_matches(text):
+            target = themes if kind == "theme" else excluded
+            if group not in target:
+                target.append(group)
+            if keyword not in keywords:
+                keywords.append(keyword)
+        return {"themes": themes, "excluded": excluded, "keywords": keywords}
+
+
+def load_keyword_matcher(path=KEYWORDS_FILE):
+    """读取关键词配置 (不存在则使用默认值) 并编译自动机"""
+    config = DEFAULT_KEYWORDS
+    if Path(path).exists():
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except Exception as e:
+            print(f"Error loading news keywords, using defaults: {e}")
+    return KeywordMatcher(config.get("themes", {}), config.get("exclude", {}))
+
+
+news_keyword_matcher = load_keyword_matcher()
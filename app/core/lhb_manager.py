@@ -6,6 +6,9 @@ import time
 import random
 from datetime import datetime, timedelta
 from pathlib import Path
+from app.core.persistence import write_json_atomic
+from app.core.job_runner import checkpoint, report_progress, JobCancelled
+from app.core.metrics import timed
 
 # Paths
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -24,9 +27,10 @@ class LHBManager:
             "enabled": False,
             "days": 2,
             "min_amount": 10000000, # 1000万
-            "last_update": None
+            "last_update": None,
+            # 同步被取消时只抓了一部分的日期，下次同步重新抓取
+            "incomplete_dates": []
         }
-        self.is_syncing = False
         self.hot_money_map = {}
         self.load_config()
         self.load_hot_money_map()
@@ -53,8 +57,7 @@ class LHBManager:
 
     def save_config(self):
         config_path = DATA_DIR / "lhb_config.json"
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, indent=2)
+        write_json_atomic(config_path, self.config, indent=2)
 
     def update_settings(self, enabled, days, min_amount):
         print(f"[LHB] Updating settings: enabled={enabled}, days={days}, min_amount={min_amount}")
@@ -69,15 +72,45 @@ class LHBManager:
             # In a real app, we might want to do this asynchronously
             pass
 
+    def _save_records(self, existing_df, new_records, date_iso, logger=None):
+        """合并新抓取的席位记录并写入 CSV，返回合并后的 DataFrame"""
+        new_df = pd.DataFrame(new_records)
+        if not existing_df.empty:
+            existing_df['trade_date'] = existing_df['trade_date'].astype(str)
+            combined_df = pd.concat([existing_df, new_df])
+            combined_df = combined_df.drop_duplicates(subset=['trade_date', 'stock_code', 'buyer_seat_name'])
+        else:
+            combined_df = new_df
+
+        # Sort
+        combined_df = combined_df.sort_values('trade_date', ascending=False)
+
+        # Save to disk
+        combined_df.to_csv(LHB_FILE, index=False)
+        if logger: logger(f"[LHB] 已保存 {date_iso} 数据 (累计 {len(combined_df)} 条)")
+        return combined_df
+
+    def _mark_incomplete(self, date_iso, incomplete):
+        dates = set(self.config.get('incomplete_dates', []))
+        if incomplete == (date_iso in dates):
+            return
+        if incomplete:
+            dates.add(date_iso)
+        else:
+            dates.discard(date_iso)
+        self.config['incomplete_dates'] = sorted(dates)
+        self.save_config()
+
+    @timed("lhb_sync")
     def fetch_and_update_data(self, logger=None):
+        """
+        同步龙虎榜数据 (由 job_runner 以 lhb_sync 互斥执行，不会并发运行)
+        取消时保存当前日期已抓到的记录，并把该日期记为未完成，下次同步重新抓取
+        """
         def log(msg):
             if logger: logger(msg)
             print(msg)
 
-        if self.is_syncing:
-            log("[LHB] 同步任务正在进行中，请勿重复操作。")
-            return
-
         # Always reload config before sync to ensure we have latest settings (e.g. from other workers)
         self.load_config()
 
@@ -85,7 +118,8 @@ class LHBManager:
             log("[LHB] 龙虎榜功能未开启，跳过更新。")
             return
 
-        self.is_syncing = True
+        new_records = []
+        date_iso = None
         try:
             days = self.config['days']
             min_amount = self.config['min_amount']
@@ -118,9 +152,11 @@ class LHBManager:
             new_records = []
             
             # 3. Iterate dates and fetch LHB
-            for date_obj in trade_dates:
+            for date_index, date_obj in enumerate(trade_dates):
+                checkpoint()
                 date_str = date_obj.strftime('%Y%m%d')
                 date_iso = date_obj.strftime('%Y-%m-%d')
+                report_progress(date_index, len(trade_dates), date_iso)
                 
                 # Check if it is today and before 15:30 (LHB usually starts after 16:00)
                 now = datetime.now()
@@ -144,7 +180,7 @@ class LHBManager:
                          else:
                              existing_dates.add(str(d))
                     
-                    if date_iso in existing_dates:
+                    if date_iso in existing_dates and date_iso not in self.config.get('incomplete_dates', []):
                         # If it's today, we might want to re-fetch to get latest data
                         if date_iso != now.strftime('%Y-%m-%d'):
                             continue
@@ -163,6 +199,7 @@ class LHBManager:
                     log(f"  - 发现 {len(potential_stocks)} 只符合金额条件的个股")
                     
                     for _, row in potential_stocks.iterrows():
+                        checkpoint()
                         stock_code = str(row['代码'])
                         stock_name = row['名称']
                         
@@ -253,25 +290,8 @@ class LHBManager:
                     # Save incrementally after each date
                     if new_records:
                         try:
-                            # Convert new records to DF
-                            new_df = pd.DataFrame(new_records)
-                            
-                            if not existing_df.empty:
-                                existing_df['trade_date'] = existing_df['trade_date'].astype(str)
-                                combined_df = pd.concat([existing_df, new_df])
-                                combined_df = combined_df.drop_duplicates(subset=['trade_date', 'stock_code', 'buyer_seat_name'])
-                            else:
-                                combined_df = new_df
-                            
-                            # Sort
-                            combined_df = combined_df.sort_values('trade_date', ascending=False)
-                            
-                            # Save to disk
-                            combined_df.to_csv(LHB_FILE, index=False)
-                            if logger: logger(f"[LHB] 已保存 {date_iso} 数据 (累计 {len(combined_df)} 条)")
-                            
                             # Update in-memory existing_df for next iteration
-                            existing_df = combined_df
+                            existing_df = self._save_records(existing_df, new_records, date_iso, logger)
                             # Clear new_records to avoid re-adding them
                             new_records = []
                             
@@ -280,10 +300,15 @@ class LHBManager:
                             
                         except Exception as save_err:
                             if logger: logger(f"[LHB] Error saving data for {date_iso}: {save_err}")
+                    if not new_records:
+                        # 该日期已完整抓取并保存
+                        self._mark_incomplete(date_iso, False)
 
                 except Exception as e:
                     if logger: logger(f"[LHB] Error fetching {date_str}: {e}")
 
+            report_progress(len(trade_dates), len(trade_dates), "龙虎榜抓取完成")
+
             # 4. Final Cleanup and K-line Download
             if not existing_df.empty:
                 # Cleanup > 180 days
@@ -299,8 +324,15 @@ class LHBManager:
                 
             else:
                 if logger: logger("[LHB] 无数据。")
-        finally:
-            self.is_syncing = False
+        except JobCancelled:
+            # 保存取消前已抓到的席位，该日期下次同步时补全
+            if new_records:
+                try:
+                    self._save_records(existing_df, new_records, date_iso, logger)
+                    self._mark_incomplete(date_iso, True)
+                except Exception as save_err:
+                    log(f"[LHB] Error saving partial data for {date_iso}: {save_err}")
+            raise
 
     def update_vip_seats(self, df):
         # Count appearances
@@ -308,8 +340,7 @@ class LHBManager:
         # Filter seats appearing > 3 times (configurable?)
         vip_seats = seat_counts[seat_counts >= 3].index.tolist()
         
-        with open(SEATS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(vip_seats, f, ensure_ascii=False, indent=2)
+        write_json_atomic(SEATS_FILE, vip_seats, indent=2)
 
     def download_kline_data(self, df, logger=None):
         """
@@ -330,6 +361,7 @@ class LHBManager:
             file_path = KLINE_DIR / file_name
             
             if file_path.exists(): continue
+            checkpoint()
             
             try:
                 # akshare: stock_zh_a_minute
@@ -0,0 +1,83 @@
+import os
+import re
+import threading
+import time
+from collections import deque
+
+# DeepSeek 未公布固定限额，默认值偏宽松，可通过环境变量调整
+LLM_RPM_LIMIT = int(os.getenv("DEEPSEEK_RPM", "60"))
+LLM_TPM_LIMIT = int(os.getenv("DEEPSEEK_TPM", "300000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("DEEPSEEK_CONCURRENCY", "4"))
+
+_CJK_RE = re.compile(r'[一-鿿　-〿＀-￯]')
+
+
+def estimate_tokens(text):
+    """
+    粗略估算 token 数 (DeepSeek 分词: 中文约 0.6 token/字, 英文约 0.3 token/字符)
+    """
+    if not text:
+        return 0
+    text = str(text)
+    cjk = len(_CJK_RE.findall(text))
+    return int(cjk * 0.6 + (len(text) - cjk) * 0.3) + 1
+
+
+class RateLimiter:
+    """
+    滑动窗口限流器: 同时约束每分钟请求数 (RPM) 与每分钟 token 数 (TPM)
+    线程安全，供所有 LLM 调用共享
+    """
+
+    def __init__(self, rpm=LLM_RPM_LIMIT, tpm=LLM_TPM_LIMIT, window=60.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self._events = deque() # (timestamp, tokens)
+        self._tokens_in_window = 0
+        self._cond = threading.Condition()
+        self.total_requests = 0
+        self.total_tokens = 0
+        self.total_wait = 0.0
+
+    def _prune(self, now):
+        while self._events and now - self._events[0][0] >= self.window:
+            _, tokens = self._events.popleft()
+            self._tokens_in_window -= tokens
+
+    def acquire(self, tokens=0):
+        """阻塞直到额度可用，返回等待秒数"""
+        started = time.time()
+        with self._cond:
+            while True:
+                now = time.time()
+                self._prune(now)
+                under_rpm = len(self._events) < self.rpm
+                # 单个超大请求在窗口为空时放行，避免永久阻塞
+                under_tpm = self._tokens_in_window + tokens <= self.tpm or not self._events
+                if under_rpm and under_tpm:
+                    self._events.append((now, tokens))
+                    self._tokens_in_window += tokens
+                    waited = now - started
+                    self.total_requests += 1
+                    self.total_tokens += tokens
+                    self.total_wait += waited
+                    return waited
+                wait = self._events[0][0] + self.window - now
+                self._cond.wait(max(wait, 0.01))
+
+    def stats(self):
+        with self._cond:
+            self._prune(time.time())
+            return {
+                "rpm_limit": self.rpm,
+                "tpm_limit": self.tpm,
+                "requests_in_window": len(self._events),
+                "tokens_in_window": self._tokens_in_window,
+                "total_requests": self.total_requests,
+                "total_tokens": self.total_tokens,
+                "total_wait_seconds": round(self.total_wait, 2)
+            }
+
+
+llm_limiter = RateLimiter()
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# 内存中保留的最近日志条数 (供新连接的客户端回放)
+LOG_BACKLOG_SIZE = int(os.getenv("LOG_BACKLOG_SIZE", "500"))
+# 待广播队列上限，超出时丢弃最旧的日志
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "1000"))
+# 单帧最多合并的日志条数
+LOG_BATCH_MAX = 100
+
+
+class LogPipeline:
+    """
+    线程 -> 事件循环的日志通道
+    - emit() 可在任意线程调用，通过 call_soon_threadsafe 把日志交给事件循环内的 asyncio.Queue
+    - 广播协程阻塞等待队列，空闲时不唤醒；同一时刻积压的日志合并成一帧发送
+    - 保留最近 LOG_BACKLOG_SIZE 条，供刚连上的客户端拉取
+    """
+
+    def __init__(self, backlog_size=LOG_BACKLOG_SIZE, queue_size=LOG_QUEUE_SIZE):
+        self.backlog = deque(maxlen=backlog_size)
+        self.queue_size = queue_size
+        self._loop = None
+        self._queue = None
+        self._pending = []  # 事件循环启动前产生的日志
+        self._lock = threading.Lock()
+        self.stats = {"emitted": 0, "frames": 0, "dropped": 0}
+
+    def bind(self, loop):
+        """在事件循环内调用 (startup)"""
+        with self._lock:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            pending, self._pending = self._pending, []
+        for msg in pending:
+            self._enqueue(msg)
+
+    def emit(self, msg):
+        """线程安全，可在任意线程 / 事件循环内调用"""
+        msg = str(msg)
+        with self._lock:
+            self.backlog.append((time.time(), msg))
+            self.stats["emitted"] += 1
+            loop = self._loop
+            if loop is None:
+                self._pending.append(msg)
+                return
+        try:
+            loop.call_soon_threadsafe(self._enqueue, msg)
+        except RuntimeError:
+            # 事件循环已关闭 (进程退出中)
+            pass
+
+    def _enqueue(self, msg):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.stats["dropped"] += 1
+        self._queue.put_nowait(msg)
+
+    async def run(self, broadcast):
+        """广播协程: broadcast(frame) 负责发送一帧"""
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < LOG_BATCH_MAX:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            # 单条保持纯文本 (兼容旧客户端)，多条合并为一帧
+            frame = batch[0] if len(batch) == 1 else json.dumps({"type": "logs", "lines": batch}, ensure_ascii=False)
+            self.stats["frames"] += 1
+            try:
+                await broadcast(frame)
+            except Exception as e:
+                print(f"Log broadcast error: {e}")
+
+    def since(self, seq):
+        """seq 之后 emit 的日志 (最多 backlog 条)，返回 (当前 seq, [msg, ...])"""
+        with self._lock:
+            current = self.stats["emitted"]
+            count = min(current - seq, len(self.backlog))
+            lines = [msg for _, msg in list(self.backlog)[-count:]] if count > 0 else []
+        return current, lines
+
+    def recent(self, limit=100):
+        with self._lock:
+            items = list(self.backlog)[-limit:] if limit else list(self.backlog)
+        return [{"time": time.strftime("%H:%M:%S", time.localtime(ts)), "msg": msg} for ts, msg in items]
+
+    def snapshot(self):
+        return {
+            "backlog": len(self.backlog),
+            "queued": self._queue.qsize() if self._queue is not None else len(self._pending),
+            **self.stats
+        }
+
+
+log_pipeline = LogPipeline()
@@ -2,6 +2,7 @@ import pandas as pd
 from datetime import datetime
 from app.core.data_provider import data_provider
 from app.core.seat_matcher import matcher
+from app.core.metrics import timed
 
 # 临时过滤北证股票 (8开头, 4开头, 92开头)
 FILTER_BSE = False
@@ -16,6 +17,7 @@ def is_20cm_stock(code):
     code = str(code)
     return code.startswith('30') or code.startswith('68')
 
+@timed("scan_intraday_limit_up")
 def scan_intraday_limit_up(logger=None):
     """
     扫描盘中即将涨停的股票
@@ -172,6 +174,7 @@ def scan_intraday_limit_up(logger=None):
         
     return intraday_stocks, sealed_stocks
 
+@timed("scan_limit_up_pool")
 def scan_limit_up_pool(logger=None):
     """
     扫描已涨停的股票
@@ -247,6 +250,7 @@ def scan_limit_up_pool(logger=None):
         if logger: logger(f"[!] 涨停池接口失败: {e}")
         return []
 
+@timed("scan_broken_limit_pool")
 def scan_broken_limit_pool(logger=None):
     """
     扫描炸板股票
@@ -308,6 +312,7 @@ def scan_broken_limit_pool_fallback(logger=None):
 def scan_limit_up_pool_fallback(logger=None):
     return scan_limit_up_pool(logger)
 
+@timed("get_market_overview")
 def get_market_overview(logger=None):
     """
     获取大盘情绪数据: 指数、成交量、涨跌家数、涨停炸板数
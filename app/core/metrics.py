@@ -0,0 +1,236 @@
+import bisect
+import functools
+import threading
+import time
+from urllib.parse import urlparse
+
+# 默认延迟分桶 (秒): 覆盖毫秒级缓存命中到分钟级的 LLM 调用
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # 每个桶只记本桶计数，输出时再累加
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _render_sample(self, key, value):
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            le = f'le="{_format_value(float(bound))}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    进程内指标注册表 (Prometheus 文本格式)
+    - counter / gauge / histogram 在热路径上只做一次加锁累加
+    - collector 在抓取时调用，把已有的统计 (线程池 / WebSocket / 快照) 转成 gauge，平时没有开销
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def register_collector(self, func):
+        """func() 返回 [(name, type, help, [(labels_dict, value), ...]), ...]"""
+        self._collectors.append(func)
+        return func
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                print(f"[Metrics] Collector {getattr(collector, '__name__', collector)} failed: {e}")
+                continue
+            for name, metric_type, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    names = tuple(labels)
+                    lines.append(f"{name}{_format_labels(names, [labels[n] for n in names])} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+FUNCTION_SECONDS = registry.histogram("app_function_duration_seconds", "Duration of instrumented functions", ("function",))
+FUNCTION_ERRORS = registry.counter("app_function_errors_total", "Exceptions raised by instrumented functions", ("function",))
+UPSTREAM_SECONDS = registry.histogram("app_upstream_request_duration_seconds", "Upstream HTTP request latency", ("host", "outcome"))
+CACHE_REQUESTS = registry.counter("app_cache_requests_total", "Cache lookups by result", ("cache", "result"))
+
+
+class timed:
+    """
+    记录耗时到 app_function_duration_seconds{function=name}，异常计入 app_function_errors_total
+    可作为装饰器 (@timed("name")) 或上下文管理器 (with timed("name"): ...)
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._start = None
+
+    def __call__(self, func):
+        name = self.name
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                FUNCTION_ERRORS.inc(function=name)
+                raise
+            finally:
+                FUNCTION_SECONDS.observe(time.perf_counter() - start, function=name)
+        return wrapper
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and issubclass(exc_type, Exception):
+            FUNCTION_ERRORS.inc(function=self.name)
+        FUNCTION_SECONDS.observe(time.perf_counter() - self._start, function=self.name)
+        return False
+
+
+class upstream:
+    """
+    上游 HTTP 请求计时 (按 host 与结果 ok / error 分组)
+    with upstream(url): resp = session.get(url, ...)
+    """
+
+    def __init__(self, url):
+        self.host = urlparse(url).hostname or "unknown"
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        outcome = "ok" if exc_type is None else "error"
+        UPSTREAM_SECONDS.observe(time.perf_counter() - self._start, host=self.host, outcome=outcome)
+        return False
+
+
+def cache_hit(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
@@ -4,11 +4,25 @@ import time
 from datetime import datetime
 import os
 import re
+import math
 from pathlib import Path
+from concurrent.futures import Future
 from app.core.stock_utils import calculate_metrics
 from app.core.market_scanner import scan_intraday_limit_up, get_market_overview, scan_limit_up_pool, scan_broken_limit_pool
 from app.core.ai_cache import ai_cache
+from app.core.news_item_cache import lookup_news_cache, store_news_item_results
 from app.core.lhb_manager import lhb_manager
+from app.core.llm_limiter import llm_limiter, estimate_tokens, LLM_MAX_CONCURRENCY
+from app.core.news_dedup import dedupe_news
+from app.core.stage_timer import StageTimer
+from app.core.fanout import fan_out
+from app.core import executors
+from app.core.news_tailer import news_tailer
+from app.core.news_store import news_store
+from app.core.keyword_matcher import news_keyword_matcher
+from app.core.stock_entities import stock_index
+from app.core.job_runner import checkpoint, report_progress, JobCancelled
+from app.core.metrics import timed, upstream
 
 # Paths
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -23,25 +37,48 @@ HEADERS = {
 
 # Deepseek Configuration
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY", "") # 请在环境变量中设置 DEEPSEEK_API_KEY
-DEEPSEEK_API_URL = "https://api.deepseek.com/chat/completions"
+DEEPSEEK_API_URL = os.getenv("DEEPSEEK_API_URL", "https://api.deepseek.com/chat/completions") # 可指向本地 OpenAI 兼容服务 (如 scripts/mock_llm_server.py)
+
+# 指标补全 (calculate_metrics 每只股票拉取 300 根日线) 的并发数
+METRICS_CONCURRENCY = int(os.getenv("METRICS_CONCURRENCY", "8"))
+METRIC_FIELDS = ("seal_rate", "broken_rate", "next_day_premium", "limit_up_days")
+
+# 前置数据源各自的超时 (秒)，超时的源以空结果继续，不阻塞 AI 分析
+SOURCE_TIMEOUTS = {
+    "market_section": int(os.getenv("MARKET_SOURCE_TIMEOUT", "45")),
+    "market_data": int(os.getenv("MARKET_DATA_TIMEOUT", "60")),
+    "news": int(os.getenv("NEWS_SOURCE_TIMEOUT", "120")),
+    "intraday_scan": int(os.getenv("INTRADAY_SCAN_TIMEOUT", "120")),
+}
+
+def _post_chat_completion(headers, payload, timeout=60, stream=False):
+    """
+    所有 DeepSeek 请求统一经过共享的 RPM/TPM 限流器
+    """
+    prompt_text = "".join(str(m.get('content', '')) for m in payload.get('messages', []))
+    llm_limiter.acquire(estimate_tokens(prompt_text))
+    # 流式请求只计到响应头返回 (首包延迟)
+    with upstream(DEEPSEEK_API_URL):
+        return requests.post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=timeout, stream=stream)
 
 def get_market_data(logger=None):
     """
-    获取今日市场核心数据：涨停池、炸板池
+    获取今日市场核心数据：涨停池、炸板池、市场情绪
+    三个数据源互不依赖，并发获取；任一失败或超时只缺对应段落
     """
     if logger: logger("[*] 正在获取今日市场核心数据 (涨停/炸板)...")
-    
-    market_summary = ""
-    
+
     # 1. 涨停池 (使用 market_scanner 的统一接口)
-    try:
-        pool = scan_limit_up_pool(logger)
-        if pool:
-            market_summary += f"【今日涨停池】共 {len(pool)} 家。\n"
+    def limit_up_section():
+        try:
+            pool = scan_limit_up_pool(logger)
+            if not pool:
+                return ""
+            section = f"【今日涨停池】共 {len(pool)} 家。\n"
             # 由于原生接口不返回连板数，这里只列出部分代表
             # 简单列出前 10 个
             top_stocks = pool[:10]
-            market_summary += f"涨停代表: " + ", ".join([f"{s['name']}" for s in top_stocks]) + "\n"
+            section += f"涨停代表: " + ", ".join([f"{s['name']}" for s in top_stocks]) + "\n"
             
             # 提取涨停概念 (简单统计)
             concepts = {}
@@ -56,38 +93,62 @@ def get_market_data(logger=None):
             # Top 3 concepts
             sorted_concepts = sorted(concepts.items(), key=lambda x: x[1], reverse=True)[:3]
             if sorted_concepts:
-                market_summary += f"热门概念: " + ", ".join([f"{k}({v})" for k, v in sorted_concepts]) + "\n"
-                
-    except Exception as e:
-        if logger: logger(f"[!] 获取涨停数据失败: {e}")
+                section += f"热门概念: " + ", ".join([f"{k}({v})" for k, v in sorted_concepts]) + "\n"
+            return section
+        except Exception as e:
+            if logger: logger(f"[!] 获取涨停数据失败: {e}")
+            return ""
 
     # 2. 炸板池
-    try:
-        pool = scan_broken_limit_pool(logger)
-        if pool:
-            market_summary += f"【今日炸板池】共 {len(pool)} 家。\n"
-            market_summary += f"炸板代表: " + ", ".join([f"{s['name']}" for s in pool[:5]]) + "\n"
-    except Exception as e:
-        if logger: logger(f"[!] 获取炸板数据失败: {e}")
+    def broken_section():
+        try:
+            pool = scan_broken_limit_pool(logger)
+            if not pool:
+                return ""
+            section = f"【今日炸板池】共 {len(pool)} 家。\n"
+            section += f"炸板代表: " + ", ".join([f"{s['name']}" for s in pool[:5]]) + "\n"
+            return section
+        except Exception as e:
+            if logger: logger(f"[!] 获取炸板数据失败: {e}")
+            return ""
         
     # 3. 市场情绪概览 (新增)
-    try:
-        overview = get_market_overview(logger=None)
-        stats = overview.get('stats', {})
-        market_summary += f"【市场情绪】\n"
-        market_summary += f"- 涨跌分布: 上涨 {stats.get('up_count', 0)} 家, 下跌 {stats.get('down_count', 0)} 家, 跌停 {stats.get('limit_down_count', 0)} 家\n"
-        market_summary += f"- 市场建议: {stats.get('suggestion', '观察')} (情绪: {stats.get('sentiment', 'Neutral')})\n"
-        market_summary += f"- 总成交额: {stats.get('total_volume', 0)} 亿\n"
-    except Exception as e:
-        if logger: logger(f"[!] 获取市场情绪失败: {e}")
-        
-    return market_summary
+    def overview_section():
+        try:
+            overview = get_market_overview(logger=None)
+            stats = overview.get('stats', {})
+            section = f"【市场情绪】\n"
+            section += f"- 涨跌分布: 上涨 {stats.get('up_count', 0)} 家, 下跌 {stats.get('down_count', 0)} 家, 跌停 {stats.get('limit_down_count', 0)} 家\n"
+            section += f"- 市场建议: {stats.get('suggestion', '观察')} (情绪: {stats.get('sentiment', 'Neutral')})\n"
+            section += f"- 总成交额: {stats.get('total_volume', 0)} 亿\n"
+            return section
+        except Exception as e:
+            if logger: logger(f"[!] 获取市场情绪失败: {e}")
+            return ""
+
+    sections, _ = fan_out({
+        "涨停池": (limit_up_section, SOURCE_TIMEOUTS["market_section"], ""),
+        "炸板池": (broken_section, SOURCE_TIMEOUTS["market_section"], ""),
+        "市场情绪": (overview_section, SOURCE_TIMEOUTS["market_section"], ""),
+    }, logger=logger)
+
+    # 保持原有段落顺序
+    return sections["涨停池"] + sections["炸板池"] + sections["市场情绪"]
+
+def compact_market_summary(market_summary):
+    """
+    精简版市场数据 (供第二批及以后的 AI 批次): 保留家数 / 热门概念 / 情绪，去掉个股名单
+    各批次并发执行，互相看不到对方的 prompt，因此每批都需要自带市场背景
+    """
+    lines = [line for line in market_summary.splitlines()
+             if line.strip() and not line.startswith(("涨停代表:", "炸板代表:"))]
+    if not lines:
+        return ""
+    return "\n".join(lines) + "\n（市场数据摘要，仅作背景参考；完整市场数据由另一批次分析，本批请聚焦下方新闻）\n"
 
 def save_news_history(news_items):
-    """保存新闻历史记录到 data/news_history.json"""
-    history_file = DATA_DIR / "news_history.json"
+    """追加新闻到历史存储 (data/news/ 按日分段)，并按配置做保留期清理"""
     config_file = DATA_DIR / "config.json"
-    history = []
     
     # Load config for auto-clean settings
     auto_clean_enabled = True
@@ -101,46 +162,11 @@ def save_news_history(news_items):
         except:
             pass
 
-    # Load existing
-    if history_file.exists():
-        try:
-            with open(history_file, 'r', encoding='utf-8') as f:
-                history = json.load(f)
-        except:
-            pass
-            
-    # Merge (avoid duplicates based on text + timestamp)
-    existing_keys = {f"{item.get('timestamp', 0)}_{item.get('text', '')[:20]}" for item in history}
-    
-    for item in news_items:
-        # Ensure timestamp exists
-        ts = item.get('timestamp', int(time.time()))
-        text = item.get('text', '')
-        key = f"{ts}_{text[:20]}"
-        
-        if key not in existing_keys:
-            # Add source if not present
-            if 'source' not in item:
-                item['source'] = 'Unknown'
-            history.append(item)
-            existing_keys.add(key)
-            
-    # Sort by timestamp desc
-    history.sort(key=lambda x: x.get('timestamp', 0), reverse=True)
-    
-    # Auto-clean logic
-    if auto_clean_enabled:
-        cutoff_ts = int(time.time()) - (auto_clean_days * 24 * 3600)
-        history = [item for item in history if item.get('timestamp', 0) > cutoff_ts]
-    
-    # Keep a reasonable maximum even if auto-clean is off (e.g. 1000 items)
-    if len(history) > 1000:
-        history = history[:1000]
-    
-    # Save
     try:
-        with open(history_file, 'w', encoding='utf-8') as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
+        news_store.append(news_items)
+        # Auto-clean logic (按天整段删除)
+        if auto_clean_enabled:
+            news_store.apply_retention(auto_clean_days)
     except Exception as e:
         print(f"Error saving news history: {e}")
 
@@ -152,9 +178,23 @@ def get_cls_news(hours=12, logger=None):
     print(msg)
     if logger: logger(msg)
 
-    current_time = int(time.time())
-    start_time = current_time - (hours * 3600)
+    start_time = int(time.time()) - (hours * 3600)
+    news_list = fetch_cls_news_since(start_time, logger=logger)
+
+    # Save history
+    for item in news_list:
+        item['source'] = '财联社'
+    save_news_history(news_list)
     
+    return news_list
+
+def fetch_cls_news_since(start_time, logger=None, max_pages=5, strict=False):
+    """
+    抓取财联社电报中 ctime >= start_time 的条目 (从最新一页往回翻，遇到更早的条目即停止)
+    供全量抓取 (get_cls_news) 与后台增量抓取 (news_tailer) 共用
+    strict=True 时上游失败直接抛出异常，而不是返回已抓到的部分结果 (news_tailer 据此判断是否抓取成功)
+    """
+    current_time = int(time.time())
     news_list = []
     
     # 财联社API是基于 last_time 分页的，这使得完全并行比较困难，因为下一页依赖上一页的最后时间。
@@ -172,7 +212,7 @@ def get_cls_news(hours=12, logger=None):
     
     # 移除多线程，使用串行抓取
     
-    for page in range(5): 
+    for page in range(max_pages): 
         params = {
             "rn": 20,
             "last_time": last_time
@@ -180,10 +220,13 @@ def get_cls_news(hours=12, logger=None):
         
         try:
             # 使用 session
-            resp = session.get(CLS_API_URL, headers=HEADERS, params=params, timeout=5)
+            with upstream(CLS_API_URL):
+                resp = session.get(CLS_API_URL, headers=HEADERS, params=params, timeout=5)
             data = resp.json()
             
             if 'data' not in data or 'roll_data' not in data['data']:
+                if strict and page == 0:
+                    raise ValueError(f"unexpected CLS response: {str(data)[:100]}")
                 break
                 
             items = data['data']['roll_data']
@@ -202,15 +245,17 @@ def get_cls_news(hours=12, logger=None):
                 if not title: 
                     title = content[:30] + "..."
                 
-                # 过滤掉非A股相关的无关新闻（简单过滤）
+                # 过滤掉非A股相关的无关新闻 (排除词与主题词一次扫描完成)
                 full_text = f"【{title}】{content}"
-                if any(k in full_text for k in ["美股", "恒指", "港股", "外汇"]):
+                matched = news_keyword_matcher.match(full_text)
+                if matched["excluded"]:
                     continue
 
                 news_list.append({
                     "timestamp": item_time,
                     "time_str": datetime.fromtimestamp(item_time).strftime('%Y-%m-%d %H:%M:%S'),
-                    "text": full_text
+                    "text": full_text,
+                    "themes": matched["themes"]
                 })
                 page_valid_count += 1
             
@@ -226,12 +271,9 @@ def get_cls_news(hours=12, logger=None):
             msg = f"[!] Error fetching news: {e}"
             print(msg)
             if logger: logger(msg)
+            if strict:
+                raise
             break
-            
-    # Save history
-    for item in news_list:
-        item['source'] = '财联社'
-    save_news_history(news_list)
     
     return news_list
 
@@ -242,7 +284,23 @@ def get_eastmoney_news(hours=12, logger=None):
     msg = f"[*] 正在抓取最近 {hours} 小时的全网舆情 (来源: 东方财富)..."
     print(msg)
     if logger: logger(msg)
-    
+
+    cutoff_time = int(time.time()) - (hours * 3600)
+    news_list = fetch_eastmoney_news_since(cutoff_time, logger=logger)
+
+    # Save history
+    for item in news_list:
+        item['source'] = '东方财富'
+    save_news_history(news_list)
+
+    return news_list
+
+def fetch_eastmoney_news_since(cutoff_time, logger=None, strict=False):
+    """
+    抓取东方财富 7x24 快讯中 showtime >= cutoff_time 的 A 股相关条目
+    供全量抓取 (get_eastmoney_news) 与后台增量抓取 (news_tailer) 共用
+    strict=True 时上游失败直接抛出异常，而不是返回空列表
+    """
     news_list = []
     try:
         # EastMoney 7x24 API
@@ -258,7 +316,8 @@ def get_eastmoney_news(hours=12, logger=None):
             "Referer": "https://kuaixun.eastmoney.com/"
         }
         
-        resp = requests.get(url, headers=headers, timeout=10)
+        with upstream(url):
+            resp = requests.get(url, headers=headers, timeout=10)
         content = resp.text
         
         # The response is usually "var ajaxResult=...;"
@@ -267,9 +326,6 @@ def get_eastmoney_news(hours=12, logger=None):
             data = json.loads(json_str)
             
             if data and 'LivesList' in data:
-                current_time = int(time.time())
-                cutoff_time = current_time - (hours * 3600)
-                
                 for item in data['LivesList']:
                     # Parse time: "2023-10-27 14:30:00"
                     show_time = item.get('showtime')
@@ -285,38 +341,60 @@ def get_eastmoney_news(hours=12, logger=None):
                     if news_ts < cutoff_time:
                         continue
                         
-                    # Filter for A-share relevance (Simple keyword check)
+                    # Filter for A-share relevance (keyword automaton, see keyword_matcher)
                     # EastMoney usually has global news, so we filter a bit.
-                    keywords = ['A股', '股市', '证券', '沪指', '深成指', '创业板', '涨停', '跌停', '证监会', '央行', '板块', '概念', '龙头', '资金']
-                    # Also include stock codes if possible, but regex is expensive here.
                     
                     # If digest is short, it might be just a title.
                     full_text = digest
                     
-                    # Check relevance
-                    is_relevant = False
-                    for kw in keywords:
-                        if kw in full_text:
-                            is_relevant = True
-                            break
+                    # Check relevance: 命中任一主题即视为相关
+                    matched = news_keyword_matcher.match(full_text)
                     
-                    if is_relevant:
+                    if matched["themes"]:
                         news_list.append({
                             "timestamp": news_ts,
                             "time_str": show_time,
-                            "text": full_text
+                            "text": full_text,
+                            "themes": matched["themes"]
                         })
+        elif strict:
+            raise ValueError(f"unexpected EastMoney response: {content[:100]}")
                         
     except Exception as e:
         if logger: logger(f"[!] EastMoney news fetch failed: {e}")
-        
-    # Save history
-    for item in news_list:
-        item['source'] = '东方财富'
-    save_news_history(news_list)
+        if strict:
+            raise
 
     return news_list
 
+def tag_news_with_stocks(news_items):
+    """用实体索引标注每条新闻提及的个股代码 (item['codes'])，返回有提及的条数"""
+    tagged = 0
+    for item in news_items:
+        item['codes'] = stock_index.tag(item.get('text', ''))
+        if item['codes']:
+            tagged += 1
+    return tagged
+
+def route_news_by_stock(news_items):
+    """
+    按个股重排新闻: 提及同一只股票的新闻排在一起 (进入同一批次)，
+    组间按首次出现顺序，未提及个股的新闻放在最后；组内保持原有顺序
+    """
+    groups = {}
+    untagged = []
+    for item in news_items:
+        codes = item.get('codes') or []
+        if codes:
+            groups.setdefault(codes[0], []).append(item)
+        else:
+            untagged.append(item)
+    routed = []
+    for items in groups.values():
+        routed.extend(items)
+    return routed + untagged
+
+@timed("deepseek_news_batch")
 def analyze_news_with_deepseek(news_batch, market_summary="", logger=None, mode="after_hours"):
     """
     使用 AI 批量分析新闻和市场数据
@@ -341,8 +419,14 @@ def analyze_news_with_deepseek(news_batch, market_summary="", logger=None, mode=
     print(msg)
     if logger: logger(msg)
 
-    # 构造 Prompt
-    news_content = "\n".join([f"{i+1}. {n['text']}" for i, n in enumerate(news_batch)])
+    # 构造 Prompt (附上本地实体索引识别出的个股，减少 AI 猜代码)
+    def format_news(i, n):
+        line = f"{i+1}. {n['text']}"
+        mentioned = [f"{stock_index.name_of(c)}({c})" for c in n.get('codes', [])[:5] if stock_index.name_of(c)]
+        if mentioned:
+            line += f" [提及个股: {', '.join(mentioned)}]"
+        return line
+    news_content = "\n".join([format_news(i, n) for i, n in enumerate(news_batch)])
     
     # 动态调整策略描述基于市场情绪
     is_market_bad = "情绪: Low" in market_summary or "情绪: Panic" in market_summary
@@ -434,16 +518,19 @@ def analyze_news_with_deepseek(news_batch, market_summary="", logger=None, mode=
       "concept": "核心概念", 
       "reason": "结合今日表现(如3连板)和新闻利好的综合理由", 
       "score": 8.5, 
-      "strategy": "Aggressive" 
+      "strategy": "Aggressive",
+      "news_id": 1
     }}
   ],
   "remove_stocks": [
     {{
       "code": "sh600xxx",
-      "reason": "利空消息或题材退潮"
+      "reason": "利空消息或题材退潮",
+      "news_id": 2
     }}
   ]
 }}
+news_id 为该结论所依据的新闻序号 (上方新闻列表中的编号)；仅依据市场数据得出的结论填 0。
 如果新闻没有明确的A股标的，忽略即可。
 """
         return {
@@ -465,7 +552,7 @@ def analyze_news_with_deepseek(news_batch, market_summary="", logger=None, mode=
     # Attempt 1: Aggressive Prompt
     try:
         payload = build_payload(task_desc_agg, strategy_desc_agg, "你是一个A股顶级游资操盘手")
-        response = requests.post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=60)
+        response = _post_chat_completion(headers, payload, timeout=60)
         
         # Check for specific Content Risk error
         if response.status_code == 400:
@@ -486,7 +573,7 @@ def analyze_news_with_deepseek(news_batch, market_summary="", logger=None, mode=
         # Attempt 2: Safe Prompt
         try:
             payload = build_payload(task_desc_safe, strategy_desc_safe, "你是一个专业的A股市场分析师")
-            response = requests.post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=60)
+            response = _post_chat_completion(headers, payload, timeout=60)
             if response.status_code != 200:
                 if logger: logger(f"[!] 安全模式也失败: {response.text}")
                 return []
@@ -530,45 +617,23 @@ def analyze_news_with_deepseek(news_batch, market_summary="", logger=None, mode=
         
         # Save to Cache
         ai_cache.set(cache_key, data)
+        store_news_item_results(news_batch, data, mode)
         
         return data
     except Exception as e:
         if logger: logger(f"[!] 解析AI结果失败: {e}\nRaw Content: {content[:100]}...")
         return {}
 
-def analyze_single_stock(stock_data, logger=None, prompt_type='normal', api_key=None, force_update=False):
+def _build_single_stock_payload(stock_data, prompt_type):
     """
-    对单个股票进行深度AI分析 (大师级逻辑)
+    构造个股分析的请求体 (同步接口与流式接口共用)
     """
     name = stock_data.get('name', '未知股票')
     code = stock_data.get('code', '')
     price = stock_data.get('current', 0)
     change = stock_data.get('change_percent', 0)
     concept = stock_data.get('concept', '')
-    
-    # Use provided API key or fallback to env var
-    current_api_key = api_key if api_key else DEEPSEEK_API_KEY
-    
-    if not current_api_key:
-        return "分析失败: 未配置 DeepSeek API Key。请在设置中填写或配置环境变量。"
-    prompt_type = stock_data.get('promptType', 'default')
-    
-    # Rate Limit Check
-    cache_key = f"stock_analysis_{code}_{prompt_type}"
-    
-    if not force_update:
-        last_ts = ai_cache.get_timestamp(cache_key)
-        time_diff = int(time.time()) - last_ts
-        
-        if time_diff < 600: # 10 minutes
-            msg = f"分析过于频繁，请 {600 - time_diff} 秒后再试。"
-            if logger: logger(f"[!] {msg}")
-            # Try to return cached result if available
-            cached_data = ai_cache.get(cache_key)
-            if cached_data:
-                return f"[缓存结果] {cached_data}"
-            return msg
-    
+
     # Additional metrics for better analysis
     turnover = stock_data.get('turnover')
     if turnover is None:
@@ -877,6 +942,41 @@ def analyze_single_stock(stock_data, logger=None, prompt_type='normal', api_key=
     if prompt_type == 'trading_signal':
         payload['response_format'] = { "type": "json_object" }
 
+    return payload
+
+@timed("deepseek_single_stock")
+def analyze_single_stock(stock_data, logger=None, prompt_type='normal', api_key=None, force_update=False):
+    """
+    对单个股票进行深度AI分析 (大师级逻辑)
+    """
+    name = stock_data.get('name', '未知股票')
+    code = stock_data.get('code', '')
+    
+    # Use provided API key or fallback to env var
+    current_api_key = api_key if api_key else DEEPSEEK_API_KEY
+    
+    if not current_api_key:
+        return "分析失败: 未配置 DeepSeek API Key。请在设置中填写或配置环境变量。"
+    prompt_type = stock_data.get('promptType', 'default')
+    
+    # Rate Limit Check
+    cache_key = f"stock_analysis_{code}_{prompt_type}"
+    
+    if not force_update:
+        last_ts = ai_cache.get_timestamp(cache_key)
+        time_diff = int(time.time()) - last_ts
+        
+        if time_diff < 600: # 10 minutes
+            msg = f"分析过于频繁，请 {600 - time_diff} 秒后再试。"
+            if logger: logger(f"[!] {msg}")
+            # Try to return cached result if available
+            cached_data = ai_cache.get(cache_key)
+            if cached_data:
+                return f"[缓存结果] {cached_data}"
+            return msg
+    
+    payload = _build_single_stock_payload(stock_data, prompt_type)
+
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {current_api_key}"
@@ -884,7 +984,7 @@ def analyze_single_stock(stock_data, logger=None, prompt_type='normal', api_key=
 
     try:
         if logger: logger(f"[*] 正在请求AI大师分析: {name}...")
-        response = requests.post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=60)
+        response = _post_chat_completion(headers, payload, timeout=60)
         if response.status_code == 200:
             result = response.json()
             content = result['choices'][0]['message']['content']
@@ -905,23 +1005,182 @@ def analyze_single_stock(stock_data, logger=None, prompt_type='normal', api_key=
     except Exception as e:
         return f"分析失败: {str(e)}"
 
-def generate_watchlist(logger=None, mode="after_hours", hours=None, update_callback=None):
+def stream_single_stock_analysis(stock_data, logger=None, api_key=None, force_update=False, outcome=None):
+    """
+    流式个股AI分析: 逐段产出 DeepSeek 返回的 token (OpenAI 兼容 SSE 格式)
+    完整文本在结束后写入 ai_cache；若传入 outcome 字典，完整结束时置 outcome['complete'] = True
+    """
+    name = stock_data.get('name', '未知股票')
+    code = stock_data.get('code', '')
+    prompt_type = stock_data.get('promptType', 'default')
+
+    current_api_key = api_key if api_key else DEEPSEEK_API_KEY
+    if not current_api_key:
+        yield "分析失败: 未配置 DeepSeek API Key。请在设置中填写或配置环境变量。"
+        return
+
+    # Rate Limit Check (与 analyze_single_stock 保持一致)
+    cache_key = f"stock_analysis_{code}_{prompt_type}"
+    if not force_update:
+        last_ts = ai_cache.get_timestamp(cache_key)
+        time_diff = int(time.time()) - last_ts
+        if time_diff < 600:
+            cached_data = ai_cache.get(cache_key)
+            if cached_data:
+                if not isinstance(cached_data, str):
+                    cached_data = json.dumps(cached_data, ensure_ascii=False)
+                # 带前缀的旧结果不是新的完整分析，不标记 complete (调用方不会把它当作新结果缓存)
+                yield f"[缓存结果] {cached_data}"
+            else:
+                yield f"分析过于频繁，请 {600 - time_diff} 秒后再试。"
+            return
+
+    payload = _build_single_stock_payload(stock_data, prompt_type)
+    payload['stream'] = True
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {current_api_key}"
+    }
+
+    parts = []
+    try:
+        if logger: logger(f"[*] 正在请求AI大师分析 (流式): {name}...")
+        response = _post_chat_completion(headers, payload, timeout=60, stream=True)
+        if response.status_code != 200:
+            yield f"分析失败: API返回错误 {response.status_code}"
+            return
+
+        # text/event-stream 未声明 charset 时 requests 会按 latin-1 解码
+        response.encoding = 'utf-8'
+        with response:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                data = line[5:].strip()
+                if data == '[DONE]':
+                    break
+                try:
+                    chunk = json.loads(data)
+                    delta = chunk['choices'][0].get('delta', {}).get('content')
+                except (ValueError, KeyError, IndexError):
+                    continue
+                if delta:
+                    parts.append(delta)
+                    yield delta
+    except Exception as e:
+        yield f"分析失败: {str(e)}" if not parts else f"\n\n[分析中断: {e}]"
+        return
+
+    content = "".join(parts)
+    if content:
+        ai_cache.set(cache_key, content)
+        if outcome is not None:
+            outcome['complete'] = True
+
+def watchlist_sort_key(item):
+    """列表排序 (降序使用): 手动添加 (最新在前) > AI 挖掘 (分数高在前)"""
+    is_manual = 1 if item.get('strategy_type') == 'Manual' else 0
+    return (is_manual, item.get('added_time', 0), item.get('initial_score', 0))
+
+@timed("generate_watchlist")
+def generate_watchlist(logger=None, mode="after_hours", hours=None, update_callback=None, existing=None):
+    """
+    复盘分析: 在 existing (当前列表的副本) 基础上生成新的关注列表，返回 (列表, 阶段耗时报告)
+    本函数不写 watchlist.json，由调用方合并进 watchlist_store；
+    盘中模式扫描完成后先通过 update_callback(中间列表) 发布一次
+    """
+    # 指标补全作为独立阶段: 代码一出现就提交到共享的行情线程池，与剩余 AI 批次并行拉取
+    # 正常结束、出错或任务被取消 (JobCancelled) 时都丢弃尚未开始的请求
+    enrich = executors.TaskBatch(executors.market_io, METRICS_CONCURRENCY)
+    try:
+        return _generate_watchlist(enrich, logger, mode, hours, update_callback, existing)
+    finally:
+        enrich.cancel()
+
+def _generate_watchlist(enrich, logger, mode, hours, update_callback, existing):
     msg = f"[-] 启动{mode}分析 (AI Powered)..."
     print(msg)
     if logger: logger(msg)
-    
-    # 0. 获取市场数据
-    market_summary = get_market_data(logger=logger)
-    if logger: logger(f"[-] 市场数据获取完成。")
 
-    # 1. 获取新闻
+    # 分阶段耗时统计 (数据获取 [市场数据 / 新闻抓取] / LLM / 指标计算 / 补全 / 持久化)
+    timer = StageTimer()
+
+    metrics_futures = {}
+
+    def fetch_metrics(code):
+        started = time.time()
+        return calculate_metrics(code), time.time() - started
+
+    def prefetch_metrics(code):
+        if code not in metrics_futures:
+            metrics_futures[code] = enrich.submit(fetch_metrics, code)
+
+    def build_lhb_map():
+        # 最新一期龙虎榜: code -> 简要标签
+        lhb_map = {}
+        lhb_dates = lhb_manager.get_available_dates()
+        if not lhb_dates:
+            return lhb_map
+        lhb_data = lhb_manager.get_daily_data(lhb_dates[0])
+        for stock in lhb_data:
+            # Extract Top Hot Money
+            hms = [s['hot_money'] for s in stock['seats'] if s['hot_money']]
+
+            desc = ""
+            if hms:
+                desc = f"游资:{','.join(hms[:2])}"
+            elif stock['total_net_buy'] > 50000000:
+                desc = "机构/大额买入"
+            elif '机构专用' in [s['name'] for s in stock['seats']]:
+                desc = "机构榜"
+
+            if desc:
+                lhb_map[stock['code']] = f"[LHB:{desc}]"
+        return lhb_map
+
+    # 龙虎榜数据与本次分析无关，提前在磁盘线程池中准备 (只读本地文件)
+    lhb_future = executors.disk.submit(build_lhb_map)
+    
     # 如果未指定 hours，则使用默认逻辑
     if hours is None:
         hours = 2 if mode == "intraday" else 12
-        
-    # Fetch news from multiple sources
-    news_items_cls = get_cls_news(hours=hours, logger=logger)
-    news_items_em = get_eastmoney_news(hours=hours, logger=logger)
+
+    # 0/1. 市场数据、新闻 (多源)、盘中扫描互不依赖，并发获取
+    # 总等待时间取决于最慢的一个源；超时或失败的源以空结果继续
+    sources = {
+        "market_data": (lambda: get_market_data(logger=logger), SOURCE_TIMEOUTS["market_data"], ""),
+    }
+    # 后台增量抓取正常运行时直接读本地新闻，否则回退到全量抓取
+    use_local_news = news_tailer.is_fresh(hours)
+    if not use_local_news:
+        sources["cls_news"] = (lambda: get_cls_news(hours=hours, logger=logger), SOURCE_TIMEOUTS["news"], [])
+        sources["eastmoney_news"] = (lambda: get_eastmoney_news(hours=hours, logger=logger), SOURCE_TIMEOUTS["news"], [])
+    if mode == "intraday":
+        sources["intraday_scan"] = (lambda: scan_intraday_limit_up(logger=logger), SOURCE_TIMEOUTS["intraday_scan"], ([], []))
+
+    with timer.stage("data_fetch"):
+        fetched, fetch_report = fan_out(sources, logger=logger)
+    # 单源耗时 (并发执行，彼此重叠)
+    timer.add("market_data", fetch_report["market_data"]["elapsed"])
+
+    market_summary = fetched["market_data"]
+    if use_local_news:
+        with timer.stage("news_fetch"):
+            local_news = news_tailer.recent(hours)
+        news_items_cls = [n for n in local_news if n.get('source') == '财联社']
+        news_items_em = [n for n in local_news if n.get('source') == '东方财富']
+        msg = f"[-] 使用本地增量新闻 (最近 {hours} 小时，共 {len(local_news)} 条)，跳过全量抓取。"
+        print(msg)
+        if logger: logger(msg)
+    else:
+        timer.add("news_fetch", max(fetch_report["cls_news"]["elapsed"], fetch_report["eastmoney_news"]["elapsed"]))
+        news_items_cls = fetched["cls_news"]
+        news_items_em = fetched["eastmoney_news"]
+
+    msg = "[-] 数据获取完成: " + ", ".join(f"{k} {v['elapsed']:.1f}s ({v['status']})" for k, v in fetch_report.items())
+    print(msg)
+    if logger: logger(msg)
     
     # Combine and deduplicate
     news_items = news_items_cls + news_items_em
@@ -931,31 +1190,26 @@ def generate_watchlist(logger=None, mode="after_hours", hours=None, update_callb
     msg = f"[-] 获取到 {len(news_items)} 条有效资讯 (CLS: {len(news_items_cls)}, EastMoney: {len(news_items_em)})。"
     print(msg)
     if logger: logger(msg)
+
+    # 近似重复新闻聚类 (跨源转载、财联社跟进稿)，每簇只提交一条给 AI
+    news_items, dedup_report = dedupe_news(news_items)
+    if dedup_report['items_before'] > dedup_report['items_after']:
+        msg = (f"[-] 近似去重: {dedup_report['items_before']} -> {dedup_report['items_after']} 条 "
+               f"(合并 {dedup_report['clusters_merged']} 簇)，预计节省 {dedup_report['tokens_saved']} tokens "
+               f"({dedup_report['tokens_before']} -> {dedup_report['tokens_after']})")
+        print(msg)
+        if logger: logger(msg)
     
     watchlist = {}
     
-    # 1. 加载现有列表 (用于对比变化)
-    output_file = DATA_DIR / "watchlist.json"
-    initial_codes = set()
-    if output_file.exists():
-        try:
-            with open(output_file, 'r', encoding='utf-8') as f:
-                existing_data = json.load(f)
-                for item in existing_data:
-                    watchlist[item['code']] = item
-                    initial_codes.add(item['code'])
-        except Exception as e:
-            msg = f"[!] Failed to load existing watchlist: {e}"
-            print(msg)
-            if logger: logger(msg)
-            # If we can't load the existing list, we risk overwriting it with empty data.
-            # Better to abort or proceed with caution.
-            # For now, we'll assume it's empty but log error.
-            pass
+    # 1. 现有列表 (用于对比变化)
+    for item in existing or []:
+        watchlist[item['code']] = dict(item)
+    initial_codes = set(watchlist)
 
     # 2. 如果是盘中模式，进行行情扫描并更新/剔除
     if mode == "intraday":
-        intraday_stocks, sealed_stocks = scan_intraday_limit_up(logger=logger)
+        intraday_stocks, sealed_stocks = fetched["intraday_scan"]
         
         # [Fix] If scan returns empty (e.g. network error), do NOT clear existing data
         if not intraday_stocks and not sealed_stocks:
@@ -995,8 +1249,9 @@ def generate_watchlist(logger=None, mode="after_hours", hours=None, update_callb
             # 2.2 添加/更新当前扫描到的股票
             for stock in scanner_stocks:
                 code = stock['code']
-                # 计算指标
-                metrics = calculate_metrics(code)
+                # 指标异步补全，先沿用旧值
+                prefetch_metrics(code)
+                previous = watchlist.get(code, {})
                 
                 # 如果是 sealed，在 reason 前加标记
                 reason = stock['reason']
@@ -1010,11 +1265,8 @@ def generate_watchlist(logger=None, mode="after_hours", hours=None, update_callb
                 "concept": stock['concept'],
                 "initial_score": stock.get('score', 0), # sealed stock might not have score, default 0
                 "strategy_type": stock['strategy'],
-                "seal_rate": metrics['seal_rate'],
-                "broken_rate": metrics['broken_rate'],
-                "next_day_premium": metrics['next_day_premium'],
-                "limit_up_days": metrics['limit_up_days']
                 }
+                new_item.update({k: previous[k] for k in METRIC_FIELDS if k in previous})
                 # 覆盖旧数据 (包括之前可能被标记为 Discarded 的，如果又满足条件了就复活)
                 watchlist[code] = new_item
             
@@ -1029,15 +1281,13 @@ def generate_watchlist(logger=None, mode="after_hours", hours=None, update_callb
                             item['strategy_type'] = 'Discarded'
                             item['news_summary'] = f"[竞价过期] {item.get('news_summary', '')}"
 
-            # [新增] 立即保存并通知前端，实现"先加列表，再丰富数据"
+            # [新增] 立即发布并通知前端，实现"先加列表，再丰富数据"
             try:
-                temp_list = list(watchlist.values())
-                temp_list.sort(key=lambda x: x.get('initial_score', 0), reverse=True)
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(temp_list, f, ensure_ascii=False, indent=2)
-                
                 if update_callback:
-                    update_callback()
+                    temp_list = [dict(item) for item in watchlist.values()]
+                    temp_list.sort(key=watchlist_sort_key, reverse=True)
+                    with timer.stage("persistence"):
+                        update_callback(temp_list)
                     
                 msg = f"[-] 盘中扫描完成，已更新 {len(scanner_stocks)} 只候选股，开始AI分析..."
                 print(msg)
@@ -1045,29 +1295,80 @@ def generate_watchlist(logger=None, mode="after_hours", hours=None, update_callb
             except Exception as e:
                 print(f"Error saving intermediate watchlist: {e}")
             
-    # 如果没有新闻，也至少跑一次市场数据分析
+    batch_size = 5
+
+    # 本地实体索引标注个股 (不消耗 token)
+    if stock_index:
+        started = time.time()
+        tagged = tag_news_with_stocks(news_items)
+        msg = f"[-] 个股识别: {tagged}/{len(news_items)} 条新闻提及个股 (耗时 {(time.time() - started) * 1000:.1f}ms)"
+        print(msg)
+        if logger: logger(msg)
+
+    # 单条新闻结果缓存: 只把 AI 没见过的新闻送去分析
+    cached_result, cache_hits, fresh_items = lookup_news_cache(news_items, mode)
+    if news_items:
+        saved_calls = math.ceil(len(news_items) / batch_size) - math.ceil(len(fresh_items) / batch_size)
+        msg = (f"[-] 新闻结果缓存: 命中 {cache_hits}/{len(news_items)} 条 "
+               f"(命中率 {cache_hits / len(news_items):.0%})，节省 {saved_calls} 次 AI 调用")
+        print(msg)
+        if logger: logger(msg)
+    # 提及同一只股票的新闻路由到同一批次，便于 AI 综合判断
+    news_items = route_news_by_stock(fresh_items)
+
+    # 至少跑一批带市场数据的分析: 市场数据得出的结论 (news_id 0) 不做单条缓存，
+    # 新闻全部命中缓存时也需要重新分析市场数据
     if not news_items:
-        news_items = [{"text": "当前时段无重大新闻，请基于市场数据分析。"}]
+        placeholder = "本时段新闻已分析完毕，请基于市场数据分析。" if cache_hits else "当前时段无重大新闻，请基于市场数据分析。"
+        news_items = [{"text": placeholder, "no_cache": True}]
 
-    batch_size = 5
-    for i in range(0, len(news_items), batch_size):
-        batch = news_items[i:i+batch_size]
-        # 只有第一批带上完整的 market_summary，避免重复消耗 token
-        current_market_summary = market_summary if i == 0 else "（市场数据参考上文）"
-        
+    batches = [news_items[i:i+batch_size] for i in range(0, len(news_items), batch_size)]
+
+    # 只有第一批带上完整的 market_summary，其余批次带精简摘要 (不重复消耗个股名单的 token)
+    market_brief = compact_market_summary(market_summary)
+
+    def run_batch(index, batch):
+        current_market_summary = market_summary if index == 0 else market_brief
+        started = time.time()
         # AI Analysis returns a dict with 'stocks' and 'remove_stocks'
-        analysis_result = analyze_news_with_deepseek(batch, market_summary=current_market_summary, logger=logger, mode=mode)
+        result = analyze_news_with_deepseek(batch, market_summary=current_market_summary, logger=logger, mode=mode)
+        return result, time.time() - started
+
+    # 多批次并发请求 AI (共享 llm 线程池与 RPM/TPM 限流)，结果仍按原始批次顺序合并
+    max_workers = max(1, min(LLM_MAX_CONCURRENCY, len(batches)))
+    llm_started = time.time()
+    llm_wait_before = llm_limiter.total_wait
+    llm_latency_sum = 0.0
+    llm_tasks = executors.TaskBatch(executors.llm, max_workers)
+    futures = [llm_tasks.submit(run_batch, idx, batch) for idx, batch in enumerate(batches)]
+    if cache_hits:
+        # 缓存结果作为第 0 批最先合并
+        cached_future = Future()
+        cached_future.set_result((cached_result, 0.0))
+        futures.insert(0, cached_future)
+
+    for batch_index, future in enumerate(futures):
+        try:
+            checkpoint()
+        except JobCancelled:
+            # 任务被取消: 丢弃尚未开始的批次，不再等待
+            llm_tasks.cancel()
+            raise
+        try:
+            with timer.stage("llm"):
+                analysis_result, latency = future.result()
+        except Exception as e:
+            if logger: logger(f"[!] 第 {batch_index+1} 批 AI 分析异常: {e}")
+            continue
+        llm_latency_sum += latency
         
         # Handle removals
         if isinstance(analysis_result, dict):
             remove_list = analysis_result.get('remove_stocks', [])
             for item in remove_list:
-                code = item.get('code')
+                # 代码格式修正 + 实体索引校验
+                code = stock_index.resolve(item.get('code'), item.get('name'))
                 if not code: continue
-                # Fix code format
-                if not (code.startswith('sh') or code.startswith('sz') or code.startswith('bj')):
-                    if code.startswith('6'): code = 'sh' + code
-                    elif code.startswith('0') or code.startswith('3'): code = 'sz' + code
                 
                 if code in watchlist:
                     reason = item.get('reason', 'AI建议剔除')
@@ -1082,27 +1383,21 @@ def generate_watchlist(logger=None, mode="after_hours", hours=None, update_callb
             analyzed_stocks = analysis_result if isinstance(analysis_result, list) else []
         
         for stock in analyzed_stocks:
-            code = stock['code']
-            # 简单的代码格式修正 (确保是 sh/sz/bj 开头)
-            if not (code.startswith('sh') or code.startswith('sz') or code.startswith('bj')):
-                # 尝试修复
-                if code.startswith('6'): code = 'sh' + code
-                elif code.startswith('0') or code.startswith('3'): code = 'sz' + code
-                elif code.startswith('8') or code.startswith('4') or code.startswith('9'): code = 'bj' + code
-            
-            # 过滤非A股/北证 (如港股 0xxxx 5位)
-            # A股/北证代码通常是6位数字
-            raw_code = code.replace('sh', '').replace('sz', '').replace('bj', '')
-            if not raw_code.isdigit() or len(raw_code) != 6:
-                if logger: logger(f"    [!] 忽略非标准代码: {code}")
+            # 代码格式修正 (sh/sz/bj 前缀) 并用实体索引校验真实性:
+            # 过滤非A股/北证 (如港股 0xxxx 5位) 与不存在的代码，代码错但名称对得上的按名称纠正
+            code = stock_index.resolve(stock.get('code'), stock.get('name'))
+            if not code:
+                if logger: logger(f"    [!] 忽略无效代码: {stock.get('code')} ({stock.get('name')})")
                 continue
+            if stock_index.name_of(code):
+                stock['name'] = stock_index.name_of(code)
 
             msg = f"    [+] 挖掘目标: {stock['name']} ({code}) - {stock['strategy']} - {stock['score']}"
             print(msg)
             if logger: logger(msg)
             
-            # 计算高级指标
-            metrics = calculate_metrics(code)
+            # 计算高级指标 (提交补全任务，与后续批次并行)
+            prefetch_metrics(code)
             
             # 去重逻辑：保留分数更高的
             current_score = stock.get('score', 0)
@@ -1115,26 +1410,22 @@ def generate_watchlist(logger=None, mode="after_hours", hours=None, update_callb
                 "concept": stock.get('concept', '其他'),
                 "initial_score": current_score,
                 "strategy_type": stock.get('strategy', 'Neutral'), # Aggressive or LimitUp
-                # 合并高级指标
-                "seal_rate": metrics['seal_rate'],
-                "broken_rate": metrics['broken_rate'],
-                "next_day_premium": metrics['next_day_premium'],
-                "limit_up_days": metrics['limit_up_days']
             }
             
-            # 如果已存在，且新分数更高，则覆盖；否则保留旧的但更新指标
+            # 如果已存在，且新分数更高，则覆盖；否则保留旧的 (指标在补全阶段统一更新)
             if code not in watchlist or current_score > watchlist[code].get('initial_score', 0):
+                previous = watchlist.get(code, {})
+                new_item.update({k: previous[k] for k in METRIC_FIELDS if k in previous})
                 watchlist[code] = new_item
-            else:
-                # 仅更新指标和新闻（如果需要）
-                watchlist[code].update({
-                    "seal_rate": metrics['seal_rate'],
-                    "broken_rate": metrics['broken_rate'],
-                    "next_day_premium": metrics['next_day_premium'],
-                    "limit_up_days": metrics['limit_up_days']
-                })
-        
-        time.sleep(1) # 避免 API 速率限制
+
+        report_progress(batch_index + 1, len(futures), "AI 分析")
+
+    llm_wall = time.time() - llm_started
+    llm_wait = llm_limiter.total_wait - llm_wait_before
+    msg = (f"[-] AI 分析完成: {len(batches)} 批 (并发 {max_workers})，总耗时 {llm_wall:.1f}s，"
+           f"LLM 累计耗时 {llm_latency_sum:.1f}s (含限流等待 {llm_wait:.1f}s)")
+    print(msg)
+    if logger: logger(msg)
 
     # 如果没有分析出数据（可能是 Key 没填或新闻太少），加入测试数据
     if not watchlist:
@@ -1147,74 +1438,48 @@ def generate_watchlist(logger=None, mode="after_hours", hours=None, update_callb
             {"code": "sz300059", "name": "东方财富", "concept": "互联网金融", "score": 8.0, "strategy": "LimitUp", "reason": "成交量突破万亿"}
         ]
         for t in test_data:
-            metrics = calculate_metrics(t['code'])
+            prefetch_metrics(t['code'])
             watchlist[t['code']] = {
                 "code": t['code'],
                 "name": t['name'],
                 "news_summary": t['reason'],
                 "concept": t['concept'],
                 "initial_score": t['score'],
-                "strategy_type": t['strategy'],
-                "seal_rate": metrics['seal_rate'],
-                "broken_rate": metrics['broken_rate'],
-                "next_day_premium": metrics['next_day_premium'],
-                "limit_up_days": metrics['limit_up_days']
+                "strategy_type": t['strategy']
             }
 
-    # 3. 保存结果
-    output_file = DATA_DIR / "watchlist.json"
-    
-    # 重新加载现有文件以避免覆盖在此期间手动添加的股票 (Race Condition Fix)
-    current_watchlist = {}
-    if output_file.exists():
-        try:
-            with open(output_file, 'r', encoding='utf-8') as f:
-                existing = json.load(f)
-                for item in existing:
-                    current_watchlist[item['code']] = item
-        except:
-            pass
-            
-    # 合并本次分析结果
-    for code, item in watchlist.items():
-        # Preserve added_time if exists in current_watchlist but not in new item (shouldn't happen if we loaded it)
-        if code in current_watchlist and 'added_time' in current_watchlist[code]:
-            item['added_time'] = current_watchlist[code]['added_time']
-        current_watchlist[code] = item
-        
-    final_list = list(current_watchlist.values())
+    # 等待指标补全 (大部分已在 AI 批次期间完成)，只计入关键路径上的等待时间
+    metrics_latency_sum = 0.0
+    with timer.stage("metrics"):
+        for code, future in metrics_futures.items():
+            try:
+                metrics, latency = future.result()
+            except Exception as e:
+                if logger: logger(f"[!] 指标计算失败 {code}: {e}")
+                continue
+            metrics_latency_sum += latency
+            if code in watchlist:
+                watchlist[code].update({k: metrics[k] for k in METRIC_FIELDS})
+    if metrics_futures:
+        msg = (f"[-] 指标补全: {len(metrics_futures)} 只 (并发 {METRICS_CONCURRENCY})，累计耗时 {metrics_latency_sum:.1f}s，"
+               f"AI 结束后额外等待 {timer.report()['stages'].get('metrics', 0):.1f}s")
+        print(msg)
+        if logger: logger(msg)
+
+    # 3. 汇总结果 (取消的任务不发布；期间手动添加的股票由调用方合并时保留)
+    checkpoint()
+    final_list = list(watchlist.values())
     
     # [Request 3] Integrate LHB Data into Watchlist
     try:
-        # Get latest LHB date
-        lhb_dates = lhb_manager.get_available_dates()
-        if lhb_dates:
-            latest_lhb_date = lhb_dates[0]
-            # Fetch data
-            lhb_data = lhb_manager.get_daily_data(latest_lhb_date)
-            # Map code -> simple summary
-            lhb_map = {}
-            for stock in lhb_data:
-                # Extract Top Hot Money
-                hms = [s['hot_money'] for s in stock['seats'] if s['hot_money']]
-                
-                desc = ""
-                if hms:
-                    desc = f"游资:{','.join(hms[:2])}"
-                elif stock['total_net_buy'] > 50000000:
-                    desc = "机构/大额买入"
-                elif '机构专用' in [s['name'] for s in stock['seats']]:
-                    desc = "机构榜"
-                
-                if desc:
-                    lhb_map[stock['code']] = f"[LHB:{desc}]"
-            
-            # Apply to final_list
-            for item in final_list:
-                if item['code'] in lhb_map:
-                    tag = lhb_map[item['code']]
-                    if tag not in item.get('news_summary', ''):
-                        item['news_summary'] = f"{tag} {item.get('news_summary', '')}"
+        with timer.stage("enrichment"):
+            lhb_map = lhb_future.result()
+        # Apply to final_list
+        for item in final_list:
+            if item['code'] in lhb_map:
+                tag = lhb_map[item['code']]
+                if tag not in item.get('news_summary', ''):
+                    item['news_summary'] = f"{tag} {item.get('news_summary', '')}"
     except Exception as e:
         if logger: logger(f"[!] LHB integration failed: {e}")
 
@@ -1223,7 +1488,8 @@ def generate_watchlist(logger=None, mode="after_hours", hours=None, update_callb
         from app.core.data_provider import data_provider
         codes_to_fetch = [item['code'] for item in final_list]
         if codes_to_fetch:
-            quotes = data_provider.fetch_quotes(codes_to_fetch)
+            with timer.stage("enrichment"):
+                quotes = data_provider.fetch_quotes(codes_to_fetch)
             quote_map = {q['code']: q for q in quotes}
             for item in final_list:
                 code = item['code']
@@ -1233,17 +1499,7 @@ def generate_watchlist(logger=None, mode="after_hours", hours=None, update_callb
         if logger: logger(f"[!] Failed to update turnover: {e}")
 
     # [Request 1] Sort: Manual (Newest First) > AI (Score Desc)
-    def sort_key(item):
-        is_manual = 1 if item.get('strategy_type') == 'Manual' else 0
-        added_time = item.get('added_time', 0)
-        score = item.get('initial_score', 0)
-        # Tuple comparison: (is_manual desc, added_time desc, score desc)
-        return (is_manual, added_time, score)
-
-    final_list.sort(key=sort_key, reverse=True)
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(final_list, f, ensure_ascii=False, indent=2)
+    final_list.sort(key=watchlist_sort_key, reverse=True)
         
     # 计算变化
     final_codes = set(item['code'] for item in final_list)
@@ -1255,7 +1511,7 @@ def generate_watchlist(logger=None, mode="after_hours", hours=None, update_callb
     added_limitup = []
     
     for code in added_codes:
-        item = current_watchlist.get(code)
+        item = watchlist.get(code)
         if item:
             info = f"{item['name']}({code})"
             if item.get('strategy_type') == 'Aggressive':
@@ -1272,11 +1528,13 @@ def generate_watchlist(logger=None, mode="after_hours", hours=None, update_callb
         msg += f"    - 无新增标的\n"
         
     msg += f"    - 移除 {len(removed_codes)} 只\n"
-    msg += f"    - 列表已保存至 {output_file}"
+    msg += f"    - 阶段耗时: {timer.summary()}"
     
     print(msg)
     if logger: logger(msg)
 
+    return final_list, timer.report()
+
 def analyze_daily_lhb(date_str, lhb_data, logger=None):
     """
     AI 深度分析龙虎榜日报
@@ -1371,7 +1629,7 @@ def analyze_daily_lhb(date_str, lhb_data, logger=None):
     
     try:
         if logger: logger(f"[*] 正在生成龙虎榜日报分析 ({date_str})...")
-        response = requests.post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=90)
+        response = _post_chat_completion(headers, payload, timeout=90)
         if response.status_code == 200:
             result = response.json()
             content = result['choices'][0]['message']['content']
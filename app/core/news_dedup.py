@@ -0,0 +1,141 @@
+import math
+import os
+import re
+from collections import Counter
+from app.core.llm_limiter import estimate_tokens
+
+# 判为重复的最小重合度: 较短一条的 3-gram 有多少比例出现在另一条中
+# 在真实 财联社/东方财富 转载对上调校: 去掉来源套话后重复对 >= 0.9，同模板不同事件 (回购 / 减持公告) <= 0.76
+DEDUP_MIN_OVERLAP = float(os.getenv("NEWS_DEDUP_MIN_OVERLAP", "0.8"))
+# 少于该数量 3-gram 的短讯按较长一条计算重合度，避免一句标题被任意长文"包含"
+_MIN_CONTAINED = 8
+
+# 去掉空白与常见中英文标点，避免排版差异影响指纹
+_NOISE_RE = re.compile(r'[\s【】\[\]（）()「」《》<>“”"\'‘’，,。.：:；;！!？?、—\-…·|/]+')
+# 来源套话: "财联社10月19日电" / "新华社北京10月19日电" / "（记者 王平）" / "（来源：xxx）"
+_BOILERPLATE_RES = [re.compile(p) for p in (
+    r'(?:财联社|新华社|人民财讯|中证网|证券时报|上证报|东方财富网?)[^\d，,。【】]{0,6}?\d{1,2}月\d{1,2}日\s*(?:电|讯|消息)',
+    r'[（(][^（）()]{0,20}记者[^（）()]{0,20}[）)]',
+    r'[（(](?:来源|原标题|编辑|责任编辑)[:：][^（）()]*[）)]',
+)]
+# 【标题】正文: 标题是编辑各自拟的 (东方财富常另起标题)，正文足够长时只比较正文
+_TITLE_RE = re.compile(r'^\s*【([^】]*)】\s*(.*)$', re.S)
+_TITLE_BODY_MIN = 20
+# 数值 (金额 / 比例 / 日期)，同模板公告的区别主要在这里
+_NUMBER_RE = re.compile(r'\d+(?:\.\d+)?')
+
+
+def normalize_text(text):
+    """去掉来源套话与标题，只保留用于比较的正文"""
+    text = text or ''
+    for pattern in _BOILERPLATE_RES:
+        text = pattern.sub('', text)
+    match = _TITLE_RE.match(text)
+    if match and len(match.group(2)) >= _TITLE_BODY_MIN:
+        text = match.group(2)
+    return text
+
+
+def _shingles(text, size=3):
+    text = _NOISE_RE.sub('', text or '')
+    if len(text) <= size:
+        return [text] if text else []
+    return [text[i:i+size] for i in range(len(text) - size + 1)]
+
+
+def _overlap_needed(size, min_overlap):
+    return max(1, math.ceil(min_overlap * size))
+
+
+def cluster_news(news_items, min_overlap=DEDUP_MIN_OVERLAP):
+    """
+    近似重复聚类，返回簇列表 (每簇为原列表下标，按出现顺序)
+    - 相似度为重合度 |A∩B| / |较短者| (3-gram 集合)，追加一句话的跟进稿也能与原文合并
+    - 前缀过滤: 3-gram 按全局出现次数从少到多排序，重合度达标的两条，较短一条的前
+      |A| - ceil(t·|A|) + 1 个 (最稀有的) 3-gram 中至少有一个出现在另一条里，
+      因此只需在倒排索引中查这些前缀，候选都很少且结果是精确的
+    - 数值校验: 较短一条中的数字大部分须出现在另一条中 (同模板不同公司 / 金额的公告不合并)
+    """
+    texts = [normalize_text(item.get('text', '')) for item in news_items]
+    sets = [frozenset(_shingles(text)) for text in texts]
+    numbers = [frozenset(_NUMBER_RE.findall(text)) for text in texts]
+
+    frequency = Counter(sh for s in sets for sh in s)
+    index = {}
+    for idx, s in enumerate(sets):
+        for sh in s:
+            index.setdefault(sh, []).append(idx)
+
+    parent = list(range(len(news_items)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def similar(small, large):
+        a, b = sets[small], sets[large]
+        base = len(a) if len(a) >= _MIN_CONTAINED else len(b)
+        if len(a & b) < _overlap_needed(base, min_overlap):
+            return False
+        nums = numbers[small]
+        return not nums or len(nums & numbers[large]) >= _overlap_needed(len(nums), min_overlap)
+
+    for idx, s in enumerate(sets):
+        if not s:
+            continue
+        ordered = sorted(s, key=lambda sh: (frequency[sh], sh))
+        prefix = ordered[:len(s) - _overlap_needed(len(s), min_overlap) + 1]
+        candidates = set()
+        for sh in prefix:
+            candidates.update(index[sh])
+        for other in candidates:
+            # 每对只从较短的一侧比较 (等长时取下标小的一侧)
+            if (len(sets[other]), other) <= (len(s), idx):
+                continue
+            if similar(idx, other):
+                ra, rb = find(idx), find(other)
+                if ra != rb:
+                    parent[max(ra, rb)] = min(ra, rb)
+
+    clusters = {}
+    for idx in range(len(news_items)):
+        clusters.setdefault(find(idx), []).append(idx)
+    return sorted(clusters.values(), key=lambda c: c[0])
+
+
+def dedupe_news(news_items, min_overlap=DEDUP_MIN_OVERLAP):
+    """
+    每个近似重复簇只保留一条代表 (正文最长的一条，信息最完整)
+    返回 (代表列表, 统计报告)，代表保持原有顺序
+    """
+    if not news_items:
+        return [], {"items_before": 0, "items_after": 0, "clusters_merged": 0,
+                    "tokens_before": 0, "tokens_after": 0, "tokens_saved": 0}
+
+    clusters = cluster_news(news_items, min_overlap=min_overlap)
+
+    representatives = []
+    for cluster in clusters:
+        best = max(cluster, key=lambda i: len(news_items[i].get('text', '')))
+        item = news_items[best]
+        if len(cluster) > 1:
+            item = dict(item)
+            item['duplicate_count'] = len(cluster) - 1
+            item['sources'] = sorted({news_items[i].get('source', 'Unknown') for i in cluster})
+        representatives.append((best, item))
+    representatives.sort(key=lambda pair: pair[0])
+    result = [item for _, item in representatives]
+
+    tokens_before = sum(estimate_tokens(n.get('text', '')) for n in news_items)
+    tokens_after = sum(estimate_tokens(n.get('text', '')) for n in result)
+    report = {
+        "items_before": len(news_items),
+        "items_after": len(result),
+        "clusters_merged": sum(1 for c in clusters if len(c) > 1),
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": tokens_before - tokens_after
+    }
+    return result, report
@@ -0,0 +1,55 @@
+from app.core.ai_cache import ai_cache
+
+
+def news_item_cache_key(item, mode):
+    """单条新闻的缓存 key (按正文内容哈希，与批次组成及市场摘要无关)"""
+    return f"news_item_{mode}_{ai_cache.generate_key(item.get('text', ''))}"
+
+
+def store_news_item_results(news_batch, data, mode):
+    """
+    按 news_id 把批次结果拆分到每条新闻并缓存
+    若有结论缺少有效 news_id 则无法可靠归属，本批不做单条缓存
+    news_id 是本批次内的序号，复用到其他批次时没有意义，缓存前去掉
+    """
+    if not isinstance(data, dict):
+        return
+    per_item = {idx: {"stocks": [], "remove_stocks": []} for idx in range(1, len(news_batch) + 1)}
+    for field in ("stocks", "remove_stocks"):
+        for entry in data.get(field, []) or []:
+            try:
+                news_id = int(entry.get('news_id', -1))
+            except (TypeError, ValueError):
+                return
+            if news_id == 0:
+                continue # 来自市场数据，不归属任何新闻
+            if news_id not in per_item:
+                return
+            per_item[news_id][field].append({k: v for k, v in entry.items() if k != 'news_id'})
+
+    items = {}
+    for idx, result in per_item.items():
+        item = news_batch[idx - 1]
+        if item.get('no_cache'):
+            continue
+        items[news_item_cache_key(item, mode)] = result
+    ai_cache.set_many(items)
+
+
+def lookup_news_cache(news_items, mode="after_hours"):
+    """
+    查询单条新闻缓存
+    返回 (已缓存结果合并后的 dict, 命中条数, 需要提交 AI 的新新闻列表)
+    """
+    merged = {"stocks": [], "remove_stocks": []}
+    hits = 0
+    fresh = []
+    for item in news_items:
+        cached = None if item.get('no_cache') else ai_cache.get(news_item_cache_key(item, mode))
+        if cached is None:
+            fresh.append(item)
+            continue
+        hits += 1
+        merged["stocks"].extend(cached.get("stocks", []))
+        merged["remove_stocks"].extend(cached.get("remove_stocks", []))
+    return merged, hits, fresh
@@ -0,0 +1,332 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+# Paths
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+DATA_DIR = BASE_DIR / "data"
+NEWS_DIR = DATA_DIR / "news"
+LEGACY_FILE = DATA_DIR / "news_history.json"
+# 已解析段的缓存上限 (LRU)，通常只有当天与最近几天的段被反复读取
+SEGMENT_CACHE_SIZE = int(os.getenv("NEWS_SEGMENT_CACHE_SIZE", "3"))
+
+
+def news_key(item):
+    """去重 key (时间戳 + 正文前 20 字，与旧版 news_history.json 一致)"""
+    return f"{item.get('timestamp', 0)}_{item.get('text', '')[:20]}"
+
+
+def _segment_name(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d")
+
+
+class NewsStore:
+    """
+    新闻历史存储 (按日分段的 JSONL，只追加)
+    - data/news/YYYY-MM-DD.jsonl，每条新闻按自身时间戳落入对应日期段
+    - 内存索引: 去重 key 集合 + 每段的条数与时间范围，查询只读取涉及的段
+    - 保留期清理按段整体删除文件，代价与段数成正比，与新闻条数无关
+    """
+
+    def __init__(self, directory=NEWS_DIR, legacy_path=LEGACY_FILE):
+        self.directory = Path(directory)
+        self.legacy_path = Path(legacy_path)
+        self.segments = {}  # name -> {"count", "min_ts", "max_ts"}
+        self._keys = set()
+        self._cache = OrderedDict()  # name -> 已解析的条目 (按时间倒序)，LRU
+        self._stamps = {}  # name -> (mtime_ns, size)，用于发现其他进程对段文件的修改
+        self._lock = threading.RLock()
+        self._loaded = False
+
+    def _segment_path(self, name):
+        return self.directory / f"{name}.jsonl"
+
+    def _read_segment(self, name):
+        cached = self._cache.get(name)
+        if cached is not None:
+            self._cache.move_to_end(name)
+            return cached
+        items = []
+        path = self._segment_path(name)
+        if path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        items.append(json.loads(line))
+                    except ValueError:
+                        # 进程崩溃可能留下半行，跳过即可
+                        continue
+        items.sort(key=lambda x: x.get('timestamp', 0), reverse=True)
+        self._cache[name] = items
+        while len(self._cache) > SEGMENT_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return items
+
+    @property
+    def migrated_path(self):
+        return self.legacy_path.with_name(self.legacy_path.name + ".migrated")
+
+    def load(self):
+        """扫描所有段建立索引 (首次运行时迁移旧版 news_history.json)"""
+        with self._lock:
+            self.segments = {}
+            self._keys = set()
+            self._cache = OrderedDict()
+            self._stamps = {}
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+            for path in sorted(self.directory.glob("*.jsonl")):
+                name = path.stem
+                try:
+                    items = self._read_segment(name)
+                except Exception as e:
+                    print(f"Error loading news segment {name}: {e}")
+                    continue
+                self._index_segment(name, items)
+                self._stamp(name)
+                # 启动时只保留索引，条目按需再读
+                self._cache.pop(name, None)
+            self._loaded = True
+
+            if self.legacy_path.exists() and not self.migrated_path.exists():
+                self._migrate_legacy()
+
+    def _migrate_legacy(self):
+        """
+        导入旧版 news_history.json 后改名为 .migrated，只迁移一次:
+        之后清空历史或保留期删光所有段，重启时也不会再把旧文件导回来
+        """
+        try:
+            if not self.segments:
+                with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                    legacy = json.load(f)
+                added = self.append(legacy)
+                print(f"Migrated {len(added)} news items from {self.legacy_path.name}")
+            os.replace(self.legacy_path, self.migrated_path)
+        except FileNotFoundError:
+            # 其他 worker 已完成迁移
+            pass
+        except Exception as e:
+            print(f"Error migrating legacy news history: {e}")
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def _stamp(self, name):
+        try:
+            st = self._segment_path(name).stat()
+            self._stamps[name] = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            self._stamps.pop(name, None)
+
+    def refresh(self):
+        """
+        重新索引被其他进程修改过的段 (多 worker 部署时 leader 负责追加)
+        只比较文件的 mtime / size，未变化的段不读取；返回变化的段数
+        """
+        with self._lock:
+            self._ensure_loaded()
+            current = {}
+            for path in self.directory.glob("*.jsonl"):
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                current[path.stem] = (st.st_mtime_ns, st.st_size)
+
+            changed = 0
+            for name in list(self.segments):
+                if name not in current:
+                    self.segments.pop(name, None)
+                    self._cache.pop(name, None)
+                    self._stamps.pop(name, None)
+                    changed += 1
+            for name, stamp in current.items():
+                if self._stamps.get(name) == stamp:
+                    continue
+                self._cache.pop(name, None)
+                self.segments.pop(name, None)
+                try:
+                    self._index_segment(name, self._read_segment(name))
+                except Exception as e:
+                    print(f"Error reloading news segment {name}: {e}")
+                    continue
+                self._stamps[name] = stamp
+                changed += 1
+            return changed
+
+    def _index_segment(self, name, items):
+        if not items:
+            return
+        timestamps = [item.get('timestamp', 0) for item in items]
+        self.segments[name] = {"count": len(items), "min_ts": min(timestamps), "max_ts": max(timestamps)}
+        self._keys.update(news_key(item) for item in items)
+
+    def append(self, news_items):
+        """追加新条目 (已存在的跳过)，返回真正写入的条目"""
+        with self._lock:
+            self._ensure_loaded()
+            by_segment = {}
+            added = []
+            for item in news_items:
+                if 'timestamp' not in item:
+                    item['timestamp'] = int(time.time())
+                if 'source' not in item:
+                    item['source'] = 'Unknown'
+                key = news_key(item)
+                if key in self._keys:
+                    continue
+                self._keys.add(key)
+                by_segment.setdefault(_segment_name(item['timestamp']), []).append(item)
+                added.append(item)
+
+            for name, items in by_segment.items():
+                try:
+                    with open(self._segment_path(name), 'a', encoding='utf-8') as f:
+                        for item in items:
+                            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+                except Exception as e:
+                    print(f"Error appending news segment {name}: {e}")
+                    continue
+                meta = self.segments.setdefault(name, {"count": 0, "min_ts": items[0]['timestamp'], "max_ts": items[0]['timestamp']})
+                meta["count"] += len(items)
+                meta["min_ts"] = min(meta["min_ts"], min(i['timestamp'] for i in items))
+                meta["max_ts"] = max(meta["max_ts"], max(i['timestamp'] for i in items))
+                self._cache.pop(name, None)
+                self._stamp(name)
+            return added
+
+    def query(self, start_ts=None, end_ts=None, limit=None, cursor=None, source=None):
+        """
+        按时间倒序查询 [start_ts, end_ts] 内的新闻
+        limit: 每页条数；cursor: 上一页返回的 next_cursor ("时间戳:该时间戳已返回条数")
+        返回 (items, next_cursor)，没有更多数据时 next_cursor 为 None
+        """
+        skip_ts, skip_count = None, 0
+        if cursor:
+            ts_str, _, count_str = str(cursor).partition(':')
+            skip_ts, skip_count = int(ts_str), int(count_str or 0)
+            end_ts = skip_ts if end_ts is None else min(end_ts, skip_ts)
+
+        results = []
+        with self._lock:
+            self._ensure_loaded()
+            for name in sorted(self.segments, reverse=True):
+                meta = self.segments[name]
+                if start_ts is not None and meta["max_ts"] < start_ts:
+                    # 更早的段只会更旧
+                    break
+                if end_ts is not None and meta["min_ts"] > end_ts:
+                    continue
+                for item in self._read_segment(name):
+                    ts = item.get('timestamp', 0)
+                    if end_ts is not None and ts > end_ts:
+                        continue
+                    if start_ts is not None and ts < start_ts:
+                        break
+                    if source and item.get('source') != source:
+                        continue
+                    if ts == skip_ts and skip_count > 0:
+                        skip_count -= 1
+                        continue
+                    results.append(item)
+                    if limit and len(results) > limit:
+                        break
+                if limit and len(results) > limit:
+                    break
+
+        if limit and len(results) > limit:
+            results = results[:limit]
+            last_ts = results[-1].get('timestamp', 0)
+            same_ts = sum(1 for item in results if item.get('timestamp', 0) == last_ts)
+            if cursor and last_ts == int(str(cursor).partition(':')[0]):
+                same_ts += int(str(cursor).partition(':')[2] or 0)
+            next_cursor = f"{last_ts}:{same_ts}"
+        else:
+            next_cursor = None
+        return [dict(item) for item in results], next_cursor
+
+    def clear_before(self, cutoff_ts):
+        """
+        删除 cutoff_ts 之前的新闻: 整段早于 cutoff 的直接删文件，
+        只有跨越 cutoff 的那一段需要重写
+        """
+        removed = 0
+        with self._lock:
+            self._ensure_loaded()
+            for name in sorted(self.segments):
+                meta = self.segments[name]
+                if meta["min_ts"] >= cutoff_ts:
+                    continue
+                if meta["max_ts"] < cutoff_ts:
+                    removed += self._drop_segment(name)
+                    continue
+                items = self._read_segment(name)
+                keep = [item for item in items if item.get('timestamp', 0) >= cutoff_ts]
+                removed += len(items) - len(keep)
+                self._rewrite_segment(name, keep)
+        return removed
+
+    def clear_all(self):
+        with self._lock:
+            self._ensure_loaded()
+            return sum(self._drop_segment(name) for name in list(self.segments))
+
+    def apply_retention(self, days):
+        """保留期清理，只按整段 (自然日) 删除"""
+        cutoff_name = _segment_name(time.time() - days * 86400)
+        removed = 0
+        with self._lock:
+            self._ensure_loaded()
+            for name in list(self.segments):
+                if name < cutoff_name:
+                    removed += self._drop_segment(name)
+        return removed
+
+    def _drop_segment(self, name):
+        meta = self.segments.pop(name, None)
+        items = self._read_segment(name) if meta else []
+        self._keys.difference_update(news_key(item) for item in items)
+        self._cache.pop(name, None)
+        self._stamps.pop(name, None)
+        try:
+            self._segment_path(name).unlink()
+        except FileNotFoundError:
+            pass
+        return meta["count"] if meta else 0
+
+    def _rewrite_segment(self, name, items):
+        keep_keys = {news_key(item) for item in items}
+        self._keys.difference_update(news_key(item) for item in self._read_segment(name) if news_key(item) not in keep_keys)
+        path = self._segment_path(name)
+        tmp_path = path.with_suffix(".jsonl.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            # 按时间正序写回；同一时间戳的条目保持原有的先后顺序 (稳定排序)，分页游标不受影响
+            for item in sorted(items, key=lambda x: x.get('timestamp', 0)):
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self.segments.pop(name, None)
+        self._cache.pop(name, None)
+        self._index_segment(name, items)
+        self._stamp(name)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "segments": len(self.segments),
+                "items": sum(meta["count"] for meta in self.segments.values()),
+                "cached_segments": len(self._cache)
+            }
+
+
+news_store = NewsStore()
@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from app.core.news_store import news_store, news_key
+from app.core.persistence import persistence
+
+DATA_DIR = Path(__file__).resolve().parent.parent.parent / "data"
+
+# 后台增量抓取间隔 (秒)
+NEWS_TAIL_INTERVAL = int(os.getenv("NEWS_TAIL_INTERVAL", "30"))
+# 本地保留的新闻时长，超过该范围的分析请求回退到全量抓取
+NEWS_TAIL_RETENTION_HOURS = 24
+# 首次启动 (没有游标) 时回补的时长
+NEWS_TAIL_BACKFILL_HOURS = 12
+
+
+class NewsTailer:
+    """
+    新闻增量抓取器
+    每个来源记录游标 (已见到的最新时间戳) 并持久化到 data/news_cursors.json，
+    每次只抓取游标之后的新条目；条目保存在内存中供 generate_watchlist 直接读取
+    """
+
+    def __init__(self, cursor_file=None):
+        self.cursor_file = cursor_file or DATA_DIR / "news_cursors.json"
+        self.cursors = {}
+        self.last_success = {}
+        self.items = []  # 按时间倒序
+        self._seen = set()
+        self._lock = threading.Lock()
+        persistence.register("news_cursors", self.cursor_file, lambda: dict(self.cursors))
+
+    def _sources(self):
+        # 延迟导入: news_analyzer 也会导入本模块
+        # strict=True: 上游失败时抛出异常，避免把失败当作 "抓到 0 条" 而误判为新鲜
+        from app.core.news_analyzer import fetch_cls_news_since, fetch_eastmoney_news_since
+        return {
+            "财联社": lambda since, logger=None: fetch_cls_news_since(since, logger=logger, strict=True),
+            "东方财富": lambda since, logger=None: fetch_eastmoney_news_since(since, logger=logger, strict=True),
+        }
+
+    def _save(self, items):
+        from app.core.news_analyzer import save_news_history
+        save_news_history(items)
+
+    def load(self):
+        """读取游标，并用新闻历史存储预热内存 (重启后无需重新回补)"""
+        if self.cursor_file.exists():
+            try:
+                with open(self.cursor_file, 'r', encoding='utf-8') as f:
+                    self.cursors = json.load(f)
+            except Exception as e:
+                print(f"Error loading news cursors: {e}")
+                self.cursors = {}
+
+        try:
+            history, _ = news_store.query(start_ts=int(time.time()) - NEWS_TAIL_RETENTION_HOURS * 3600)
+            self._merge(history)
+        except Exception as e:
+            print(f"Error loading news history for tailer: {e}")
+
+    def _save_cursors(self):
+        # 游标没有变化时 persistence 会跳过写盘
+        persistence.mark_dirty("news_cursors")
+
+    def _merge(self, new_items):
+        """合并新条目 (去重 + 过期裁剪)，返回真正新增的条目"""
+        cutoff = int(time.time()) - NEWS_TAIL_RETENTION_HOURS * 3600
+        added = []
+        with self._lock:
+            for item in new_items:
+                if item.get('timestamp', 0) < cutoff:
+                    continue
+                key = news_key(item)
+                if key in self._seen:
+                    continue
+                self._seen.add(key)
+                added.append(item)
+            if added:
+                self.items.extend(added)
+                self.items.sort(key=lambda x: x.get('timestamp', 0), reverse=True)
+            while self.items and self.items[-1].get('timestamp', 0) < cutoff:
+                self._seen.discard(news_key(self.items.pop()))
+        return added
+
+    def poll(self, logger=None):
+        """
+        每个来源抓取一次游标之后的条目，返回新增条目 (按时间倒序)
+        游标用 >= 比较，同一秒内的多条由去重集合过滤，不会漏也不会重复
+        抓取失败的来源不更新游标和 last_success，is_fresh 会据此回退到全量抓取
+        """
+        new_items = []
+        now = int(time.time())
+        for source, fetch in self._sources().items():
+            since = self.cursors.get(source) or now - NEWS_TAIL_BACKFILL_HOURS * 3600
+            try:
+                fetched = fetch(since, logger=logger)
+            except Exception as e:
+                print(f"News tailer [{source}] failed: {e}")
+                continue
+            for item in fetched:
+                item['source'] = source
+            added = self._merge(fetched)
+            if fetched:
+                self.cursors[source] = max(since, max(item.get('timestamp', 0) for item in fetched))
+            self.last_success[source] = time.time()
+            new_items.extend(added)
+
+        if new_items:
+            new_items.sort(key=lambda x: x.get('timestamp', 0), reverse=True)
+            self._save(new_items)
+        self._save_cursors()
+        return new_items
+
+    def is_fresh(self, hours=None):
+        """所有来源最近都成功抓取过，且请求的时间范围在本地保留范围之内"""
+        if hours is not None and hours > NEWS_TAIL_RETENTION_HOURS:
+            return False
+        max_age = max(3 * NEWS_TAIL_INTERVAL, 120)
+        now = time.time()
+        sources = self._sources()
+        return all(now - self.last_success.get(source, 0) < max_age for source in sources)
+
+    def recent(self, hours):
+        """返回最近 N 小时的本地新闻 (副本，按时间倒序)"""
+        cutoff = int(time.time()) - hours * 3600
+        with self._lock:
+            return [dict(item) for item in self.items if item.get('timestamp', 0) >= cutoff]
+
+    def stats(self):
+        return {
+            "items": len(self.items),
+            "cursors": dict(self.cursors),
+            "last_success": {k: int(v) for k, v in self.last_success.items()},
+            "interval": NEWS_TAIL_INTERVAL
+        }
+
+
+news_tailer = NewsTailer()
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# 写入合并窗口 (秒): 窗口内对同一文件的多次标记只写一次
+PERSIST_DEBOUNCE = float(os.getenv("PERSIST_DEBOUNCE", "1.0"))
+
+
+def write_json_atomic(path, data, indent=None):
+    """原子写入 JSON (tmp + fsync + rename)，进程崩溃不会留下截断的文件"""
+    path = Path(path)
+    payload = json.dumps(data, ensure_ascii=False, indent=indent).encode('utf-8')
+    _write_bytes_atomic(path, payload)
+    return len(payload)
+
+
+def _write_bytes_atomic(path, payload):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # 每次写入使用独立的临时文件: 同一文件可能被多个线程 / worker 进程同时写
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class PersistenceService:
+    """
+    JSON 状态文件的统一落盘服务
+    - 各模块注册 (文件, 快照函数)，修改后只调用 mark_dirty
+    - 后台线程在合并窗口结束后批量写出所有脏文件
+    - 序列化结果与上次写入内容相同时跳过写盘
+    - 每个文件记录写入次数 / 跳过次数 / 耗时
+    """
+
+    def __init__(self, debounce=PERSIST_DEBOUNCE):
+        self.debounce = debounce
+        self._files = {}  # name -> {"path", "snapshot", "indent", "digest", "stats"}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread = None
+
+    def register(self, name, path, snapshot, indent=None):
+        """snapshot: 无参函数，返回要写入的对象 (需自行保证线程安全，例如返回副本)"""
+        with self._lock:
+            self._files[name] = {
+                "path": Path(path),
+                "snapshot": snapshot,
+                "indent": indent,
+                "digest": None,
+                "write_lock": threading.Lock(),
+                "stats": {"writes": 0, "skipped": 0, "errors": 0, "bytes": 0,
+                          "last_ms": 0.0, "max_ms": 0.0, "total_ms": 0.0, "last_write": 0}
+            }
+
+    def mark_dirty(self, name):
+        with self._lock:
+            if name not in self._files:
+                raise KeyError(f"Unknown persisted file: {name}")
+            self._dirty.add(name)
+            self._ensure_thread()
+            self._wakeup.notify()
+
+    def discard(self, name):
+        """丢弃尚未落盘的修改 (例如文件被外部改写后重新加载)"""
+        with self._lock:
+            self._dirty.discard(name)
+            if name in self._files:
+                # 磁盘内容已变，下次写入前重新比较
+                self._files[name]["digest"] = None
+
+    def is_dirty(self, name):
+        return name in self._dirty
+
+    def flush(self, name=None):
+        """立即写出指定文件 (或全部脏文件)，返回实际写盘的文件数"""
+        with self._lock:
+            names = [name] if name else list(self._dirty)
+            names = [n for n in names if n in self._dirty]
+            self._dirty.difference_update(names)
+        return sum(1 for n in names if self._write(n))
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="persistence", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._dirty:
+                    self._wakeup.wait()
+            # 等待合并窗口，让突发的多次修改合成一次写入
+            time.sleep(self.debounce)
+            self.flush()
+
+    def _write(self, name):
+        entry = self._files[name]
+        # 后台线程与显式 flush 可能同时写同一文件
+        with entry["write_lock"]:
+            return self._write_locked(name, entry)
+
+    def _write_locked(self, name, entry):
+        stats = entry["stats"]
+        start = time.perf_counter()
+        try:
+            data = entry["snapshot"]()
+            payload = json.dumps(data, ensure_ascii=False, indent=entry["indent"]).encode('utf-8')
+            digest = hashlib.md5(payload).hexdigest()
+            if entry["digest"] is None and entry["path"].exists():
+                # 首次写入前与磁盘现有内容比较，重启后未改动的文件不必重写
+                with open(entry["path"], 'rb') as f:
+                    entry["digest"] = hashlib.md5(f.read()).hexdigest()
+            if digest == entry["digest"]:
+                stats["skipped"] += 1
+                return False
+            _write_bytes_atomic(entry["path"], payload)
+            entry["digest"] = digest
+        except Exception as e:
+            stats["errors"] += 1
+            print(f"Error persisting {name}: {e}")
+            # 保持为脏，下一轮重试
+            with self._lock:
+                self._dirty.add(name)
+            return False
+
+        elapsed = (time.perf_counter() - start) * 1000
+        stats["writes"] += 1
+        stats["bytes"] = len(payload)
+        stats["last_ms"] = round(elapsed, 2)
+        stats["max_ms"] = round(max(stats["max_ms"], elapsed), 2)
+        stats["total_ms"] += elapsed
+        stats["last_write"] = int(time.time())
+        return True
+
+    def stats(self):
+        result = {}
+        with self._lock:
+            for name, entry in self._files.items():
+                s = dict(entry["stats"])
+                total_ms = s.pop("total_ms")
+                s["avg_ms"] = round(total_ms / s["writes"], 2) if s["writes"] else 0.0
+                s["dirty"] = name in self._dirty
+                s["path"] = entry["path"].name
+                result[name] = s
+        return result
+
+
+persistence = PersistenceService()
@@ -7,6 +7,7 @@ from sklearn.linear_model import LinearRegression
 from scipy.stats import zscore
 
 from app.core.lhb_manager import lhb_manager
+from app.core.persistence import write_json_atomic
 
 # 假设的数据文件路径
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
@@ -135,8 +136,7 @@ def build_profiles():
         }
         count += 1
     
-    with open(PROFILE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(profiles, f, ensure_ascii=False, indent=2)
+    write_json_atomic(PROFILE_FILE, profiles, indent=2)
         
     print(f"画像构建完成，共生成 {count} 个席位画像，已保存至 {PROFILE_FILE}")
 
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import time
+from app.core.executors import market_io
+from app.core.metrics import cache_hit
+
+# 交易时段行情刷新间隔 (秒)
+QUOTE_REFRESH_INTERVAL = float(os.getenv("QUOTE_REFRESH_INTERVAL", "3"))
+# 非交易时段刷新间隔 (价格不再变化，只需跟上列表变动)
+QUOTE_IDLE_INTERVAL = float(os.getenv("QUOTE_IDLE_INTERVAL", "60"))
+
+
+class QuoteSnapshot:
+    """
+    监控列表行情快照 (/api/stocks)
+    后台生产者每个周期抓取并加工一次，所有请求只读取同一份快照，
+    上游 (新浪) 的请求量与打开的页面数量无关
+    """
+
+    def __init__(self):
+        self.stocks = []
+        self.codes = ()
+        self.version = None
+        self.updated_at = 0
+        self.refreshes = 0
+        self.adopted = 0
+        self.reads = 0
+        self.last_ms = 0.0
+        self._lock = None
+
+    def matches(self, codes, version):
+        return self.updated_at > 0 and self.version == version and set(self.codes) == set(codes)
+
+    async def refresh(self, fetch, codes, version=None, force=True):
+        """
+        fetch(codes) 在行情 IO 线程池中执行，返回加工后的行情列表
+        version: 列表内容的版本号，用于判断快照中的策略信息是否过期
+        并发调用共享同一次抓取: 拿到锁后如果快照已是最新且 force=False 则直接返回
+        """
+        if self._lock is None:
+            # 在事件循环内首次使用时创建
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not force and self.matches(codes, version):
+                return self.stocks
+            start = time.perf_counter()
+            stocks = await market_io.run(fetch, list(codes))
+            # 整体替换，读取方拿到的列表不会被修改
+            self.stocks = stocks
+            self.codes = tuple(codes)
+            self.version = version
+            self.updated_at = time.time()
+            self.refreshes += 1
+            self.last_ms = round((time.perf_counter() - start) * 1000, 1)
+            return stocks
+
+    def adopt(self, stocks, codes, version=None):
+        """采用 leader 进程抓取的快照 (多 worker 部署时 follower 不再自己抓取)"""
+        self.stocks = stocks
+        self.codes = tuple(codes)
+        self.version = version
+        self.updated_at = time.time()
+        self.adopted += 1
+
+    async def get(self, fetch, codes, version=None):
+        """读取快照；监控列表刚发生变化 (如手动添加 / 复盘完成) 时先补抓一次"""
+        self.reads += 1
+        fresh = self.matches(codes, version)
+        cache_hit("quote_snapshot", fresh)
+        if not fresh:
+            return await self.refresh(fetch, codes, version, force=False)
+        return self.stocks
+
+    def stats(self):
+        return {
+            "stocks": len(self.stocks),
+            "age": round(time.time() - self.updated_at, 1) if self.updated_at else None,
+            "refreshes": self.refreshes,
+            "adopted": self.adopted,
+            "reads": self.reads,
+            "last_ms": self.last_ms
+        }
+
+
+quote_snapshot = QuoteSnapshot()
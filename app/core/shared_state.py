@@ -0,0 +1,328 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+# Paths
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+DATA_DIR = BASE_DIR / "data"
+
+SHARED_STATE_DB = os.getenv("SHARED_STATE_DB", str(DATA_DIR / "shared_state.db"))
+# leader 租约有效期 (秒)，续约周期为其 1/3
+LEADER_LEASE_TTL = float(os.getenv("LEADER_LEASE_TTL", "15"))
+# 共享日志表保留条数
+SHARED_LOG_KEEP = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    writer TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS commands (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    msg TEXT NOT NULL
+);
+"""
+
+
+class SharedState:
+    """
+    多 worker 共享状态 (SQLite, WAL 模式)
+    - kv: 带版本号的 JSON 值，读取方按版本号判断是否需要更新本地副本
+    - commands: follower 收到的后台任务请求 (复盘 / 龙虎榜同步 / 取消)，由 leader 取出执行
+    - logs: leader 的任务日志，follower 追读后推给自己的 WebSocket 客户端
+    - leases: leader 选举租约
+    每个线程一个连接；单 worker 时同样可用，只是没有其他读者
+    """
+
+    def __init__(self, path=SHARED_STATE_DB, worker_id=None):
+        self.path = str(path)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._local = threading.local()
+        self._last_put = {}  # key -> 上次写入的 JSON，内容未变时跳过写入
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self.stats = {"puts": 0, "skipped": 0, "gets": 0, "errors": 0}
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._init_lock:
+                if not self._initialized:
+                    conn.executescript(_SCHEMA)
+                    self._initialized = True
+            self._local.conn = conn
+        return conn
+
+    # ---- kv ----
+    def _upsert(self, conn, key, payload):
+        conn.execute(
+            "INSERT INTO kv (key, value, version, writer, updated_at) VALUES (?, ?, 1, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, version = kv.version + 1, "
+            "writer = excluded.writer, updated_at = excluded.updated_at",
+            (key, payload, self.worker_id, time.time()))
+        self._last_put[key] = payload
+        self.stats["puts"] += 1
+
+    def put(self, key, value, force=False):
+        """写入 JSON 值并递增版本号；与本进程上次写入的内容相同则跳过 (返回 False)"""
+        payload = json.dumps(value, ensure_ascii=False, sort_keys=True)
+        if not force and self._last_put.get(key) == payload:
+            self.stats["skipped"] += 1
+            return False
+        self._upsert(self._conn(), key, payload)
+        return True
+
+    def seed(self, marker, values):
+        """
+        marker 不存在时在同一事务中写入 marker 与 values (key -> 值) 并返回 True；
+        已被其他 worker 初始化则不写入并返回 False。读者不会看到只写了一半的初始内容
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM kv WHERE key = ?", (marker,)).fetchone():
+                conn.execute("COMMIT")
+                return False
+            self._upsert(conn, marker, json.dumps(self.worker_id))
+            for key, value in values.items():
+                self._upsert(conn, key, json.dumps(value, ensure_ascii=False, sort_keys=True))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return True
+
+    def get(self, key, default=None):
+        self.stats["gets"] += 1
+        row = self._conn().execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM kv WHERE key = ?", (key,))
+        self._last_put.pop(key, None)
+
+    def purge(self, prefix, max_age):
+        """删除 prefix 下超过 max_age 秒未更新的条目，返回删除条数"""
+        cursor = self._conn().execute("DELETE FROM kv WHERE key LIKE ? AND updated_at < ?",
+                                      (prefix + "%", time.time() - max_age))
+        return cursor.rowcount
+
+    def changed(self, known, prefix=""):
+        """
+        返回其他 worker 写入、版本号与 known (key -> version) 不同的条目: {key: (version, writer, value)}
+        只为变化的条目读取并解析 value；known 会被原地更新
+        """
+        conn = self._conn()
+        rows = conn.execute("SELECT key, version FROM kv WHERE key LIKE ?", (prefix + "%",)).fetchall()
+        stale = [key for key, version in rows if known.get(key) != version]
+        result = {}
+        # 已被删除的条目以 (None, None, None) 返回
+        present = {key for key, _ in rows}
+        for key in [k for k in known if k.startswith(prefix) and k not in present]:
+            known.pop(key)
+            self._last_put.pop(key, None)
+            result[key] = (None, None, None)
+        for key in stale:
+            row = conn.execute("SELECT version, writer, value FROM kv WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                continue
+            version, writer, value = row
+            known[key] = version
+            if writer == self.worker_id:
+                # 本进程写入的，不需要回放
+                continue
+            # 其他 worker 覆盖了该值: 记下当前内容，本进程应用后再写回相同内容时可以跳过
+            self._last_put[key] = value
+            result[key] = (version, writer, json.loads(value))
+        self.stats["gets"] += len(result)
+        return result
+
+    # ---- commands ----
+    def enqueue(self, name, payload=None):
+        self._conn().execute("INSERT INTO commands (name, payload, created_at) VALUES (?, ?, ?)",
+                             (name, json.dumps(payload or {}, ensure_ascii=False), time.time()))
+
+    def take_commands(self):
+        """取出并删除所有待执行的命令 (按提交顺序)"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute("SELECT id, name, payload FROM commands ORDER BY id").fetchall()
+            if rows:
+                conn.execute("DELETE FROM commands WHERE id <= ?", (rows[-1][0],))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [(name, json.loads(payload)) for _, name, payload in rows]
+
+    # ---- logs ----
+    def append_logs(self, lines):
+        if not lines:
+            return
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("INSERT INTO logs (ts, msg) VALUES (?, ?)", [(now, line) for line in lines])
+            conn.execute("DELETE FROM logs WHERE id <= (SELECT MAX(id) FROM logs) - ?", (SHARED_LOG_KEEP,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def logs_since(self, last_id):
+        """返回 (新的 last_id, [msg, ...])；last_id 为 None 时从当前末尾开始"""
+        conn = self._conn()
+        if last_id is None:
+            row = conn.execute("SELECT MAX(id) FROM logs").fetchone()
+            return (row[0] or 0), []
+        rows = conn.execute("SELECT id, msg FROM logs WHERE id > ? ORDER BY id", (last_id,)).fetchall()
+        if not rows:
+            return last_id, []
+        return rows[-1][0], [msg for _, msg in rows]
+
+    # ---- leases ----
+    def acquire_lease(self, name, owner, ttl):
+        """获取或续约租约: 无人持有、已过期或本来就是自己时成功"""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT owner, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+            granted = row is None or row[0] == owner or row[1] < now
+            if granted:
+                conn.execute("INSERT OR REPLACE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)",
+                             (name, owner, now + ttl))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return granted
+
+    def release_lease(self, name, owner):
+        self._conn().execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def lease_holder(self, name):
+        row = self._conn().execute("SELECT owner, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return row[0]
+
+    def snapshot(self):
+        return {"path": self.path, "worker_id": self.worker_id, **self.stats}
+
+
+class LeaderElection:
+    """
+    基于租约的 leader 选举 (跨平台: 只依赖 SQLite 文件锁)
+    - 后台线程每 ttl/3 秒尝试获取 / 续约；leader 进程退出或卡住超过 ttl 后由其他 worker 接管
+    - 续约连续失败超过 ttl 的 2/3 时主动退位，保证同一时刻最多一个 leader
+    - 身份变化时调用 on_change(is_leader) (在选举线程中调用)
+    """
+
+    def __init__(self, state, name="background", ttl=LEADER_LEASE_TTL):
+        self.state = state
+        self.name = name
+        self.ttl = ttl
+        self.is_leader = False
+        self.standalone = False
+        self.elected_at = None
+        self.transitions = 0
+        self._renewed_at = 0
+        self._on_change = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def worker_id(self):
+        return self.state.worker_id
+
+    def start(self, on_change=None):
+        self._on_change = on_change
+        self._tick()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="leader-election", daemon=True)
+            self._thread.start()
+
+    def start_standalone(self, on_change=None):
+        """单 worker 部署: 不需要选举，直接成为 leader (不访问 SQLite)"""
+        self.standalone = True
+        self.is_leader = True
+        self.transitions += 1
+        self.elected_at = time.time()
+        if on_change is not None:
+            on_change(True)
+
+    def _run(self):
+        while not self._stop.wait(self.ttl / 3):
+            self._tick()
+
+    def _tick(self):
+        try:
+            leader = self.state.acquire_lease(self.name, self.worker_id, self.ttl)
+            if leader:
+                self._renewed_at = time.time()
+        except Exception as e:
+            self.state.stats["errors"] += 1
+            print(f"[Leader] Lease renewal failed: {e}")
+            # 续约失败但租约尚未过期时保持现状
+            leader = self.is_leader and time.time() - self._renewed_at < self.ttl * 2 / 3
+        if leader != self.is_leader:
+            self.is_leader = leader
+            self.transitions += 1
+            self.elected_at = time.time() if leader else None
+            print(f"[Leader] Worker {self.worker_id} {'elected leader' if leader else 'is now a follower'}")
+            if self._on_change is not None:
+                self._on_change(leader)
+
+    def stop(self):
+        self._stop.set()
+        if self.is_leader and not self.standalone:
+            try:
+                self.state.release_lease(self.name, self.worker_id)
+            except Exception as e:
+                print(f"[Leader] Lease release failed: {e}")
+            self.is_leader = False
+
+    def snapshot(self):
+        try:
+            holder = self.worker_id if self.standalone else self.state.lease_holder(self.name)
+        except Exception:
+            holder = None
+        return {
+            "worker_id": self.worker_id,
+            "is_leader": self.is_leader,
+            "leader": holder,
+            "elected_at": int(self.elected_at) if self.elected_at else None,
+            "transitions": self.transitions,
+            "lease_ttl": self.ttl
+        }
+
+
+shared_state = SharedState()
+leader = LeaderElection(shared_state)
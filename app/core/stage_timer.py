@@ -0,0 +1,42 @@
+import time
+import threading
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """
+    分阶段累计耗时 (用于复盘流程的性能分析)
+    同一阶段可多次进入，耗时累加；线程安全
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def report(self):
+        with self._lock:
+            return {
+                "total": round(time.perf_counter() - self.started, 3),
+                "stages": {k: round(v, 3) for k, v in self.stages.items()},
+                "counts": dict(self.counts)
+            }
+
+    def summary(self):
+        report = self.report()
+        parts = [f"{name} {seconds:.1f}s" for name, seconds in report["stages"].items()]
+        return f"总耗时 {report['total']:.1f}s | " + ", ".join(parts)
@@ -0,0 +1,152 @@
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from app.core.keyword_matcher import KeywordMatcher
+from app.core.persistence import write_json_atomic
+
+# Paths
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+NAMES_FILE = BASE_DIR / "data" / "stock_names.json"
+
+# 名称前缀 (风险警示 / 新股 / 除权除息) 与后缀，去掉后作为简称
+_NAME_PREFIX_RE = re.compile(r'^(\*?ST|S\*ST|SST|XD|XR|DR|N|C|U)')
+_NAME_SUFFIX_RE = re.compile(r'(-U|-W|-UW|Ａ|A|B)$')
+
+
+def normalize_code(code):
+    """补全 sh/sz/bj 前缀，非 6 位数字的代码返回 None"""
+    code = str(code or '').strip().lower()
+    raw = code[2:] if code[:2] in ('sh', 'sz', 'bj') else code
+    if not raw.isdigit() or len(raw) != 6:
+        return None
+    if code[:2] in ('sh', 'sz', 'bj'):
+        return code
+    if raw.startswith('6'):
+        return 'sh' + raw
+    if raw.startswith('0') or raw.startswith('3'):
+        return 'sz' + raw
+    if raw.startswith('8') or raw.startswith('4') or raw.startswith('9'):
+        return 'bj' + raw
+    return None
+
+
+def name_aliases(name):
+    """全称 + 去掉 ST/N/C 等前缀和 A/B 后缀后的简称 (至少 3 个字，避免误命中)"""
+    name = re.sub(r'\s+', '', str(name or ''))
+    aliases = {name} if len(name) >= 2 else set()
+    short = _NAME_SUFFIX_RE.sub('', _NAME_PREFIX_RE.sub('', name))
+    if len(short) >= 3:
+        aliases.add(short)
+    return aliases
+
+
+class StockEntityIndex:
+    """
+    A股实体索引: 名称 / 简称 / 6 位代码 -> 标准代码
+    编译为 Aho-Corasick 自动机，单次扫描即可标注新闻提及的所有个股，
+    并用于校验 AI 返回的代码是否真实存在
+    """
+
+    def __init__(self, names_file=NAMES_FILE):
+        self.names_file = names_file
+        self.names = {}  # code -> name
+        self._by_name = {}  # alias -> code
+        self._matcher = None
+        self._lock = threading.Lock()
+        self.built_at = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, code):
+        return normalize_code(code) in self.names
+
+    def build(self, records):
+        """records: [(code, name)]"""
+        names = {}
+        groups = {}
+        by_name = {}
+        for code, name in records:
+            code = normalize_code(code)
+            if not code or not name:
+                continue
+            names[code] = name
+            aliases = name_aliases(name)
+            for alias in aliases:
+                by_name.setdefault(alias, code)
+            # 代码同时收录带前缀与纯数字两种写法
+            groups[code] = list(aliases) + [code[2:]]
+
+        matcher = KeywordMatcher(groups)
+        with self._lock:
+            self.names = names
+            self._by_name = by_name
+            self._matcher = matcher
+            self.built_at = time.time()
+
+    def refresh_from_provider(self, provider):
+        """从 DataProvider 的基础信息重建索引，并落盘供下次启动直接使用"""
+        df = getattr(provider, '_base_info_df', None)
+        if df is None or df.empty:
+            return False
+        records = list(zip(df['code'], df['name']))
+        self.build(records)
+        try:
+            write_json_atomic(self.names_file, self.names)
+        except Exception as e:
+            print(f"Error saving stock names: {e}")
+        print(f"Stock entity index built: {len(self.names)} stocks")
+        return True
+
+    def load(self):
+        """从本地缓存的名称表构建索引 (基础信息尚未拉取时使用)"""
+        if not self.names_file.exists():
+            return False
+        try:
+            with open(self.names_file, 'r', encoding='utf-8') as f:
+                self.build(json.load(f).items())
+            return True
+        except Exception as e:
+            print(f"Error loading stock names: {e}")
+            return False
+
+    def tag(self, text):
+        """返回文本中提及的个股代码 (按首次出现顺序)"""
+        matcher = self._matcher
+        if matcher is None or not text:
+            return []
+        codes = []
+        for end, _, code, keyword in matcher.iter_matches(text):
+            if keyword.isdigit():
+                # 纯数字代码要求前后不是数字，避免命中金额/日期中的片段
+                start = end - len(keyword)
+                if (start > 0 and text[start - 1].isdigit()) or (end < len(text) and text[end].isdigit()):
+                    continue
+            if code not in codes:
+                codes.append(code)
+        return codes
+
+    def resolve(self, code, name=None):
+        """
+        校验 AI 返回的代码: 代码存在则返回标准代码；
+        代码不存在但名称能对上则按名称纠正；都不行返回 None
+        索引尚未建立时只做格式校验
+        """
+        normalized = normalize_code(code)
+        if not self.names:
+            return normalized
+        if normalized in self.names:
+            return normalized
+        if name:
+            for alias in name_aliases(name):
+                if alias in self._by_name:
+                    return self._by_name[alias]
+        return None
+
+    def name_of(self, code):
+        return self.names.get(normalize_code(code))
+
+
+stock_index = StockEntityIndex()
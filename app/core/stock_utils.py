@@ -1,6 +1,7 @@
 import json
 from datetime import datetime, time
 from app.core.data_provider import data_provider
+from app.core.metrics import timed
 
 def is_trading_time():
     """
@@ -62,6 +63,7 @@ def fetch_history_data(code, days=300):
     """
     return data_provider.fetch_history_data(code, days)
 
+@timed("calculate_metrics")
 def calculate_metrics(code):
     """
     Calculate advanced metrics based on history.
@@ -0,0 +1,245 @@
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from app.core.persistence import persistence
+
+# Paths
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+DATA_DIR = BASE_DIR / "data"
+
+
+class WatchlistStore:
+    """
+    股票列表存储 (AI 复盘列表 / 自选股)
+    - 以 code 为键的有序字典: 增删改查 O(1)，同时保留列表顺序
+    - write-behind: 修改只标记为脏，由 persistence 服务在合并窗口结束后一次性原子写入，
+      盘中扫描一次加入 20 只股票也只写一次文件
+    - 多 worker: 逐条记录本地修改，按 code 发布到共享状态 (见 main.shared_sync_task)，
+      各 worker 的修改互不覆盖；只有 leader 写文件 (persist)
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.name = self.path.stem
+        self._items = OrderedDict()
+        self._lock = threading.RLock()
+        self.changes = 0
+        # 内容版本号: 任何修改或重新加载都会递增，供行情快照判断是否需要重新加工
+        self.version = 0
+        # 尚未发布到共享状态的修改: code -> 修改时的 version；顺序变化单独记录
+        self._unsynced = {}
+        self._order_unsynced = None
+        # 是否由本进程落盘 (多 worker 时只有 leader 写文件)
+        self.persist = True
+        persistence.register(self.name, self.path, self._snapshot, indent=2)
+
+    def __contains__(self, code):
+        return code in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def load(self):
+        """从磁盘加载 (丢弃尚未落盘的修改)"""
+        items = []
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    items = json.load(f)
+            except Exception as e:
+                print(f"Error loading {self.path.name}: {e}")
+                items = []
+        with self._lock:
+            persistence.discard(self.name)
+            self.version += 1
+            self._items = OrderedDict()
+            for item in items:
+                # 文件中重复的代码只保留第一条
+                if item.get('code') and item['code'] not in self._items:
+                    self._items[item['code']] = item
+
+    # 外部 (如复盘线程) 直接改写了文件，重新读取即可
+    reload = load
+
+    def get(self, code, default=None):
+        return self._items.get(code, default)
+
+    def codes(self):
+        with self._lock:
+            return list(self._items.keys())
+
+    def items(self):
+        """有序视图 (列表副本，元素为同一对象)"""
+        with self._lock:
+            return list(self._items.values())
+
+    def add(self, item, front=True):
+        """新增或替换；新增时默认放在最前面 (与原先 insert(0, ...) 一致)，替换时保持原位置"""
+        code = item['code']
+        with self._lock:
+            exists = code in self._items
+            self._items[code] = item
+            if not exists and front:
+                self._items.move_to_end(code, last=False)
+            self._mark_dirty(code, reorder=not exists)
+
+    def update(self, code, **fields):
+        with self._lock:
+            item = self._items.get(code)
+            if item is None:
+                return False
+            item.update(fields)
+            self._mark_dirty(code)
+            return True
+
+    def remove(self, code):
+        with self._lock:
+            if self._items.pop(code, None) is None:
+                return False
+            self._mark_dirty(code)
+            return True
+
+    def replace_all(self, items):
+        with self._lock:
+            previous = list(self._items)
+            self._items = OrderedDict()
+            for item in items:
+                if item['code'] not in self._items:
+                    self._items[item['code']] = item
+            self._mark_dirty(*previous, *self._items, reorder=True)
+
+    def snapshot_map(self):
+        """code -> 记录副本，作为后台任务的起点 (merge 时的 baseline)"""
+        with self._lock:
+            return {code: dict(item) for code, item in self._items.items()}
+
+    def merge(self, items, baseline, key=None):
+        """
+        合并后台任务 (复盘) 基于 baseline 快照算出的完整列表，在锁内完成，不覆盖任务期间的其他修改:
+        - baseline 中有、当前已被删除的代码不再加回
+        - 任务期间被修改或新增的条目 (手动添加 / 盘中扫描) 以当前为准
+        - 其余采用任务结果 (保留原有 added_time)，当前有而结果中没有的条目保留
+        返回合并后的快照，可作为下一次 merge 的 baseline
+        """
+        with self._lock:
+            merged = OrderedDict()
+            for item in items:
+                code = item['code']
+                if code in merged:
+                    continue
+                existing = self._items.get(code)
+                base = baseline.get(code)
+                if existing is None:
+                    if base is None:
+                        merged[code] = dict(item)
+                    continue
+                if existing != base:
+                    merged[code] = existing
+                    continue
+                item = dict(item)
+                if 'added_time' in existing:
+                    item['added_time'] = existing['added_time']
+                merged[code] = item
+            for code, item in self._items.items():
+                if code not in merged:
+                    merged[code] = item
+            ordered = list(merged.values())
+            if key is not None:
+                ordered.sort(key=key, reverse=True)
+            previous = list(self._items)
+            self._items = OrderedDict((item['code'], item) for item in ordered)
+            self._mark_dirty(*previous, *self._items, reorder=True)
+            return {code: dict(item) for code, item in self._items.items()}
+
+    def apply_shared(self, changes, order=None, reset=False):
+        """
+        应用其他 worker 发布的逐条修改 (code -> 记录，None 表示已删除) 与顺序，不作为本地修改再发布
+        本地尚未发布的同一 code / 顺序修改优先 (随后发布，后写覆盖)
+        reset: 首次同步，以共享状态为准替换整个列表
+        """
+        with self._lock:
+            if reset:
+                local = {code: self._items.get(code) for code in self._unsynced}
+                self._items = OrderedDict()
+                for code, item in local.items():
+                    if item is not None:
+                        self._items[code] = item
+            for code, item in changes.items():
+                if code in self._unsynced:
+                    continue
+                if item is None:
+                    self._items.pop(code, None)
+                else:
+                    self._items[code] = item
+            if order is not None and self._order_unsynced is None:
+                position = {code: index for index, code in enumerate(order)}
+                # 顺序中没有的 (本地新增尚未发布) 排在最前，与 add() 默认插入位置一致
+                ordered = sorted(self._items, key=lambda code: position.get(code, -1))
+                self._items = OrderedDict((code, self._items[code]) for code in ordered)
+            self.version += 1
+            if self.persist:
+                persistence.mark_dirty(self.name)
+
+    def unsynced_changes(self):
+        """本地未发布的修改: (version, {code: 记录副本，已删除为 None}, 顺序或 None)；没有时返回 None"""
+        with self._lock:
+            if not self._unsynced and self._order_unsynced is None:
+                return None
+            changes = {code: dict(self._items[code]) if code in self._items else None for code in self._unsynced}
+            order = list(self._items) if self._order_unsynced is not None else None
+            return self.version, changes, order
+
+    def mark_synced(self, version):
+        """unsynced_changes() 返回的内容已发布；之后的修改保留到下一轮"""
+        with self._lock:
+            self._unsynced = {code: v for code, v in self._unsynced.items() if v > version}
+            if self._order_unsynced is not None and self._order_unsynced <= version:
+                self._order_unsynced = None
+
+    def shared_rows(self):
+        """全部内容 (code -> 记录副本) 与顺序，用于初始化共享状态"""
+        with self._lock:
+            return {code: dict(item) for code, item in self._items.items()}, list(self._items)
+
+    def set_persist(self, enabled):
+        """多 worker 时只有 leader 落盘；开启时写出当前 (已与共享状态同步的) 内容"""
+        self.persist = enabled
+        if enabled:
+            persistence.mark_dirty(self.name)
+
+    def _mark_dirty(self, *codes, reorder=False):
+        self.changes += 1
+        self.version += 1
+        for code in codes:
+            self._unsynced[code] = self.version
+        if reorder:
+            self._order_unsynced = self.version
+        if self.persist:
+            persistence.mark_dirty(self.name)
+
+    def _snapshot(self):
+        with self._lock:
+            # 浅拷贝每条记录，后台序列化时不受 update() 影响
+            return [dict(item) for item in self._items.values()]
+
+    def flush(self):
+        """立即落盘 (没有未保存修改时直接返回)"""
+        return persistence.flush(self.name) > 0
+
+    def stats(self):
+        return {"items": len(self._items), "changes": self.changes, "dirty": persistence.is_dirty(self.name)}
+
+
+watchlist_store = WatchlistStore(DATA_DIR / "watchlist.json")
+favorites_store = WatchlistStore(DATA_DIR / "favorites.json")
+
+
+def watched_version():
+    return (watchlist_store.version, favorites_store.version)
+
+
+def watched_codes():
+    """行情监控列表: AI 列表 + 自选股 (去重，保持顺序)"""
+    codes = list(dict.fromkeys(watchlist_store.codes() + favorites_store.codes()))
+    return codes or ['sh600519', 'sz002405', 'sz300059']
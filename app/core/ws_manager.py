@@ -0,0 +1,143 @@
+import asyncio
+import os
+import time
+
+# 每个连接的待发送消息上限
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "256"))
+# 单条消息发送超时 (秒)，超时视为连接已失效
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+
+
+class _Client:
+    def __init__(self, websocket, maxsize):
+        self.websocket = websocket
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.task = None
+        self.connected_at = time.time()
+        self.sent = 0
+        self.dropped = 0
+        self.bytes = 0
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+        self.total_ms = 0.0
+
+    def metrics(self):
+        peer = getattr(self.websocket, 'client', None)
+        return {
+            "client": f"{peer.host}:{peer.port}" if peer else "?",
+            "connected_for": int(time.time() - self.connected_at),
+            "queue_depth": self.queue.qsize(),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "bytes": self.bytes,
+            "last_ms": self.last_ms,
+            "avg_ms": round(self.total_ms / self.sent, 2) if self.sent else 0.0,
+            "max_ms": self.max_ms
+        }
+
+
+class ConnectionManager:
+    """
+    WebSocket 连接管理
+    - 每个连接一个有界发送队列 + 独立的写协程，broadcast 只入队不等待，
+      单个慢连接不会拖住其他连接
+    - 队列满时按策略处理: "drop" 丢弃最旧的消息 (日志)，"disconnect" 断开该连接 (客户端重连后拿全量)
+    - 发送失败或超时的连接自动移除
+    """
+
+    def __init__(self, name="ws", overflow="drop", maxsize=WS_QUEUE_SIZE, send_timeout=WS_SEND_TIMEOUT):
+        self.name = name
+        self.overflow = overflow
+        self.maxsize = maxsize
+        self.send_timeout = send_timeout
+        self.clients = {}  # websocket -> _Client
+        self.stats = {"connected": 0, "disconnected": 0, "dropped": 0, "evicted": 0, "failed": 0}
+
+    @property
+    def active_connections(self):
+        return list(self.clients)
+
+    async def connect(self, websocket):
+        await websocket.accept()
+        client = _Client(websocket, self.maxsize)
+        client.task = asyncio.create_task(self._writer(client))
+        self.clients[websocket] = client
+        self.stats["connected"] += 1
+
+    def disconnect(self, websocket):
+        client = self.clients.pop(websocket, None)
+        if client is None:
+            return
+        self.stats["disconnected"] += 1
+        if client.task is not None and client.task is not asyncio.current_task():
+            client.task.cancel()
+
+    def send(self, websocket, message):
+        """把消息放入指定连接的发送队列 (不等待发送完成)"""
+        client = self.clients.get(websocket)
+        if client is None:
+            return False
+        try:
+            client.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        if self.overflow == "disconnect":
+            self.stats["evicted"] += 1
+            print(f"[{self.name}] Slow client evicted (queue full)")
+            self.disconnect(websocket)
+            asyncio.create_task(self._close(websocket))
+            return False
+
+        # drop: 丢弃最旧的一条，保留最新的消息
+        try:
+            client.queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+        client.dropped += 1
+        self.stats["dropped"] += 1
+        client.queue.put_nowait(message)
+        return True
+
+    async def broadcast(self, message, targets=None):
+        """广播 (只入队)，返回入队成功的连接数"""
+        targets = list(self.clients) if targets is None else targets
+        return sum(1 for websocket in targets if self.send(websocket, message))
+
+    async def _writer(self, client):
+        websocket = client.websocket
+        try:
+            while True:
+                message = await client.queue.get()
+                start = time.perf_counter()
+                await asyncio.wait_for(websocket.send_text(message), self.send_timeout)
+                elapsed = (time.perf_counter() - start) * 1000
+                client.sent += 1
+                client.bytes += len(message)
+                client.last_ms = round(elapsed, 2)
+                client.max_ms = round(max(client.max_ms, elapsed), 2)
+                client.total_ms += elapsed
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 发送失败 / 超时: 连接已失效，移除并关闭
+            self.stats["failed"] += 1
+            print(f"[{self.name}] Dropping dead connection: {e!r}")
+            self.disconnect(websocket)
+            await self._close(websocket)
+
+    async def _close(self, websocket):
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
+    def metrics(self):
+        return {
+            "connections": len(self.clients),
+            "overflow": self.overflow,
+            "queue_size": self.maxsize,
+            **self.stats,
+            "clients": [client.metrics() for client in self.clients.values()]
+        }
@@ -1,8 +1,9 @@
-from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect, BackgroundTasks, Query
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect, Query
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, StreamingResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 import requests
+import hashlib
 import json
 import os
 import shutil
@@ -12,12 +13,29 @@ from pathlib import Path
 from datetime import datetime, timedelta
 from typing import List, Optional
 from pydantic import BaseModel
-from app.core.news_analyzer import generate_watchlist, analyze_single_stock, analyze_daily_lhb
+from app.core.news_analyzer import generate_watchlist, watchlist_sort_key, analyze_single_stock, analyze_daily_lhb, stream_single_stock_analysis
 from app.core.market_scanner import scan_limit_up_pool, scan_broken_limit_pool, get_market_overview
 from app.core.stock_utils import calculate_metrics, is_trading_time, is_market_open_day
 from app.core.data_provider import data_provider
 from app.core.lhb_manager import lhb_manager
 from app.core.ai_cache import ai_cache
+from app.core.analysis_store import analysis_store
+from app.core.inflight import ai_inflight
+from app.core.news_tailer import news_tailer, NEWS_TAIL_INTERVAL
+from app.core.news_store import news_store
+from app.core.stock_entities import stock_index
+from app.core.watchlist_store import watchlist_store, favorites_store, watched_codes, watched_version
+from app.core.data_hub import data_hub
+from app.core.ws_manager import ConnectionManager
+from app.core.log_pipeline import log_pipeline
+from app.core.quote_snapshot import quote_snapshot, QUOTE_REFRESH_INTERVAL, QUOTE_IDLE_INTERVAL
+from app.core.persistence import persistence
+from app.core.job_scheduler import scheduler, JobScheduler, IntervalTrigger, CronTrigger, DynamicTrigger
+from app.core.job_runner import job_runner
+from app.core.shared_state import shared_state, leader
+from app.core.metrics import registry as metrics_registry
+from app.core import executors
+from app.core.executors import executor_metrics, shutdown_executors
 
 # Paths
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -35,25 +53,22 @@ app.mount("/static", StaticFiles(directory=str(BASE_DIR / "app" / "static")), na
 templates = Jinja2Templates(directory=str(TEMPLATE_DIR))
 
 # WebSocket Manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except:
-                pass
-
-manager = ConnectionManager()
+# 日志通道: 慢连接丢弃最旧的日志，不影响其他连接
+manager = ConnectionManager("logs", overflow="drop")
+
+HTTP_SECONDS = metrics_registry.histogram("app_http_request_duration_seconds", "API request latency by route",
+                                          ("method", "route", "status"))
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """按路由模板记录接口耗时 (/metrics 与静态文件除外)"""
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    path = getattr(route, "path", None)
+    if path and path != "/metrics" and not path.startswith("/static"):
+        HTTP_SECONDS.observe(time.perf_counter() - start, method=request.method, route=path, status=response.status_code)
+    return response
 
 @app.get("/api/status")
 async def get_system_status():
@@ -70,17 +85,10 @@ async def clear_news_history(range: str = "all"):
     """清理新闻历史
     range: all, before_today, before_3d, before_7d
     """
-    history_file = DATA_DIR / "news_history.json"
-    if not history_file.exists():
-        return {"status": "success", "message": "No history to clear"}
-        
     try:
         if range == "all":
-            new_history = []
+            removed = await executors.disk.run(news_store.clear_all)
         else:
-            with open(history_file, 'r', encoding='utf-8') as f:
-                history = json.load(f)
-            
             now_ts = int(time.time())
             if range == "before_today":
                 # Today 00:00:00
@@ -92,166 +100,62 @@ async def clear_news_history(range: str = "all"):
             else:
                 cutoff_ts = 0
                 
-            new_history = [item for item in history if item.get('timestamp', 0) >= cutoff_ts]
+            removed = await executors.disk.run(news_store.clear_before, cutoff_ts)
             
-        with open(history_file, 'w', encoding='utf-8') as f:
-            json.dump(new_history, f, ensure_ascii=False, indent=2)
-            
-        return {"status": "success", "message": f"History cleared with range: {range}"}
+        return {"status": "success", "message": f"History cleared with range: {range}", "removed": removed}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
-def load_watchlist():
-    """加载复盘生成的关注列表"""
-    file_path = DATA_DIR / "watchlist.json"
-    if file_path.exists():
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return data
-        except:
-            return []
-    return []
-
-def save_watchlist(data):
-    """保存关注列表"""
-    file_path = DATA_DIR / "watchlist.json"
-    try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"Error saving watchlist: {e}")
-
-def load_favorites():
-    """加载自选股列表 (长期关注)"""
-    file_path = DATA_DIR / "favorites.json"
-    if file_path.exists():
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except:
-            return []
-    return []
-
-def save_favorites(data):
-    """保存自选股列表"""
-    file_path = DATA_DIR / "favorites.json"
-    try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"Error saving favorites: {e}")
-
 def clean_watchlist():
     """
     Clean up watchlist (AI generated only)
     """
-    global watchlist_data
-    
-    if not watchlist_data:
+    if not len(watchlist_store):
         return
 
-    seen = set()
-    new_list = []
-    
-    # Keep unique codes
-    for item in watchlist_data:
-        if item['code'] not in seen:
-            seen.add(item['code'])
-            new_list.append(item)
-            
+    # 代码唯一性由 store 保证
     # Limit size
-    if len(new_list) > 100:
-        new_list = new_list[:100]
+    for code in watchlist_store.codes()[100:]:
+        watchlist_store.remove(code)
         
     # [新增] 每日清理逻辑: 如果是新的一天(9:00前)，清理掉昨天的"已剔除"或"过期"数据
     # 这里简单判断: 如果列表里有数据，且当前时间是 08:30-09:15 之间，且数据是旧的(added_time < today_start)，则清理
     # 为了简化，我们只清理明确标记为 Discarded 的
-    final_list = []
-    for item in new_list:
+    for item in watchlist_store.items():
         if item.get('strategy_type') == 'Discarded':
              # 如果是 Discarded，检查是否是今天生成的? 
              # 实际上用户问"什么时候彻底删除"，我们可以定义为: 每次分析前(clean_watchlist被调用时)
              # 如果状态是 Discarded，直接丢弃，不保留在列表中
-             continue
-        final_list.append(item)
-    
-    watchlist_data = final_list
-    save_watchlist(watchlist_data)
-    reload_watchlist_globals()
-
-def reload_watchlist_globals():
-    """重新加载全局变量"""
-    global watchlist_data, watchlist_map, WATCH_LIST, favorites_data, favorites_map
-    watchlist_data = load_watchlist()
-    watchlist_map = {item['code']: item for item in watchlist_data}
-    
-    favorites_data = load_favorites()
-    favorites_map = {item['code']: item for item in favorites_data}
-    
-    # WATCH_LIST includes both
-    WATCH_LIST = list(set(list(watchlist_map.keys()) + list(favorites_map.keys())))
+             watchlist_store.remove(item['code'])
 
 @app.get("/api/news_history")
-async def get_news_history():
-    """获取新闻历史记录"""
-    history_file = DATA_DIR / "news_history.json"
-    if history_file.exists():
-        try:
-            with open(history_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return {"status": "success", "data": data}
-        except Exception as e:
-            return {"status": "error", "message": str(e)}
-    return {"status": "success", "data": []}
+async def get_news_history(limit: int = 200, cursor: Optional[str] = None,
+                           start: Optional[int] = None, end: Optional[int] = None,
+                           source: Optional[str] = None):
+    """获取新闻历史记录 (按时间倒序分页，可按时间范围 / 来源过滤)"""
+    try:
+        limit = max(1, min(limit, 1000))
+        items, next_cursor = await executors.disk.run(
+            news_store.query, start_ts=start, end_ts=end, limit=limit, cursor=cursor, source=source
+        )
+        return {"status": "success", "data": items, "next_cursor": next_cursor}
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+# worker 进程数 (run.py 通过 APP_WORKERS 传入)。多 worker 时共享的数据文件只由 leader 落盘，
+# 避免多个进程同时追加 / 压缩同一个文件；成为 leader 时再开启 (见 on_leadership_change)
+WORKERS = int(os.getenv("APP_WORKERS", "1"))
+LEADER_PERSISTED = (watchlist_store, favorites_store, ai_cache, analysis_store)
+if WORKERS > 1:
+    for owner in LEADER_PERSISTED:
+        owner.persist = False
 
 # 全局变量
-watchlist_data = load_watchlist()
-watchlist_map = {item['code']: item for item in watchlist_data}
-favorites_data = load_favorites()
-favorites_map = {item['code']: item for item in favorites_data}
-WATCH_LIST = list(set(list(watchlist_map.keys()) + list(favorites_map.keys())))
+watchlist_store.load()
+favorites_store.load()
 limit_up_pool_data = []
 broken_limit_pool_data = []
 intraday_pool_data = [] # New global for fast intraday pool
-ANALYSIS_CACHE = {} # Cache for AI analysis results: {code: {content: str, timestamp: float}}
-
-def load_analysis_cache():
-    """Load AI analysis cache from disk"""
-    global ANALYSIS_CACHE
-    file_path = DATA_DIR / "analysis_cache.json"
-    if file_path.exists():
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                ANALYSIS_CACHE = json.load(f)
-        except:
-            pass
-
-def save_analysis_cache():
-    """Save AI analysis cache to disk"""
-    try:
-        file_path = DATA_DIR / "analysis_cache.json"
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(ANALYSIS_CACHE, f, ensure_ascii=False)
-    except:
-        pass
-
-def cleanup_analysis_cache(max_age_days=7):
-    """清理超过指定天数的分析缓存"""
-    global ANALYSIS_CACHE
-    now = time.time()
-    max_age_seconds = max_age_days * 86400
-    initial_count = len(ANALYSIS_CACHE)
-    
-    ANALYSIS_CACHE = {
-        k: v for k, v in ANALYSIS_CACHE.items() 
-        if now - v.get('timestamp', 0) < max_age_seconds
-    }
-    
-    if len(ANALYSIS_CACHE) < initial_count:
-        save_analysis_cache()
-        print(f"Cleanup: Removed {initial_count - len(ANALYSIS_CACHE)} expired analysis cache entries.")
-
 async def update_intraday_pool():
     global intraday_pool_data
     # ... (Implementation of scan)
@@ -267,21 +171,18 @@ async def get_status():
 
 @app.get("/api/add_watchlist")
 async def add_to_watchlist_api(code: str, name: str, reason: str = "手动添加"):
-    global favorites_data, watchlist_map
-    
     # Check if exists in favorites
-    for item in favorites_data:
-        if item['code'] == code:
-            return {"status": "exists", "msg": "已在自选列表中"}
+    if code in favorites_store:
+        return {"status": "exists", "msg": "已在自选列表中"}
             
     # Try to preserve existing info if it was in AI list
-    existing_info = watchlist_map.get(code, {})
+    existing_info = watchlist_store.get(code, {})
     
     concept = existing_info.get("concept", "")
     # If concept is missing, try to fetch it
     if not concept:
         try:
-            info = await asyncio.to_thread(data_provider.fetch_stock_info, code)
+            info = await executors.market_io.run(data_provider.fetch_stock_info, code)
             concept = info.get('concept', '')
         except:
             pass
@@ -297,34 +198,17 @@ async def add_to_watchlist_api(code: str, name: str, reason: str = "手动添加
     }
     
     # Insert at top
-    favorites_data.insert(0, new_item)
-    save_favorites(favorites_data)
-    reload_watchlist_globals()
+    favorites_store.add(new_item)
     
     return {"status": "ok", "msg": "添加成功"}
 
 @app.get("/api/remove_watchlist")
 async def remove_from_watchlist_api(code: str):
-    global favorites_data, watchlist_data
-    
-    removed = False
+    # Remove from favorites and AI watchlist
+    removed_fav = favorites_store.remove(code)
+    removed_ai = watchlist_store.remove(code)
     
-    # Remove from favorites
-    original_len = len(favorites_data)
-    favorites_data = [item for item in favorites_data if item['code'] != code]
-    if len(favorites_data) < original_len:
-        save_favorites(favorites_data)
-        removed = True
-        
-    # Remove from AI watchlist
-    original_len_w = len(watchlist_data)
-    watchlist_data = [item for item in watchlist_data if item['code'] != code]
-    if len(watchlist_data) < original_len_w:
-        save_watchlist(watchlist_data)
-        removed = True
-    
-    if removed:
-        reload_watchlist_globals()
+    if removed_fav or removed_ai:
         return {"status": "ok", "msg": "删除成功"}
         
     return {"status": "error", "msg": "未找到该股票"}
@@ -344,121 +228,101 @@ def load_market_pools():
         except:
             pass
 
+def market_pools_snapshot():
+    return {
+        "limit_up": limit_up_pool_data,
+        "broken": broken_limit_pool_data,
+        "intraday": intraday_pool_data
+    }
+
 def save_market_pools():
-    """Save market pools to disk"""
-    try:
-        file_path = DATA_DIR / "market_pools.json"
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump({
-                "limit_up": limit_up_pool_data,
-                "broken": broken_limit_pool_data,
-                "intraday": intraday_pool_data
-            }, f, ensure_ascii=False)
-    except:
-        pass
+    """Mark market pools dirty (写盘由 persistence 后台合并，内容未变则跳过)"""
+    persistence.mark_dirty("market_pools")
+
+persistence.register("market_pools", DATA_DIR / "market_pools.json", market_pools_snapshot)
 
 # Load caches on startup
 load_market_pools()
-load_analysis_cache()
+analysis_store.load()
+news_store.load()
 
 async def update_market_pools_task():
+    """刷新涨停池 / 炸板池 (调度任务 market_pools，每 10 秒)"""
     global limit_up_pool_data, broken_limit_pool_data
-    loop = asyncio.get_event_loop()
-    while True:
-        try:
-            # Run blocking IO in executor
-            new_limit_up = await loop.run_in_executor(None, scan_limit_up_pool)
-            if new_limit_up is not None: # Only update if not None (failed)
-                limit_up_pool_data = new_limit_up
-            
-            new_broken = await loop.run_in_executor(None, scan_broken_limit_pool)
-            if new_broken is not None:
-                broken_limit_pool_data = new_broken
-                
-            await loop.run_in_executor(None, save_market_pools)
-        except Exception as e:
-            print(f"Pool update error: {e}")
+    # Run blocking IO in executor
+    new_limit_up = await executors.market_io.run(scan_limit_up_pool)
+    if new_limit_up is not None: # Only update if not None (failed)
+        limit_up_pool_data = new_limit_up
+    
+    new_broken = await executors.market_io.run(scan_broken_limit_pool)
+    if new_broken is not None:
+        broken_limit_pool_data = new_broken
         
-        await asyncio.sleep(10) # Update every 10 seconds
+    save_market_pools()
+    await data_hub.publish("limit_up", limit_up_pool_data)
+    await data_hub.publish("broken", broken_limit_pool_data)
+
+def in_intraday_window():
+    """盘中扫描时段 (工作日 9:00-15:00)"""
+    now = datetime.now()
+    return now.weekday() < 5 and 9 <= now.hour < 15
 
 async def update_intraday_pool_task():
-    """Fast loop for intraday scanner"""
-    global intraday_pool_data, limit_up_pool_data, watchlist_data, watchlist_map, WATCH_LIST
+    """盘中打板扫描 (调度任务 intraday_scan，交易时段每 10 秒，出错后退避 60 秒)"""
+    global intraday_pool_data, limit_up_pool_data
     from app.core.market_scanner import scan_intraday_limit_up
-    loop = asyncio.get_event_loop()
-    while True:
-        try:
-            # Only run during trading hours (approx) and weekdays
-            now = datetime.now()
-            if now.weekday() < 5 and 9 <= now.hour < 15:
-                result = await loop.run_in_executor(None, scan_intraday_limit_up)
-                if result:
-                    intraday_stocks, sealed_stocks = result
-                    intraday_pool_data = intraday_stocks
-                    
-                    # [Fix] 合并到关注列表，确保它们出现在主表且不会因为涨速下降而消失
-                    changed = False
-                    for s in intraday_stocks:
-                        if s['code'] not in watchlist_map:
-                            new_item = {
-                                "code": s['code'],
-                                "name": s['name'],
-                                "concept": s['concept'],
-                                "news_summary": s['reason'], # 统一使用 news_summary
-                                "strategy_type": "LimitUp",
-                                "added_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                                "initial_score": s.get('score', 0)
-                            }
-                            watchlist_data.append(new_item)
-                            watchlist_map[s['code']] = new_item
-                            changed = True
-                    
-                    if changed:
-                        # 更新全局监控列表并保存
-                        WATCH_LIST = list(set(list(watchlist_map.keys()) + list(favorites_map.keys())))
-                        await loop.run_in_executor(None, save_watchlist, watchlist_data)
-                    
-                    # [New] 竞价列表清理逻辑 (10:00 后清理竞价策略股票)
-                    if now.hour >= 10:
-                        cleanup_changed = False
-                        sealed_codes = {s['code'] for s in limit_up_pool_data}
-                        for item in watchlist_data:
-                            if item.get('strategy_type') == 'Aggressive' and '已剔除' not in item.get('news_summary', ''):
-                                if item['code'] not in sealed_codes:
-                                    item['strategy_type'] = 'Discarded'
-                                    item['news_summary'] = f"[竞价过期] {item.get('news_summary', '')}"
-                                    cleanup_changed = True
-                        
-                        if cleanup_changed:
-                            await loop.run_in_executor(None, save_watchlist, watchlist_data)
-                    
-                    # Merge sealed stocks into limit_up_pool_data if not already present
-                    if sealed_stocks:
-                        existing_codes = {s['code'] for s in limit_up_pool_data}
-                        for s in sealed_stocks:
-                            if s['code'] not in existing_codes:
-                                limit_up_pool_data.append(s)
-                                existing_codes.add(s['code'])
-            
-            # Normal sleep
-            await asyncio.sleep(10)
-            
-        except Exception as e:
-            print(f"Intraday scan error: {e}")
-            # Sleep longer on error to avoid hammering
-            await asyncio.sleep(60)
-
-if not WATCH_LIST:
-    WATCH_LIST = ['sh600519', 'sz002405', 'sz300059']
-
-def refresh_watchlist():
-    """刷新全局监控列表"""
-    global watchlist_data, watchlist_map, WATCH_LIST
-    watchlist_data = load_watchlist()
-    watchlist_map = {item['code']: item for item in watchlist_data}
-    WATCH_LIST = list(watchlist_map.keys())
-    if not WATCH_LIST:
-        WATCH_LIST = ['sh600519', 'sz002405', 'sz300059']
+    now = datetime.now()
+    result = await executors.market_io.run(scan_intraday_limit_up)
+    if result:
+        intraday_stocks, sealed_stocks = result
+        intraday_pool_data = intraday_stocks
+        
+        # [Fix] 合并到关注列表，确保它们出现在主表且不会因为涨速下降而消失
+        for s in intraday_stocks:
+            if s['code'] not in watchlist_store:
+                new_item = {
+                    "code": s['code'],
+                    "name": s['name'],
+                    "concept": s['concept'],
+                    "news_summary": s['reason'], # 统一使用 news_summary
+                    "strategy_type": "LimitUp",
+                    "added_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "initial_score": s.get('score', 0)
+                }
+                # 追加到末尾；一轮扫描的多次新增由 store 合并为一次写入
+                watchlist_store.add(new_item, front=False)
+        
+        # [New] 竞价列表清理逻辑 (10:00 后清理竞价策略股票)
+        if now.hour >= 10:
+            sealed_codes = {s['code'] for s in limit_up_pool_data}
+            for item in watchlist_store.items():
+                if item.get('strategy_type') == 'Aggressive' and '已剔除' not in item.get('news_summary', ''):
+                    if item['code'] not in sealed_codes:
+                        watchlist_store.update(
+                            item['code'],
+                            strategy_type='Discarded',
+                            news_summary=f"[竞价过期] {item.get('news_summary', '')}"
+                        )
+        
+        # Merge sealed stocks into limit_up_pool_data if not already present
+        if sealed_stocks:
+            existing_codes = {s['code'] for s in limit_up_pool_data}
+            for s in sealed_stocks:
+                if s['code'] not in existing_codes:
+                    limit_up_pool_data.append(s)
+                    existing_codes.add(s['code'])
+
+@app.websocket("/ws/data")
+async def data_websocket_endpoint(websocket: WebSocket):
+    """行情数据推送通道 (按主题订阅)"""
+    await data_hub.connect(websocket)
+    try:
+        while True:
+            await data_hub.handle(websocket, await websocket.receive_text())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        data_hub.disconnect(websocket)
 
 @app.websocket("/ws/logs")
 async def websocket_endpoint(websocket: WebSocket):
@@ -467,6 +331,8 @@ async def websocket_endpoint(websocket: WebSocket):
         while True:
             await websocket.receive_text() # Keep connection open
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
 
 @app.get("/api/search")
@@ -474,14 +340,11 @@ async def search_stock(q: str):
     """
     搜索股票 (支持代码、拼音、名称)
     """
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, lambda: data_provider.search_stock(q))
+    return await executors.cpu.run(data_provider.search_stock, q)
 
 @app.post("/api/add_stock")
 async def add_stock(code: str):
     """手动添加股票到监控列表"""
-    global watchlist_data, watchlist_map, WATCH_LIST
-    
     code = code.lower().strip()
     
     # 自动补全前缀
@@ -501,23 +364,14 @@ async def add_stock(code: str):
         return {"status": "error", "message": "Invalid code format"}
         
     # 如果已存在，强制更新为 Manual 策略
-    if code in watchlist_map:
-        watchlist_map[code]['strategy_type'] = 'Manual'
-        watchlist_map[code]['news_summary'] = '手动添加 (覆盖)'
-        # Save
-        try:
-            file_path = DATA_DIR / "watchlist.json"
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(watchlist_data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Error saving watchlist: {e}")
+    if watchlist_store.update(code, strategy_type='Manual', news_summary='手动添加 (覆盖)'):
         return {"status": "success", "message": "Updated to Manual"}
         
-    # 计算高级指标
-    metrics = calculate_metrics(code)
-    
-    # 获取股票详细信息 (名称 + 行业/概念)
-    name, concept = data_provider.get_stock_info(code)
+    # 计算高级指标 + 获取股票详细信息 (名称 + 行业/概念)，两个上游请求并发执行，不阻塞事件循环
+    metrics, (name, concept) = await asyncio.gather(
+        executors.market_io.run(calculate_metrics, code),
+        executors.market_io.run(data_provider.get_stock_info, code)
+    )
     
     # 添加新股票
     new_item = {
@@ -534,45 +388,15 @@ async def add_stock(code: str):
         "added_time": time.time() # Record add time for sorting
     }
     
-    # Check if exists to update instead of append (though we handled map above, list needs care)
-    existing_idx = -1
-    for i, item in enumerate(watchlist_data):
-        if item['code'] == code:
-            existing_idx = i
-            break
-            
-    if existing_idx >= 0:
-        watchlist_data[existing_idx] = new_item
-    else:
-        watchlist_data.insert(0, new_item) # Prepend to list
-        
-    watchlist_map[code] = new_item
-    if code not in WATCH_LIST:
-        WATCH_LIST.append(code)
-        
-    # 保存到文件
-    try:
-        file_path = DATA_DIR / "watchlist.json"
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(watchlist_data, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"Error saving watchlist: {e}")
+    # 已存在则原位替换，否则插入最前 (store 负责延迟落盘)
+    watchlist_store.add(new_item)
         
     return {"status": "success"}
 
-# 使用全局 Queue 来传递日志
-import queue
-log_queue = queue.Queue()
-
 async def log_broadcaster():
-    """从队列读取日志并广播"""
-    while True:
-        try:
-            # 非阻塞获取
-            msg = log_queue.get_nowait()
-            await manager.broadcast(msg)
-        except queue.Empty:
-            await asyncio.sleep(0.1)
+    """把日志通道中的消息 (按批) 广播给所有日志连接"""
+    log_pipeline.bind(asyncio.get_running_loop())
+    await log_pipeline.run(manager.broadcast)
 
 def update_limit_up_pool_task():
     """更新已涨停股票池"""
@@ -590,8 +414,8 @@ def update_limit_up_pool_task():
             
             # Check watchlist for reason
             reason = "市场强势涨停"
-            if code in watchlist_map:
-                reason = watchlist_map[code].get('news_summary', '自选股涨停')
+            if code in watchlist_store:
+                reason = watchlist_store.get(code).get('news_summary', '自选股涨停')
             
             stock['seal_rate'] = metrics['seal_rate']
             stock['broken_rate'] = metrics['broken_rate']
@@ -612,42 +436,58 @@ def update_limit_up_pool_task():
 
 @app.on_event("startup")
 async def startup_event():
-    # Load caches
-    load_analysis_cache()
-    
     # Update base info (CircMV etc) on startup
     print("Startup: Updating base stock info...")
-    await asyncio.to_thread(data_provider.update_base_info)
+    await executors.market_io.run(data_provider.update_base_info)
+    # 用基础信息构建个股实体索引 (新闻标注 / AI 代码校验)，拉取失败时用上次缓存的名称表
+    if not await executors.market_io.run(stock_index.refresh_from_provider, data_provider):
+        await executors.disk.run(stock_index.load)
     
     asyncio.create_task(log_broadcaster())
-    # Start background scheduler
-    asyncio.create_task(scheduler_loop())
-    # Start market pool updater
-    asyncio.create_task(update_market_pools_task())
-    # Start fast intraday scanner
-    asyncio.create_task(update_intraday_pool_task())
-    # Start periodic cleanup task
-    asyncio.create_task(periodic_cleanup_task())
-    
-    # 启动时立即执行一次盘中扫描，确保列表不为空
-    print("Startup: Running initial intraday scan...")
-    asyncio.create_task(run_initial_scan())
-
-async def periodic_cleanup_task():
-    """定期清理缓存文件"""
-    while True:
+    await executors.disk.run(news_tailer.load)
+    if WORKERS == 1:
+        # 单 worker: 无需选举与共享状态同步，直接运行后台任务
+        leader.start_standalone(on_leadership_change)
+        return
+    # 共享状态同步 (每个 worker)；后台任务只在选出的 leader 上运行 (见 on_leadership_change / register_jobs)
+    await executors.disk.run(seed_shared_stores)
+    worker_scheduler.add_job("shared_sync", shared_sync_task, IntervalTrigger(SHARED_SYNC_INTERVAL), run_immediately=True)
+    worker_scheduler.start()
+    loop = asyncio.get_running_loop()
+    leader.start(lambda is_leader: loop.call_soon_threadsafe(on_leadership_change, is_leader))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # 落盘尚在合并窗口内的修改 (列表 / 行情池 / 配置 / 缓存)
+    persistence.flush()
+    # 让出 leader 租约，其他 worker 无需等租约过期即可接管
+    leader.stop()
+    if WORKERS > 1:
         try:
-            print("Running periodic cleanup...")
-            # 1. 清理 AI 分析缓存 (7天)
-            cleanup_analysis_cache(max_age_days=7)
-            # 2. 清理 AI 原始数据缓存 (7天)
-            ai_cache.cleanup(max_age_seconds=7 * 86400)
-            
-            # 每 24 小时运行一次
-            await asyncio.sleep(86400)
+            shared_state.delete(f"subscribers:{shared_state.worker_id}")
         except Exception as e:
-            print(f"Cleanup task error: {e}")
-            await asyncio.sleep(3600)
+            print(f"Shared state cleanup failed: {e}")
+    shutdown_executors()
+
+def periodic_cleanup_task():
+    """定期清理缓存文件 (调度任务 cleanup，每 24 小时)"""
+    print("Running periodic cleanup...")
+    # 1. 回收已过期的 AI 分析缓存
+    removed = analysis_store.purge_expired()
+    if removed:
+        print(f"Cleanup: Removed {removed} expired analysis cache entries.")
+    # 2. 清理 AI 原始数据缓存 (7天)
+    ai_cache.cleanup(max_age_seconds=7 * 86400)
+    # 3. 共享状态中 follower 发布的缓存条目 (leader 已应用并落盘)
+    if WORKERS > 1:
+        for key in SHARED_CACHES:
+            shared_state.purge(f"{key}:", SHARED_CACHE_TTL)
+
+async def news_tailer_task():
+    """后台增量抓取新闻，新条目立即推送给前端 (调度任务 news_tailer)"""
+    new_items = await executors.market_io.run(news_tailer.poll)
+    if new_items:
+        await manager.broadcast(json.dumps({"type": "news", "items": new_items}, ensure_ascii=False))
 
 async def run_initial_scan():
     """启动时立即运行一次扫描"""
@@ -656,10 +496,11 @@ async def run_initial_scan():
         await asyncio.sleep(2)
         # 仅在交易日且配置开启时执行初始扫描
         if is_market_open_day() and SYSTEM_CONFIG["auto_analysis_enabled"]:
-            await asyncio.to_thread(execute_analysis, "intraday")
+            await asyncio.wrap_future(submit_analysis("intraday")[1])
             print("Startup: Initial scan completed.")
             # Update last run time to prevent immediate re-run by scheduler
             SYSTEM_CONFIG["last_run_time"] = time.time()
+            scheduler.reschedule("auto_analysis")
         else:
             print("Startup: Skipping initial scan (Non-trading day or disabled).")
     except Exception as e:
@@ -689,6 +530,9 @@ SYSTEM_CONFIG = {
     "news_auto_clean_days": 14
 }
 
+# 本进程通过 /api/config 修改配置的次数 (多 worker 部署时据此发布到共享状态)
+_config_changes = {"local": 0, "pushed": 0}
+
 def load_config():
     """Load configuration from disk"""
     global SYSTEM_CONFIG
@@ -704,19 +548,19 @@ def load_config():
         except Exception as e:
             print(f"Failed to load config: {e}")
 
+def config_snapshot():
+    return {
+        "auto_analysis_enabled": SYSTEM_CONFIG["auto_analysis_enabled"],
+        "use_smart_schedule": SYSTEM_CONFIG["use_smart_schedule"],
+        "fixed_interval_minutes": SYSTEM_CONFIG["fixed_interval_minutes"],
+        "schedule_plan": SYSTEM_CONFIG.get("schedule_plan", DEFAULT_SCHEDULE)
+    }
+
 def save_config():
-    """Save configuration to disk"""
-    config_path = DATA_DIR / "config.json"
-    try:
-        with open(config_path, "w", encoding="utf-8") as f:
-            json.dump({
-                "auto_analysis_enabled": SYSTEM_CONFIG["auto_analysis_enabled"],
-                "use_smart_schedule": SYSTEM_CONFIG["use_smart_schedule"],
-                "fixed_interval_minutes": SYSTEM_CONFIG["fixed_interval_minutes"],
-                "schedule_plan": SYSTEM_CONFIG.get("schedule_plan", DEFAULT_SCHEDULE)
-            }, f, indent=2, ensure_ascii=False)
-    except Exception as e:
-        print(f"Failed to save config: {e}")
+    """Save configuration to disk (后台原子写入)"""
+    persistence.mark_dirty("config")
+
+persistence.register("config", DATA_DIR / "config.json", config_snapshot, indent=2)
 
 # Load config on startup
 load_config()
@@ -750,15 +594,169 @@ async def update_config(config: ConfigUpdate):
     # [Fix] Reset last_run_time to now to prevent immediate scan if interval was reduced
     # This ensures the next scan happens AFTER the interval, not immediately.
     SYSTEM_CONFIG["last_run_time"] = time.time()
+    scheduler.reschedule("auto_analysis")
+    _config_changes["local"] += 1
     
     save_config() # Persist changes
     return {"status": "success", "config": SYSTEM_CONFIG}
 
-async def scheduler_loop():
-    """Background scheduler for periodic tasks"""
-    print("Starting background scheduler...")
-    last_pool_update_time = 0
+def resolve_analysis_schedule(now):
+    """
+    根据当前时间与配置计算复盘参数
+    返回 (interval_seconds, mode, lookback_hours, boundary)，boundary 为下一个规则切换时刻 (无则 None)
+    """
+    current_hour = now.hour
+    current_minute = now.minute
+    interval_seconds = 3600 # Default 1h
+    lookback_hours = 1
+    mode = "after_hours"
+    boundary = None
     
+    # Reset active rule index
+    SYSTEM_CONFIG["active_rule_index"] = -1
+    
+    if SYSTEM_CONFIG["use_smart_schedule"]:
+        current_time_str = now.strftime("%H:%M")
+        matched_rule = None
+        plan = SYSTEM_CONFIG.get("schedule_plan", DEFAULT_SCHEDULE)
+
+        for index, rule in enumerate(plan):
+            start = rule["start"]
+            end = rule["end"]
+            
+            # Check if time is in range
+            in_range = False
+            if start <= end:
+                if start <= current_time_str < end:
+                    in_range = True
+            else: # Cross midnight (e.g. 23:00 to 06:00)
+                if start <= current_time_str or current_time_str < end:
+                    in_range = True
+                    
+            if in_range:
+                matched_rule = rule
+                SYSTEM_CONFIG["active_rule_index"] = index
+                break
+        
+        if matched_rule:
+            interval_seconds = matched_rule["interval"] * 60
+            mode = matched_rule["mode"]
+            if matched_rule["mode"] == "none":
+                interval_seconds = 999999
+        
+        lookback_hours = max(0.25, interval_seconds / 3600)
+
+        # Special Trigger: Force run at 15:15 if last run was intraday (before 15:15)
+        if current_hour == 15 and current_minute >= 15:
+            last_run_dt = datetime.fromtimestamp(SYSTEM_CONFIG["last_run_time"]) if SYSTEM_CONFIG["last_run_time"] > 0 else datetime.fromtimestamp(0)
+            # If last run was today but before 15:15
+            if last_run_dt.date() == now.date() and (last_run_dt.hour < 15 or (last_run_dt.hour == 15 and last_run_dt.minute < 15)):
+                interval_seconds = 0 # Force run
+
+        # 下一个规则切换点 (任一规则的开始 / 结束时刻)，到时重新评估周期
+        points = {rule["start"] for rule in plan} | {rule["end"] for rule in plan} | {"15:15"}
+        for point in points:
+            try:
+                hour, minute = map(int, point.split(":"))
+            except ValueError:
+                continue
+            candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if candidate <= now:
+                candidate += timedelta(days=1)
+            if boundary is None or candidate.timestamp() < boundary:
+                boundary = candidate.timestamp()
+    else:
+        # Manual Interval
+        interval_seconds = SYSTEM_CONFIG["fixed_interval_minutes"] * 60
+        lookback_hours = SYSTEM_CONFIG["fixed_interval_minutes"] / 60
+        # Simple mode logic for manual
+        if (current_hour > 9 or (current_hour == 9 and current_minute >= 30)) and current_hour < 15:
+            mode = "intraday"
+        else:
+            mode = "after_hours"
+
+    return interval_seconds, mode, lookback_hours, boundary
+
+def in_close_gap(now):
+    """收盘等待时段 (15:00-15:15，仅智能调度)，不触发复盘"""
+    return SYSTEM_CONFIG["use_smart_schedule"] and now.hour == 15 and now.minute < 15
+
+def next_analysis_time(now_ts):
+    """自动复盘任务的下一次运行时间 (DynamicTrigger)"""
+    now = datetime.fromtimestamp(now_ts)
+    if not SYSTEM_CONFIG["auto_analysis_enabled"]:
+        SYSTEM_CONFIG["current_status"] = "已暂停"
+        # 开关通过 /api/config 打开时会立即重新调度，这里只是兜底
+        return now_ts + 60
+    if SYSTEM_CONFIG["current_status"] == "已暂停":
+        SYSTEM_CONFIG["current_status"] = "空闲中"
+    if not is_market_open_day():
+        # 非交易日: 次日零点再判断
+        return (now + timedelta(days=1)).replace(hour=0, minute=0, second=5, microsecond=0).timestamp()
+
+    interval_seconds, _, _, boundary = resolve_analysis_schedule(now)
+
+    # Safety check: If last_run_time is in the future, reset it
+    if SYSTEM_CONFIG["last_run_time"] > now_ts:
+        print(f"Resetting future last_run_time: {SYSTEM_CONFIG['last_run_time']} -> {now_ts}")
+        SYSTEM_CONFIG["last_run_time"] = now_ts - interval_seconds # Force run if needed
+
+    due = SYSTEM_CONFIG["last_run_time"] + interval_seconds
+    if in_close_gap(now):
+        due = max(due, now.replace(minute=15, second=0, microsecond=0).timestamp())
+    due = max(due, now_ts)
+    # Update Next Run Time for UI
+    SYSTEM_CONFIG["next_run_time"] = due
+    if boundary is not None and boundary < due:
+        # 先在规则切换时重新评估 (例如 15:15 从"收盘等待"切到"盘后复盘")
+        return boundary
+    return due
+
+def analysis_due():
+    """到点后再次确认 (规则切换点触发时可能尚未到期)"""
+    now_ts = time.time()
+    now = datetime.fromtimestamp(now_ts)
+    if not SYSTEM_CONFIG["auto_analysis_enabled"] or not is_market_open_day() or in_close_gap(now):
+        return False
+    interval_seconds, _, _, _ = resolve_analysis_schedule(now)
+    return now_ts - SYSTEM_CONFIG["last_run_time"] >= interval_seconds
+
+async def scheduled_analysis():
+    """自动复盘 (调度任务 auto_analysis)"""
+    current_timestamp = time.time()
+    interval_seconds, mode, lookback_hours, _ = resolve_analysis_schedule(datetime.now())
+    try:
+        mode_cn = "盘后复盘" if mode == "after_hours" else "盘中突击"
+        SYSTEM_CONFIG["current_status"] = f"正在运行 {mode_cn}..."
+        # Update last_run_time BEFORE execution to prevent loop on error
+        SYSTEM_CONFIG["last_run_time"] = current_timestamp
+        
+        # Recalculate next run time immediately after update
+        SYSTEM_CONFIG["next_run_time"] = current_timestamp + interval_seconds
+        
+        thread_logger(f">>> 触发定时分析: {mode}, 周期{interval_seconds/60:.0f}分, 回溯{lookback_hours}小时")
+        await asyncio.wrap_future(submit_analysis(mode, lookback_hours)[1])
+    finally:
+        SYSTEM_CONFIG["current_status"] = "空闲中"
+
+def lhb_sync_due():
+    return is_market_open_day() and lhb_manager.config['enabled'] and not job_runner.is_running("lhb_sync")
+
+def submit_lhb_sync():
+    """龙虎榜同步统一入口: 同一时间只运行一次，重复触发合并到正在运行的同步"""
+    return job_runner.submit("lhb_sync", lhb_manager.fetch_and_update_data, logger=thread_logger, label="LHB")
+
+async def scheduled_lhb_sync():
+    """龙虎榜每日同步 (调度任务 lhb_sync，18:00)"""
+    print(f"[{datetime.now()}] Auto-starting LHB sync...")
+    await asyncio.wrap_future(submit_lhb_sync()[1])
+
+def market_tick(now_ts):
+    """行情类任务的刷新周期: 交易时段快，非交易时段慢"""
+    return now_ts + (QUOTE_REFRESH_INTERVAL if is_trading_time() else QUOTE_IDLE_INTERVAL)
+
+def register_jobs():
+    """注册所有后台周期任务"""
     # Startup Check: If watchlist was updated recently (< 1 hour), skip immediate analysis
     # Check file modification time of watchlist.json
     try:
@@ -772,166 +770,268 @@ async def scheduler_loop():
     except Exception as e:
         print(f"Startup check failed: {e}")
 
-    while True:
-        try:
-            current_timestamp = time.time()
-            now = datetime.now()
-            current_hour = now.hour
-            current_minute = now.minute
-            
-            # Weekend Check (Saturday=5, Sunday=6)
-            if not is_market_open_day():
-                # Sleep longer on weekends
-                await asyncio.sleep(3600)
-                continue
-                
-            # --- Schedule Logic ---
-            interval_seconds = 3600 # Default 1h
-            lookback_hours = 1
-            mode = "after_hours"
-            
-            # Reset active rule index
-            SYSTEM_CONFIG["active_rule_index"] = -1
-            
-            if SYSTEM_CONFIG["use_smart_schedule"]:
-                current_time_str = now.strftime("%H:%M")
-                matched_rule = None
-                
-                # Default fallback
-                interval_seconds = 3600
-                mode = "after_hours"
-
-                for index, rule in enumerate(SYSTEM_CONFIG.get("schedule_plan", DEFAULT_SCHEDULE)):
-                    start = rule["start"]
-                    end = rule["end"]
-                    
-                    # Check if time is in range
-                    in_range = False
-                    if start <= end:
-                        if start <= current_time_str < end:
-                            in_range = True
-                    else: # Cross midnight (e.g. 23:00 to 06:00)
-                        if start <= current_time_str or current_time_str < end:
-                            in_range = True
-                            
-                    if in_range:
-                        matched_rule = rule
-                        SYSTEM_CONFIG["active_rule_index"] = index
-                        break
-                
-                if matched_rule:
-                    interval_seconds = matched_rule["interval"] * 60
-                    mode = matched_rule["mode"]
-                    if matched_rule["mode"] == "none":
-                        interval_seconds = 999999
-                
-                lookback_hours = max(0.25, interval_seconds / 3600)
-
-                # Special Trigger: Force run at 15:15 if last run was intraday (before 15:15)
-                if current_hour == 15 and current_minute >= 15:
-                    last_run_dt = datetime.fromtimestamp(SYSTEM_CONFIG["last_run_time"]) if SYSTEM_CONFIG["last_run_time"] > 0 else datetime.fromtimestamp(0)
-                    # If last run was today but before 15:15
-                    if last_run_dt.date() == now.date() and (last_run_dt.hour < 15 or (last_run_dt.hour == 15 and last_run_dt.minute < 15)):
-                        interval_seconds = 0 # Force run
-            else:
-                # Manual Interval
-                interval_seconds = SYSTEM_CONFIG["fixed_interval_minutes"] * 60
-                lookback_hours = SYSTEM_CONFIG["fixed_interval_minutes"] / 60
-                # Simple mode logic for manual
-                if (current_hour > 9 or (current_hour == 9 and current_minute >= 30)) and current_hour < 15:
-                    mode = "intraday"
-                else:
-                    mode = "after_hours"
-
-            # Safety check: If last_run_time is in the future, reset it
-            # [Moved here to ensure interval_seconds is defined]
-            if SYSTEM_CONFIG["last_run_time"] > current_timestamp:
-                print(f"Resetting future last_run_time: {SYSTEM_CONFIG['last_run_time']} -> {current_timestamp}")
-                SYSTEM_CONFIG["last_run_time"] = current_timestamp - interval_seconds # Force run if needed
-
-            # Update Next Run Time for UI
-            # If we just ran (last_run_time is very close to now), next run is now + interval
-            # If we haven't run in a while, next run is effectively "now" (pending execution)
-            if SYSTEM_CONFIG["last_run_time"] == 0:
-                SYSTEM_CONFIG["next_run_time"] = current_timestamp
-            else:
-                # Calculate next run based on last run
-                next_run = SYSTEM_CONFIG["last_run_time"] + interval_seconds
-                # If next run is in the past (overdue), show it as now
-                if next_run < current_timestamp:
-                    SYSTEM_CONFIG["next_run_time"] = current_timestamp
+    # Task 1: Analysis (智能调度 / 固定间隔)
+    scheduler.add_job("auto_analysis", scheduled_analysis,
+                      DynamicTrigger(next_analysis_time, "schedule_plan"), condition=analysis_due)
+    # Task 2: 行情快照 / 指数 / 情绪推送
+    scheduler.add_job("quote_snapshot", quote_snapshot_task, DynamicTrigger(market_tick, "market tick"),
+                      run_immediately=True)
+    scheduler.add_job("push_indices", push_indices_task, DynamicTrigger(market_tick, "market tick"),
+                      condition=lambda: topic_has_subscribers("indices"), run_immediately=True)
+    scheduler.add_job("push_sentiment", push_sentiment_task, IntervalTrigger(60),
+                      condition=lambda: topic_has_subscribers("sentiment"), run_immediately=True)
+    # Task 3: Update Limit Up Pool (Every 30 seconds, trading hours only)
+    scheduler.add_job("limit_up_enrich", update_limit_up_pool_task, IntervalTrigger(30),
+                      condition=is_trading_time, run_immediately=True, executor=executors.market_io)
+    # Task 4: LHB Sync (Daily at 18:00)
+    scheduler.add_job("lhb_sync", scheduled_lhb_sync, CronTrigger(18, 0, weekdays=range(5)),
+                      condition=lhb_sync_due, jitter=30)
+    # 市场池 / 盘中扫描 / 新闻增量 / 缓存清理
+    scheduler.add_job("market_pools", update_market_pools_task, IntervalTrigger(10), run_immediately=True)
+    scheduler.add_job("intraday_scan", update_intraday_pool_task, IntervalTrigger(10),
+                      condition=in_intraday_window, error_backoff=60, run_immediately=True)
+    scheduler.add_job("news_tailer", news_tailer_task, IntervalTrigger(NEWS_TAIL_INTERVAL), run_immediately=True)
+    scheduler.add_job("cleanup", periodic_cleanup_task, IntervalTrigger(86400),
+                      jitter=600, error_backoff=3600, run_immediately=True, executor=executors.disk)
+
+# ---- 多 worker 部署 (APP_WORKERS > 1) ----
+# leader (租约选举) 运行全部后台任务与互斥任务；follower 只处理读请求和 WebSocket 推送，
+# 进程间通过 shared_state 同步: 列表按 code 逐条同步 (<列表>:item:<code>，各 worker 的修改互不覆盖，
+# 同一只股票后写覆盖)，配置任何 worker 都可写 (后写覆盖)，
+# follower 上算出的 AI 缓存 / 个股分析按 key 发布 (<缓存>:<key>)，所有 worker 应用，由 leader 落盘，
+# 行情池 / 行情快照 / 推送主题 / 任务状态 / 日志由 leader 发布，复盘等触发请求转交 leader 执行
+SHARED_SYNC_INTERVAL = float(os.getenv("SHARED_SYNC_INTERVAL", "1"))
+# 共享状态中的缓存条目保留时长 (秒)，过后由 leader 的清理任务删除 (已落盘)
+SHARED_CACHE_TTL = 86400
+# 由 leader 维护、follower 不覆盖的运行时字段
+LEADER_CONFIG_FIELDS = ("current_status", "next_run_time", "active_rule_index")
+SHARED_STORES = {"watchlist": watchlist_store, "favorites": favorites_store}
+SHARED_CACHES = {"ai_cache": ai_cache, "analysis": analysis_store}
+
+worker_scheduler = JobScheduler()  # 每个 worker 都运行的任务 (共享状态同步)
+_shared_known = {}  # key -> 已应用的版本
+_leader_status = {}  # follower 缓存的 leader 任务状态 (jobs / scheduler)
+_remote_subscribers = {}  # subscribers:<worker_id> -> 该 worker 订阅的主题
+_log_cursor = {"exported": 0, "tail": None}
+_quotes_pushed = {"refreshes": -1}
+_stores_pending_reset = set()  # 首次同步时以共享状态为准替换本地列表
+_initial_scan_started = False  # 启动扫描每个进程只执行一次
+
+def seed_shared_stores():
+    """
+    启动时 (磁盘线程池): 共享状态中还没有列表时，用本进程从磁盘加载的列表初始化 (只有一个 worker 会成功)；
+    否则首次同步时以共享状态为准
+    """
+    for key, store in SHARED_STORES.items():
+        items, order = store.shared_rows()
+        rows = {f"{key}:item:{code}": item for code, item in items.items()}
+        rows[f"{key}:order"] = order
+        if not shared_state.seed(f"{key}:seeded", rows):
+            _stores_pending_reset.add(key)
+
+def topic_has_subscribers(topic):
+    """本进程或任一 worker 上有订阅者"""
+    return data_hub.has_subscribers(topic) or any(topic in topics for topics in _remote_subscribers.values())
+
+def is_job_running(name):
+    if leader.is_leader:
+        return job_runner.is_running(name)
+    return (_leader_status.get("jobs", {}).get(name) or {}).get("running") is not None
+
+def collect_shared_push(is_leader):
+    """在事件循环中收集本进程要发布的状态 (只做快照，不做 IO)"""
+    puts = {}
+    # leader 每次都发布 (含运行状态)；follower 只在本地修改过配置时发布，避免旧副本覆盖 leader
+    if is_leader or _config_changes["local"] != _config_changes["pushed"]:
+        puts["system_config"] = dict(SYSTEM_CONFIG)
+    deletes = []
+    synced = []
+    for key, store in SHARED_STORES.items():
+        unsynced = store.unsynced_changes()
+        if unsynced:
+            version, changes, order = unsynced
+            for code, item in changes.items():
+                if item is None:
+                    deletes.append(f"{key}:item:{code}")
                 else:
-                    SYSTEM_CONFIG["next_run_time"] = next_run
-
-            # Task 1: Analysis
-            if SYSTEM_CONFIG["auto_analysis_enabled"]:
-                if current_timestamp - SYSTEM_CONFIG["last_run_time"] >= interval_seconds:
-                    # Special check to avoid running during the 15:00-15:15 gap (only in smart mode)
-                    should_run = True
-                    if SYSTEM_CONFIG["use_smart_schedule"] and (current_hour == 15 and current_minute < 15):
-                        should_run = False
-                    
-                    if should_run:
-                        try:
-                            mode_cn = "盘后复盘" if mode == "after_hours" else "盘中突击"
-                            SYSTEM_CONFIG["current_status"] = f"正在运行 {mode_cn}..."
-                            # Update last_run_time BEFORE execution to prevent loop on error
-                            SYSTEM_CONFIG["last_run_time"] = current_timestamp
-                            
-                            # Recalculate next run time immediately after update
-                            SYSTEM_CONFIG["next_run_time"] = current_timestamp + interval_seconds
-                            
-                            thread_logger(f">>> 触发定时分析: {mode}, 周期{interval_seconds/60:.0f}分, 回溯{lookback_hours}小时")
-                            await asyncio.to_thread(execute_analysis, mode, lookback_hours)
-                        except Exception as e:
-                            print(f"Scheduler error: {e}")
-                        finally:
-                            SYSTEM_CONFIG["current_status"] = "空闲中"
+                    puts[f"{key}:item:{code}"] = item
+            if order is not None:
+                puts[f"{key}:order"] = order
+            synced.append((store, version))
+    for key, cache in SHARED_CACHES.items():
+        unsynced = cache.unsynced_changes()
+        if unsynced:
+            version, entries = unsynced
+            for cache_key, entry in entries.items():
+                puts[f"{key}:{cache_key}"] = entry
+            synced.append((cache, version))
+    topics = sorted({t for topics in data_hub.clients.values() for t in topics})
+    puts[f"subscribers:{shared_state.worker_id}"] = topics
+    logs = []
+    if is_leader:
+        puts["market_pools"] = {name: list(pool) for name, pool in market_pools_snapshot().items()}
+        for topic, entry in data_hub.latest.items():
+            if topic != "stocks":
+                puts[f"topic:{topic}"] = entry["state"]
+        if quote_snapshot.refreshes != _quotes_pushed["refreshes"]:
+            _quotes_pushed["refreshes"] = quote_snapshot.refreshes
+            puts["quotes"] = {"codes": list(quote_snapshot.codes), "stocks": quote_snapshot.stocks}
+        puts["jobs"] = job_runner.snapshot()
+        puts["scheduler"] = scheduler.snapshot()
+        _log_cursor["exported"], logs = log_pipeline.since(_log_cursor["exported"])
+    return puts, deletes, synced, logs
+
+def exchange_shared_state(is_leader, puts, deletes, logs):
+    """在磁盘线程池中执行: 写入本进程状态，读取其他 worker 的变化"""
+    for key, value in puts.items():
+        shared_state.put(key, value)
+    for key in deletes:
+        shared_state.delete(key)
+    shared_state.append_logs(logs)
+    updates = shared_state.changed(_shared_known)
+    commands = shared_state.take_commands() if is_leader else []
+    lines = []
+    if not is_leader:
+        _log_cursor["tail"], lines = shared_state.logs_since(_log_cursor["tail"])
+    # leader 追加的新闻段 / 其他 worker 清理的新闻
+    news_store.refresh()
+    return updates, commands, lines
+
+async def shared_sync_task():
+    """共享状态同步 (worker 任务 shared_sync，每个 worker 都运行)"""
+    global limit_up_pool_data, broken_limit_pool_data, intraday_pool_data
+    is_leader = leader.is_leader
+    config_version = _config_changes["local"]
+    puts, deletes, synced, logs = collect_shared_push(is_leader)
+    updates, commands, lines = await executors.disk.run(exchange_shared_state, is_leader, puts, deletes, logs)
+    _config_changes["pushed"] = config_version
+    for store, version in synced:
+        store.mark_synced(version)
+
+    store_changes = {key: ({}, None) for key in SHARED_STORES}
+    cache_changes = {key: {} for key in SHARED_CACHES}
+    for key, (_, _, value) in updates.items():
+        name, _, rest = key.partition(":")
+        if name in SHARED_CACHES:
+            if value is not None:
+                cache_changes[name][rest] = value
+        elif name in SHARED_STORES:
+            changes, _ = store_changes[name]
+            if rest.startswith("item:"):
+                changes[rest[len("item:"):]] = value
+            elif rest == "order" and value is not None:
+                store_changes[name] = (changes, value)
+        elif key.startswith("subscribers:"):
+            if value is None:
+                _remote_subscribers.pop(key, None)
             else:
-                SYSTEM_CONFIG["current_status"] = "已暂停"
-            
-            # Task 2: Refresh Quotes (Every 3 seconds)
-            # Only during trading hours or shortly after
-            if now.weekday() < 5 and (9 <= current_hour < 16):
-                try:
-                    stocks = await asyncio.to_thread(get_stock_quotes)
-                except Exception as e:
-                    pass
-                
-            # Task 3: Update Limit Up Pool (Every 30 seconds)
-            if current_timestamp - last_pool_update_time >= 30:
-                # Only during trading hours
-                if is_trading_time():
-                    await asyncio.to_thread(update_limit_up_pool_task)
-                    last_pool_update_time = current_timestamp
-
-            # Task 4: LHB Sync (Daily at 18:00)
-            if is_market_open_day() and now.hour == 18 and now.minute == 0 and now.second < 10:
-                if lhb_manager.config['enabled'] and not lhb_manager.is_syncing:
-                    print(f"[{now}] Auto-starting LHB sync...")
-                    # Run in executor to avoid blocking loop
-                    loop = asyncio.get_event_loop()
-                    loop.run_in_executor(None, lhb_manager.fetch_and_update_data, lambda msg: asyncio.run(manager.broadcast(msg)))
-                    # Sleep to avoid multiple triggers
-                    await asyncio.sleep(60)
-
-            await asyncio.sleep(5) # Check every 5 seconds
-            
-        except Exception as e:
-            print(f"Scheduler loop crashed: {e}")
-            await asyncio.sleep(60) # Sleep and retry
+                _remote_subscribers[key] = set(value)
+        elif value is None:
+            continue
+        elif key == "system_config":
+            apply_shared_config(value, is_leader)
+        elif is_leader:
+            # 行情 / 任务状态以 leader 自己的为准 (可能是上一任 leader 留下的)
+            continue
+        elif key == "market_pools":
+            limit_up_pool_data = value.get("limit_up", [])
+            broken_limit_pool_data = value.get("broken", [])
+            intraday_pool_data = value.get("intraday", [])
+        elif key == "quotes":
+            codes = watched_codes()
+            if set(value["codes"]) == set(codes):
+                quote_snapshot.adopt(value["stocks"], codes, watched_version())
+            await data_hub.publish("stocks", value["stocks"])
+        elif key.startswith("topic:"):
+            await data_hub.publish(key[len("topic:"):], value)
+        elif key in ("jobs", "scheduler"):
+            _leader_status[key] = value
+
+    for key, (changes, order) in store_changes.items():
+        reset = key in _stores_pending_reset
+        if changes or order is not None or reset:
+            SHARED_STORES[key].apply_shared(changes, order, reset=reset)
+            _stores_pending_reset.discard(key)
+    for key, entries in cache_changes.items():
+        if entries:
+            SHARED_CACHES[key].apply_shared(entries)
+
+    for line in lines:
+        log_pipeline.emit(line)
+    for name, payload in commands:
+        run_shared_command(name, payload)
+
+def apply_shared_config(config, is_leader):
+    """应用其他 worker 修改的配置；leader 保留自己维护的运行时字段并按新配置重排复盘"""
+    for key, value in config.items():
+        if is_leader and key in LEADER_CONFIG_FIELDS:
+            continue
+        SYSTEM_CONFIG[key] = value
+    if is_leader:
+        scheduler.reschedule("auto_analysis")
+
+def run_shared_command(name, payload):
+    """leader 执行 follower 转交的请求"""
+    print(f"[Leader] Running forwarded command: {name} {payload}")
+    if name == "analyze":
+        submit_analysis(payload.get("mode", "after_hours"), policy="queue")
+    elif name == "lhb_sync":
+        submit_lhb_sync()
+    elif name == "cancel":
+        job_runner.cancel(payload.get("name"))
+
+async def forward_to_leader(name, payload=None):
+    await executors.disk.run(shared_state.enqueue, name, payload)
+
+def on_leadership_change(is_leader):
+    """在事件循环中调用: 成为 leader 时启动后台任务，失去 leader 身份时停止"""
+    global _initial_scan_started
+    if is_leader:
+        # 只导出成为 leader 之后的日志 (之前的已由上一任 leader 导出)
+        _log_cursor["exported"] = log_pipeline.stats["emitted"]
+        _quotes_pushed["refreshes"] = -1
+        if WORKERS > 1:
+            # 由 leader 落盘 (缓存先合并上一任 leader 写入的内容，读文件放到磁盘线程池)
+            for owner in LEADER_PERSISTED:
+                executors.disk.submit(owner.set_persist, True)
+        register_jobs()
+        scheduler.start()
+        # 首次成为 leader 时立即执行一次盘中扫描，确保列表不为空 (租约抖动后重新当选不再重复)
+        if not _initial_scan_started:
+            _initial_scan_started = True
+            print("Startup: Running initial intraday scan...")
+            asyncio.create_task(run_initial_scan())
+    else:
+        scheduler.stop()
+        for owner in LEADER_PERSISTED:
+            owner.set_persist(False)
+        # 新 leader 会接管，本进程上正在运行的互斥任务停在下一个检查点
+        job_runner.cancel("analysis")
+        job_runner.cancel("lhb_sync")
 
 def thread_logger(msg):
     """线程安全的 logger"""
-    log_queue.put(msg)
+    log_pipeline.emit(msg)
 
 @app.post("/api/analyze")
-async def run_analysis(background_tasks: BackgroundTasks, mode: str = Query("after_hours")):
-    """触发复盘分析"""
-    # 在后台运行，不阻塞 API
-    background_tasks.add_task(execute_analysis, mode)
+async def run_analysis(mode: str = Query("after_hours")):
+    """触发复盘分析 (已有分析在运行时排队，相同参数的排队请求只保留一个)"""
+    if not leader.is_leader:
+        await forward_to_leader("analyze", {"mode": mode})
+        return {"status": "success", "message": f"{mode} analysis forwarded to the leader worker"}
+    status, _ = submit_analysis(mode, policy="queue")
+    if status == "queued":
+        return {"status": "success", "message": f"{mode} analysis queued (another analysis is running)"}
     return {"status": "success", "message": f"{mode} analysis started in background"}
 
+def submit_analysis(mode="after_hours", hours=None, policy="coalesce"):
+    """
+    复盘分析统一入口 (定时任务 / 手动触发 / 启动扫描)
+    同一时间只运行一个分析，避免重复请求上游与 LLM、并发改写 watchlist.json
+    """
+    return job_runner.submit("analysis", execute_analysis, mode, hours, policy=policy,
+                             label="盘后复盘" if mode == "after_hours" else "盘中突击")
+
 def execute_analysis(mode="after_hours", hours=None):
     try:
         mode_name = "盘后复盘" if mode == "after_hours" else "盘中突击"
@@ -940,26 +1040,34 @@ def execute_analysis(mode="after_hours", hours=None):
         # Clean watchlist before analysis (remove old/irrelevant)
         clean_watchlist()
         
-        generate_watchlist(logger=thread_logger, mode=mode, hours=hours, update_callback=refresh_watchlist)
-        refresh_watchlist()
-        # Reload globals so /api/stocks returns new data
-        reload_watchlist_globals()
-        thread_logger(f">>> {mode_name}任务完成，列表已更新 ({len(WATCH_LIST)} 个标的)。")
+        # 复盘基于开始时的快照计算，结果在 store 锁内合并: 期间的手动添加 / 删除 / 盘中扫描不会被覆盖
+        baseline = watchlist_store.snapshot_map()
+
+        def publish(items):
+            nonlocal baseline
+            baseline = watchlist_store.merge(items, baseline, key=watchlist_sort_key)
+
+        picks, _ = generate_watchlist(logger=thread_logger, mode=mode, hours=hours,
+                                      update_callback=publish, existing=list(baseline.values()))
+        publish(picks)
+        thread_logger(f">>> {mode_name}任务完成，列表已更新 ({len(watched_codes())} 个标的)。")
     except Exception as e:
         thread_logger(f"!!! 分析任务出错: {e}")
         print(f"Analysis Error: {e}")
 
 
-def get_stock_quotes():
+def get_stock_quotes(watch_list=None):
     """
     获取股票行情，使用统一的 DataProvider
     """
-    if not WATCH_LIST:
+    if watch_list is None:
+        watch_list = watched_codes()
+    if not watch_list:
         return []
         
     try:
         # Fetch raw quotes
-        raw_stocks = data_provider.fetch_quotes(WATCH_LIST)
+        raw_stocks = data_provider.fetch_quotes(watch_list)
         
         # Enrich with strategy info
         enriched_stocks = []
@@ -970,8 +1078,8 @@ def get_stock_quotes():
             ai_strategy = "Neutral"
             
             # 1. Check AI Watchlist for strategy & info
-            if code in watchlist_map:
-                ai_info = watchlist_map[code]
+            ai_info = watchlist_store.get(code)
+            if ai_info is not None:
                 ai_strategy = ai_info.get("strategy_type", "Neutral")
                 
                 # Use AI info as base
@@ -1002,12 +1110,12 @@ def get_stock_quotes():
                             stock['reason'] = f"[弱转强] {stock['reason']}"
 
             # 2. Check Favorites
-            if code in favorites_map:
-                fav_info = favorites_map[code]
+            fav_info = favorites_store.get(code)
+            if fav_info is not None:
                 stock['is_favorite'] = True
                 
                 # If NOT in AI list, use Favorite info
-                if code not in watchlist_map:
+                if ai_info is None:
                     stock['concept'] = fav_info.get("concept", stock.get('concept', '-'))
                     stock['reason'] = fav_info.get("reason", "手动添加")
                     stock['initial_score'] = fav_info.get("initial_score", 0)
@@ -1028,7 +1136,6 @@ def get_stock_quotes():
 @app.post("/api/watchlist/remove")
 async def remove_from_watchlist(request: Request):
     """从自选列表中移除股票"""
-    global watchlist_data, watchlist_map, WATCH_LIST, favorites_data, favorites_map
     try:
         data = await request.json()
         code = data.get("code")
@@ -1037,19 +1144,14 @@ async def remove_from_watchlist(request: Request):
         removed = False
         if code:
             # Remove from favorites
-            if (list_type == 'favorite' or list_type == 'all') and code in favorites_map:
-                favorites_data = [item for item in favorites_data if item['code'] != code]
-                save_favorites(favorites_data)
+            if (list_type == 'favorite' or list_type == 'all') and favorites_store.remove(code):
                 removed = True
                 
             # Remove from watchlist
-            if (list_type == 'ai' or list_type == 'all') and code in watchlist_map:
-                watchlist_data = [item for item in watchlist_data if item['code'] != code]
-                save_watchlist(watchlist_data)
+            if (list_type == 'ai' or list_type == 'all') and watchlist_store.remove(code):
                 removed = True
                 
             if removed:
-                reload_watchlist_globals()
                 return {"status": "success", "message": f"Removed {code}"}
                 
         return {"status": "error", "message": "Stock not found"}
@@ -1058,12 +1160,18 @@ async def remove_from_watchlist(request: Request):
 
 @app.get("/api/stocks")
 async def api_stocks():
-    return get_stock_quotes()
+    """读取共享行情快照 (由 quote_snapshot_task 统一刷新)"""
+    return await quote_snapshot.get(get_stock_quotes, watched_codes(), watched_version())
+
+async def quote_snapshot_task():
+    """行情快照生产者: 每个周期抓取并加工一次监控列表行情，并推送给订阅者 (调度任务 quote_snapshot)"""
+    stocks = await quote_snapshot.refresh(get_stock_quotes, watched_codes(), watched_version())
+    await data_hub.publish("stocks", stocks)
 
 @app.get("/api/indices")
 async def api_indices():
     """快速获取大盘指数"""
-    return data_provider.fetch_indices()
+    return await executors.market_io.run(data_provider.fetch_indices)
 
 @app.get("/api/limit_up_pool")
 async def api_limit_up_pool():
@@ -1081,8 +1189,7 @@ async def api_intraday_pool():
         
     # Fallback if empty (e.g. startup)
     from app.core.market_scanner import scan_intraday_limit_up
-    loop = asyncio.get_event_loop()
-    stocks = await loop.run_in_executor(None, scan_intraday_limit_up)
+    stocks = await executors.market_io.run(scan_intraday_limit_up)
     if stocks:
         intraday_pool_data = stocks
     return stocks
@@ -1090,8 +1197,19 @@ async def api_intraday_pool():
 @app.get("/api/market_sentiment")
 async def api_market_sentiment():
     """获取大盘情绪数据"""
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, get_market_overview)
+    return await executors.market_io.run(get_market_overview)
+
+async def push_indices_task():
+    """指数推送 (调度任务 push_indices，只在有订阅者时抓取，与连接数无关)"""
+    indices = await executors.market_io.run(data_provider.fetch_indices)
+    if indices:
+        await data_hub.publish("indices", indices)
+
+async def push_sentiment_task():
+    """大盘情绪推送 (调度任务 push_sentiment，每分钟，只在有订阅者时抓取)"""
+    sentiment = await executors.market_io.run(get_market_overview)
+    if sentiment:
+        await data_hub.publish("sentiment", sentiment)
 
 class StockAnalysisRequest(BaseModel):
     code: str
@@ -1120,61 +1238,85 @@ async def api_analyze_stock(request: StockAnalysisRequest):
     # Construct composite cache key
     cache_key = f"{code}_{prompt_type}"
     
-    # Check Cache
-    if not force and cache_key in ANALYSIS_CACHE:
-        cache_entry = ANALYSIS_CACHE[cache_key]
-        cache_time = datetime.fromtimestamp(cache_entry['timestamp'])
-        now = datetime.now()
-        
-        # Expiry Logic
-        is_expired = False
-        
-        # 1. Basic Date Check: If cache is from yesterday, it's expired
-        if cache_time.date() < now.date():
-            is_expired = True
-        
-        # 2. Specific Logic based on promptType
-        if not is_expired:
-            if prompt_type == 'min_trading_signal':
-                # Minute analysis: Expire if new trading day starts (e.g. after 9:30)
-                # If cache is from before 9:30 today, and now is after 9:30, expire it?
-                # Or simply: Minute analysis is valid for the day, but if we are in a new day (handled by date check), it's gone.
-                # User requirement: "分时的分析新的交易日开盘后可以删除"
-                # This implies if I analyze at 10:00, and now it's 11:00, it's still valid.
-                # But if I analyze yesterday, it's invalid (handled by date).
-                # What if I analyze at 9:00 (pre-market)? It might be invalid after 9:30.
-                if cache_time.hour < 9 and cache_time.minute < 30 and (now.hour > 9 or (now.hour == 9 and now.minute >= 30)):
-                    is_expired = True
-            
-            elif prompt_type == 'day_trading_signal':
-                # Day analysis: "Wait until trading day is no longer visible" -> Keep for the whole day.
-                # Do NOT expire at 15:00.
-                pass
-            
-            else:
-                # Default logic for other types: Expire at 15:00
-                if cache_time.hour < 15 and now.hour >= 15:
-                    is_expired = True
-            
-        if not is_expired:
+    # Check Cache (expiry precomputed on write, see analysis_store.compute_expiry)
+    if not force:
+        cache_entry = analysis_store.get(cache_key)
+        if cache_entry:
             return {"status": "success", "analysis": cache_entry['content'], "cached": True}
 
-    loop = asyncio.get_event_loop()
-    # Pass promptType explicitly or let analyze_single_stock handle it from stock_data
-    # Pass api_key if provided
-    result = await loop.run_in_executor(None, lambda: analyze_single_stock(stock_data, prompt_type=prompt_type, api_key=api_key))
-    
-    # Update Cache
-    if result and not result.startswith("分析失败"):
-        ANALYSIS_CACHE[cache_key] = {
-            "content": result,
-            "timestamp": time.time()
-        }
-        # Persist cache to disk
-        save_analysis_cache()
+    async def run_analysis():
+        # Pass promptType explicitly or let analyze_single_stock handle it from stock_data
+        # Pass api_key if provided
+        result = await executors.llm.run(analyze_single_stock, stock_data, prompt_type=prompt_type, api_key=api_key)
         
+        # Update Cache
+        if result and not result.startswith("分析失败"):
+            # Persisted by the store's background writer
+            analysis_store.set(cache_key, result, prompt_type)
+        return result
+
+    # 同一 cache_key 的并发请求 (含进行中的流式分析) 共享一次 AI 调用
+    try:
+        result = await ai_inflight.run("analyze_stock", cache_key, run_analysis)
+    except Exception as e:
+        result = f"分析失败: {e}"
+
     return {"status": "success", "analysis": result, "cached": False}
 
+def _payload_digest(*parts):
+    """请求内容摘要，用作 single-flight key 的一部分"""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()[:16]
+
+def _sse_event(data):
+    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/api/analyze_stock/stream")
+async def api_analyze_stock_stream(request: StockAnalysisRequest):
+    """
+    流式个股AI分析 (SSE)，token 到达即转发，完成后写入分析缓存
+    事件格式: data: {"delta": "..."} ... data: {"done": true, "cached": bool}
+    生成失败时在 done 之前发送 data: {"error": "..."}
+    """
+    stock_data = request.dict()
+    prompt_type = request.promptType
+    cache_key = f"{request.code}_{prompt_type}"
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+    if not request.force:
+        cache_entry = analysis_store.get(cache_key)
+        if cache_entry:
+            content = cache_entry['content']
+            if not isinstance(content, str):
+                # 结构化结果 (如 trading_signal 的 dict) 以 JSON 文本下发，前端按文本拼接
+                content = json.dumps(content, ensure_ascii=False)
+
+            def cached_events():
+                yield _sse_event({"delta": content})
+                yield _sse_event({"done": True, "cached": True})
+            return StreamingResponse(cached_events(), media_type="text/event-stream", headers=headers)
+
+    def produce():
+        # Runs once per cache_key in a worker thread, shared by concurrent subscribers
+        outcome = {}
+        parts = []
+        for delta in stream_single_stock_analysis(stock_data, api_key=request.apiKey, force_update=request.force, outcome=outcome):
+            parts.append(delta)
+            yield delta
+        if outcome.get('complete'):
+            analysis_store.set(cache_key, "".join(parts), prompt_type)
+
+    async def event_stream():
+        # 与 /api/analyze_stock 共用 namespace: 同一只股票同时只有一次 AI 调用
+        try:
+            async for delta in ai_inflight.stream("analyze_stock", cache_key, produce):
+                yield _sse_event({"delta": delta})
+        except Exception as e:
+            yield _sse_event({"error": f"分析失败: {e}"})
+        yield _sse_event({"done": True, "cached": False})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=headers)
+
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
@@ -1191,26 +1333,30 @@ class LHBConfigRequest(BaseModel):
 
 @app.get("/api/lhb/config")
 async def get_lhb_config():
-    lhb_manager.load_config()
+    await executors.disk.run(lhb_manager.load_config)
     return lhb_manager.config
 
 @app.post("/api/lhb/config")
 async def update_lhb_config(config: LHBConfigRequest):
-    lhb_manager.update_settings(config.enabled, config.days, config.min_amount)
+    await executors.disk.run(lhb_manager.update_settings, config.enabled, config.days, config.min_amount)
     return {"status": "ok", "config": lhb_manager.config}
 
 @app.post("/api/lhb/sync")
-async def sync_lhb_data(background_tasks: BackgroundTasks):
+async def sync_lhb_data():
     """Trigger LHB sync in background"""
-    if lhb_manager.is_syncing:
+    if not leader.is_leader:
+        if is_job_running("lhb_sync"):
+            return {"status": "error", "message": "Sync already in progress"}
+        await forward_to_leader("lhb_sync")
+        return {"status": "ok", "message": "LHB sync forwarded to the leader worker"}
+    status, _ = submit_lhb_sync()
+    if status != "started":
         return {"status": "error", "message": "Sync already in progress"}
-        
-    background_tasks.add_task(lhb_manager.fetch_and_update_data, logger=lambda msg: asyncio.run(manager.broadcast(msg)))
     return {"status": "ok", "message": "LHB sync started in background"}
 
 @app.get("/api/lhb/status")
 async def get_lhb_status():
-    return {"is_syncing": lhb_manager.is_syncing}
+    return {"is_syncing": is_job_running("lhb_sync")}
 
 @app.get("/lhb", response_class=HTMLResponse)
 async def read_lhb_page(request: Request):
@@ -1218,22 +1364,24 @@ async def read_lhb_page(request: Request):
 
 @app.get("/api/lhb/dates")
 async def get_lhb_dates():
-    return lhb_manager.get_available_dates()
+    # 读取并解析整个龙虎榜 CSV，放到磁盘线程池
+    return await executors.disk.run(lhb_manager.get_available_dates)
 
 @app.get("/api/lhb/history")
 async def get_lhb_history(date: str):
-    return lhb_manager.get_daily_data(date)
+    return await executors.disk.run(lhb_manager.get_daily_data, date)
 
 class LHBAnalyzeRequest(BaseModel):
     date: str
 
 @app.post("/api/lhb/analyze_daily")
 async def analyze_lhb_daily_api(req: LHBAnalyzeRequest):
-    # Run in thread pool
-    loop = asyncio.get_event_loop()
-    # Fetch data first
-    data = lhb_manager.get_daily_data(req.date)
-    result = await loop.run_in_executor(None, lambda: analyze_daily_lhb(req.date, data))
+    async def run_analysis():
+        # Fetch data first (读 CSV，放到磁盘线程池)
+        data = await executors.disk.run(lhb_manager.get_daily_data, req.date)
+        return await executors.llm.run(analyze_daily_lhb, req.date, data)
+
+    result = await ai_inflight.run("lhb_analyze_daily", req.date, run_analysis)
     return {"status": "ok", "analysis": result}
 
 @app.get("/api/data/backup")
@@ -1284,11 +1432,16 @@ class AnalyzeRequest(BaseModel):
     kline_data: Optional[List] = None
 
 @app.post("/api/lhb/fetch")
-async def fetch_lhb_data(background_tasks: BackgroundTasks):
+async def fetch_lhb_data():
     """手动触发龙虎榜数据抓取"""
-    if lhb_manager.is_syncing:
+    if not leader.is_leader:
+        if is_job_running("lhb_sync"):
+            return {"status": "error", "message": "同步任务正在进行中，请稍后再试"}
+        await forward_to_leader("lhb_sync")
+        return {"status": "success", "message": "龙虎榜数据同步任务已转交后台 worker"}
+    status, _ = submit_lhb_sync()
+    if status != "started":
         return {"status": "error", "message": "同步任务正在进行中，请稍后再试"}
-    background_tasks.add_task(lhb_manager.fetch_and_update_data)
     return {"status": "success", "message": "龙虎榜数据同步任务已在后台启动"}
 
 @app.post("/api/stock/analyze")
@@ -1305,32 +1458,151 @@ async def analyze_stock_manual(request: AnalyzeRequest):
         "kline_data": request.kline_data
     }
     
-    try:
-        # If turnover/circ_mv missing, try to fetch from market data
-        if stock_data['turnover'] is None or stock_data['circulation_value'] is None:
-            df = data_provider.fetch_all_market_data()
-            if df is not None and not df.empty:
-                clean_req_code = "".join(filter(str.isdigit, request.code))
-                for _, row in df.iterrows():
-                    row_code = str(row['code'])
-                    clean_row_code = "".join(filter(str.isdigit, row_code))
-                    if clean_req_code == clean_row_code:
-                        stock_data['current'] = float(row['current'])
-                        stock_data['change_percent'] = float(row['change_percent'])
-                        if stock_data['turnover'] is None:
-                            stock_data['turnover'] = float(row.get('turnover', 0))
-                        if stock_data['circulation_value'] is None:
-                            stock_data['circulation_value'] = float(row.get('circ_mv', 0))
-                        break
-    except:
-        pass
+    def run_analysis():
+        try:
+            # If turnover/circ_mv missing, try to fetch from market data
+            if stock_data['turnover'] is None or stock_data['circulation_value'] is None:
+                df = data_provider.fetch_all_market_data()
+                if df is not None and not df.empty:
+                    clean_req_code = "".join(filter(str.isdigit, request.code))
+                    for _, row in df.iterrows():
+                        row_code = str(row['code'])
+                        clean_row_code = "".join(filter(str.isdigit, row_code))
+                        if clean_req_code == clean_row_code:
+                            stock_data['current'] = float(row['current'])
+                            stock_data['change_percent'] = float(row['change_percent'])
+                            if stock_data['turnover'] is None:
+                                stock_data['turnover'] = float(row.get('turnover', 0))
+                            if stock_data['circulation_value'] is None:
+                                stock_data['circulation_value'] = float(row.get('circ_mv', 0))
+                            break
+        except:
+            pass
 
-    result = analyze_single_stock(stock_data, force_update=request.force)
+        return analyze_single_stock(stock_data, force_update=request.force)
+
+    # ai_cache 的 key 加上请求内容摘要: 只有参数 (K 线 / 换手率等) 完全相同的并发请求才合并
+    cache_key = f"stock_analysis_{request.code}_{request.promptType}:{_payload_digest(stock_data, request.force)}"
+    result = await ai_inflight.run("stock_analyze", cache_key, lambda: executors.llm.run(run_analysis))
     return {"status": "success", "result": result}
 
+@app.get("/api/news/tailer")
+async def get_news_tailer_status():
+    """后台新闻增量抓取状态 (游标 / 最近成功时间)"""
+    return news_tailer.stats()
+
+@app.get("/api/stocks/snapshot")
+async def get_quote_snapshot_stats():
+    """行情快照统计 (刷新次数 / 读取次数 / 快照年龄)"""
+    return quote_snapshot.stats()
+
+@app.get("/api/logs/recent")
+async def get_recent_logs(limit: int = 100):
+    """最近的日志 (新打开的页面先拉取，再通过 /ws/logs 接收后续日志)"""
+    return {"logs": log_pipeline.recent(limit), "stats": log_pipeline.snapshot()}
+
+@app.get("/api/ws/logs")
+async def get_log_channel_stats():
+    """日志通道连接统计 (每个连接的队列深度 / 发送耗时 / 丢弃数)"""
+    return manager.metrics()
+
+@app.get("/api/ws/data")
+async def get_data_hub_stats():
+    """行情推送通道统计 (连接数 / 各主题订阅数 / 推送次数)"""
+    return data_hub.snapshot()
+
+@app.get("/api/scheduler/jobs")
+async def get_scheduler_jobs():
+    """后台任务状态 (上次 / 下次运行时间、耗时、错误次数)；follower 返回 leader 发布的状态"""
+    jobs = scheduler.snapshot() if leader.is_leader else dict(_leader_status.get("scheduler", {}))
+    return {**jobs, **worker_scheduler.snapshot()}
+
+@app.get("/api/cluster")
+async def get_cluster_status():
+    """多 worker 部署状态 (本 worker 身份、当前 leader、共享状态读写统计)"""
+    return {
+        "leader": leader.snapshot(),
+        "shared_state": shared_state.snapshot(),
+        "remote_subscribers": {key: sorted(topics) for key, topics in _remote_subscribers.items()}
+    }
+
+@app.get("/api/executors")
+async def get_executor_stats():
+    """各线程池 (行情 IO / LLM / 磁盘 / 计算) 的排队深度、活跃线程数与等待耗时"""
+    return executor_metrics()
+
+@app.get("/api/jobs")
+async def get_exclusive_jobs():
+    """互斥任务状态 (复盘分析 / 龙虎榜同步的进度、ETA、排队数)"""
+    return job_runner.snapshot() if leader.is_leader else _leader_status.get("jobs", {})
+
+@app.post("/api/jobs/{name}/cancel")
+async def cancel_exclusive_job(name: str):
+    """取消正在运行的任务 (在下一个检查点停止) 并清空其排队请求"""
+    if not leader.is_leader:
+        await forward_to_leader("cancel", {"name": name})
+        return {"status": "ok", "message": f"{name} cancellation forwarded to the leader worker"}
+    if not job_runner.cancel(name):
+        return {"status": "error", "message": f"No running job: {name}"}
+    return {"status": "ok", "message": f"{name} cancellation requested"}
+
+@metrics_registry.register_collector
+def collect_runtime_metrics():
+    """抓取时把各组件已有的统计转成 gauge / counter"""
+    executors_stats = executor_metrics()
+    channels = {"logs": manager.metrics(), "data": data_hub.connections.metrics()}
+    jobs = scheduler.snapshot()
+    quote_age = quote_snapshot.stats()["age"]
+    return [
+        ("app_executor_active", "gauge", "Busy threads per executor",
+         [({"executor": name}, m["active"]) for name, m in executors_stats.items()]),
+        ("app_executor_queue_depth", "gauge", "Tasks waiting per executor",
+         [({"executor": name}, m["queue_depth"]) for name, m in executors_stats.items()]),
+        ("app_executor_completed_total", "counter", "Tasks completed per executor",
+         [({"executor": name}, m["completed"]) for name, m in executors_stats.items()]),
+        ("app_executor_rejected_total", "counter", "Tasks rejected because the executor queue was full",
+         [({"executor": name}, m["rejected"]) for name, m in executors_stats.items()]),
+        ("app_websocket_connections", "gauge", "Open WebSocket connections",
+         [({"channel": name}, m["connections"]) for name, m in channels.items()]),
+        ("app_websocket_dropped_total", "counter", "Messages dropped or clients evicted on full send queues",
+         [({"channel": name}, m["dropped"] + m["evicted"]) for name, m in channels.items()]),
+        ("app_scheduler_job_runs_total", "counter", "Scheduler job runs",
+         [({"job": name}, j["runs"]) for name, j in jobs.items()]),
+        ("app_scheduler_job_errors_total", "counter", "Scheduler job failures",
+         [({"job": name}, j["errors"]) for name, j in jobs.items()]),
+        ("app_scheduler_job_last_duration_seconds", "gauge", "Duration of the last scheduler job run",
+         [({"job": name}, j["last_duration"]) for name, j in jobs.items()]),
+        ("app_exclusive_job_running", "gauge", "Whether an exclusive job (analysis / LHB sync) is running",
+         [({"job": name}, int(job["running"] is not None)) for name, job in job_runner.snapshot().items()]),
+        ("app_quote_snapshot_age_seconds", "gauge", "Age of the shared quote snapshot",
+         [({}, quote_age)] if quote_age is not None else []),
+        ("app_log_lines_dropped_total", "counter", "Log lines dropped by the log pipeline",
+         [({}, log_pipeline.stats["dropped"])]),
+        ("app_is_leader", "gauge", "Whether this worker runs the background tasks",
+         [({}, int(leader.is_leader))]),
+    ]
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus 文本格式指标 (本 worker 进程)"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/persistence")
+async def get_persistence_stats():
+    """状态文件落盘统计 (每个文件的写入 / 跳过次数与耗时)"""
+    return persistence.stats()
+
+@app.get("/api/ai/inflight")
+async def get_ai_inflight_stats():
+    """AI 请求合并统计 (避免的重复调用次数)"""
+    return ai_inflight.snapshot()
+
 @app.get("/api/stock/kline")
 async def get_stock_kline(code: str, type: str = "1min"):
-    """获取个股K线数据"""
+    """获取个股K线数据 (上游请求 / CSV 读取在行情线程池中执行)"""
+    return await executors.market_io.run(fetch_stock_kline, code, type)
+
+def fetch_stock_kline(code, type="1min"):
     try:
         clean_code = "".join(filter(str.isdigit, code))
         if type == "1min":
@@ -5,17 +5,27 @@ import sys
 # Add the current directory to sys.path so that 'app' can be imported
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+# worker 进程数: 可变状态 (列表 / 行情池 / 配置 / 任务状态) 通过 data/shared_state.db 在进程间同步，
+# 后台任务只在选举出的 leader worker 上运行，因此可以开多个 worker 利用多核处理读请求
+WORKERS = int(os.getenv("APP_WORKERS", "1"))
+
 if __name__ == "__main__":
-    # Use 'app.main:app' string to allow reload to work if needed, 
+    # Use 'app.main:app' string to allow reload to work if needed,
     # but here we import directly or use string.
     # For production-like behavior with workers, use string.
-    # Note: 'workers' > 1 requires the app to be stateless or use external storage.
-    # Since we use in-memory state (global vars), we MUST use workers=1.
-    # To use multi-core for processing, we rely on ProcessPoolExecutor in the background tasks.
-    uvicorn.run(
-        "app.main:app", 
-        host="0.0.0.0", 
-        port=8000, 
-        reload=True,
-        reload_excludes=["*.json", "*.csv", "*.txt", "*.log", "data/*"]
-    )
+    if WORKERS > 1:
+        # reload 与多 worker 不能同时使用
+        uvicorn.run(
+            "app.main:app",
+            host="0.0.0.0",
+            port=8000,
+            workers=WORKERS
+        )
+    else:
+        uvicorn.run(
+            "app.main:app",
+            host="0.0.0.0",
+            port=8000,
+            reload=True,
+            reload_excludes=["*.json", "*.csv", "*.txt", "*.log", "*.db", "*.db-*", "data/*"]
+        )
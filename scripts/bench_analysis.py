@@ -0,0 +1,187 @@
+"""
+端到端分析流程压测: 启动本地模拟 LLM 服务，跑 generate_watchlist / 个股分析 / 龙虎榜日报，
+输出各阶段 (市场数据 / 新闻抓取 / LLM / 指标计算 / 持久化) 耗时
+
+用法 (在项目根目录):
+    python scripts/bench_analysis.py --runs 3 --offline
+    python scripts/bench_analysis.py --runs 1 --latency lognormal:1.2,0.5 --risk-rate 0.05
+
+--offline: 行情/新闻/指标接口替换为合成数据 (带固定延迟)，结果可复现且不访问外网
+数据写入临时目录，不会覆盖 data/ 下的 watchlist 与 AI 缓存
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+sys.path.insert(0, str(ROOT_DIR / "scripts"))
+
+import mock_llm_server
+
+SYNTHETIC_NEWS = [
+    "工信部发布智能网联汽车准入试点通知，多家车企获批开展L3级自动驾驶测试",
+    "国家数据局: 加快推进算力基础设施建设，年内新增智算中心规模超过30%",
+    "白酒板块午后异动拉升，多家酒企发布提价公告",
+    "中兴通讯签订运营商5G-A集采大单，金额超过百亿元",
+    "科大讯飞发布星火大模型新版本，多项能力对标国际领先水平",
+    "券商板块集体走强，东方财富成交额突破百亿",
+    "固态电池产业化提速，头部企业中试线投产",
+    "低空经济政策密集落地，多地发布eVTOL起降场建设规划",
+]
+
+
+def synthetic_news(count, source, hours=12):
+    now = time.time()
+    items = []
+    for i in range(count):
+        text = random.choice(SYNTHETIC_NEWS)
+        # 一半新闻带随机尾注，模拟转载与措辞差异
+        if random.random() < 0.5:
+            text = f"{text}（{source}快讯{i}）"
+        items.append({
+            "title": "",
+            "content": text,
+            "text": text,
+            "source": source,
+            "timestamp": int(now - random.uniform(0, hours * 3600)),
+            "time_str": time.strftime("%H:%M", time.localtime(now))
+        })
+    return items
+
+
+def install_offline_sources(news_analyzer, args):
+    """替换所有外部数据源为带固定延迟的合成数据"""
+    from app.core import data_provider as data_provider_module
+
+    def delayed(seconds, value):
+        time.sleep(seconds)
+        return value
+
+    news_analyzer.get_market_data = lambda logger=None: delayed(
+        args.market_delay, "【市场概况】上涨 3200 家，下跌 1800 家，涨停 65 家，跌停 5 家。")
+    news_analyzer.get_cls_news = lambda hours=12, logger=None: delayed(
+        args.news_delay, synthetic_news(args.news_count, "CLS", hours or 12))
+    news_analyzer.get_eastmoney_news = lambda hours=12, logger=None: delayed(
+        args.news_delay, synthetic_news(args.news_count, "EastMoney", hours or 12))
+    news_analyzer.calculate_metrics = lambda code: delayed(args.metrics_delay, {
+        "seal_rate": round(random.uniform(0.4, 0.9), 2),
+        "broken_rate": round(random.uniform(0.1, 0.5), 2),
+        "next_day_premium": round(random.uniform(-3, 5), 2),
+        "limit_up_days": random.randint(0, 3)
+    })
+    news_analyzer.scan_intraday_limit_up = lambda logger=None: delayed(args.market_delay, ([], []))
+    news_analyzer.lhb_manager.get_available_dates = lambda: []
+    data_provider_module.data_provider.fetch_quotes = lambda codes: delayed(
+        args.market_delay, [{"code": c, "turnover": round(random.uniform(1, 20), 2)} for c in codes])
+
+
+def synthetic_lhb():
+    stocks = []
+    for code, name, _ in mock_llm_server.SAMPLE_CODES:
+        stocks.append({
+            "code": code[2:],
+            "name": name,
+            "total_net_buy": random.randint(-5, 20) * 10000000,
+            "seats": [
+                {"name": "机构专用", "buy": 30000000, "sell": 1000000, "hot_money": ""},
+                {"name": "华鑫证券上海分公司", "buy": 15000000, "sell": 0, "hot_money": "炒股养家"},
+            ]
+        })
+    return stocks
+
+
+def summarize(samples):
+    if not samples:
+        return "-"
+    ordered = sorted(samples)
+    return (f"mean {statistics.mean(ordered):7.2f}s  p50 {statistics.median(ordered):7.2f}s  "
+            f"max {ordered[-1]:7.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end analysis benchmark against a mock LLM")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--mode", default="after_hours", choices=["after_hours", "intraday"])
+    parser.add_argument("--offline", action="store_true", help="use synthetic market/news data")
+    parser.add_argument("--news-count", type=int, default=30, help="offline: news items per source")
+    parser.add_argument("--market-delay", type=float, default=0.5)
+    parser.add_argument("--news-delay", type=float, default=1.0)
+    parser.add_argument("--metrics-delay", type=float, default=0.3)
+    parser.add_argument("--latency", default="lognormal:0.5,0.4")
+    parser.add_argument("--risk-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    mock_args = mock_llm_server.build_parser().parse_args([
+        "--port", "0", "--latency", args.latency, "--risk-rate", str(args.risk_rate),
+        "--malformed-rate", str(args.malformed_rate), "--seed", str(args.seed)
+    ])
+    server, mock_state = mock_llm_server.start_server(mock_args)
+    port = server.server_address[1]
+
+    # 必须在导入 app 模块之前设置，news_analyzer 在导入时读取
+    os.environ["DEEPSEEK_API_URL"] = f"http://127.0.0.1:{port}/chat/completions"
+    os.environ["DEEPSEEK_API_KEY"] = "mock-key"
+
+    from app.core import news_analyzer
+    from app.core.ai_cache import ai_cache
+    from app.core.llm_limiter import llm_limiter
+
+    work_dir = Path(tempfile.mkdtemp(prefix="sniper_bench_"))
+    news_analyzer.DATA_DIR = work_dir
+    ai_cache.cache_file = work_dir / "ai_cache.json"
+    # 缓存文件由 persistence 按导入时的路径注册，压测结果只保留在内存
+    ai_cache.persist = False
+
+    if args.offline:
+        install_offline_sources(news_analyzer, args)
+
+    print(f"Mock LLM: {os.environ['DEEPSEEK_API_URL']} | work dir: {work_dir}")
+
+    stage_samples = {}
+    totals = {"generate_watchlist": [], "analyze_single_stock": [], "analyze_daily_lhb": []}
+    stock = {"code": "sz002405", "name": "四维图新", "current": 12.3, "change_percent": 5.6, "concept": "自动驾驶"}
+
+    for run in range(args.runs):
+        # 每轮清空缓存，测的是冷启动的完整链路
+        ai_cache.cache = {}
+
+        _, report = news_analyzer.generate_watchlist(mode=args.mode, hours=12)
+        if report:
+            totals["generate_watchlist"].append(report["total"])
+            for name, seconds in report["stages"].items():
+                stage_samples.setdefault(name, []).append(seconds)
+
+        started = time.perf_counter()
+        news_analyzer.analyze_single_stock(stock, prompt_type='normal', api_key="mock-key", force_update=True)
+        totals["analyze_single_stock"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        news_analyzer.analyze_daily_lhb(f"bench-{run}", synthetic_lhb())
+        totals["analyze_daily_lhb"].append(time.perf_counter() - started)
+
+        print(f"[run {run + 1}/{args.runs}] generate_watchlist {totals['generate_watchlist'][-1] if report else 0:.2f}s")
+
+    print("\n=== generate_watchlist stages ===")
+    for name in ["data_fetch", "market_data", "news_fetch", "llm", "metrics", "enrichment", "persistence"]:
+        print(f"{name:<22}{summarize(stage_samples.get(name, []))}")
+    print("\n=== end-to-end ===")
+    for name, samples in totals.items():
+        print(f"{name:<22}{summarize(samples)}")
+    print("\n=== LLM ===")
+    print(f"mock server: {mock_state.stats}")
+    print(f"limiter:     {llm_limiter.stats()}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
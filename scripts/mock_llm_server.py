@@ -0,0 +1,205 @@
+"""
+本地 OpenAI 兼容 chat/completions 模拟服务 (用于压测与 CI，不消耗 DeepSeek 额度)
+
+用法:
+    python scripts/mock_llm_server.py --port 8765 --latency lognormal:1.0,0.5 --risk-rate 0.1
+    DEEPSEEK_API_URL=http://127.0.0.1:8765/chat/completions DEEPSEEK_API_KEY=mock python run.py
+
+支持:
+    - 延迟分布: fixed:S / uniform:A,B / lognormal:MU,SIGMA (秒)
+    - stream=True 时按 SSE 逐 token 返回 (首 token 延迟 --ttft，之后每 token --token-delay)
+    - 按概率返回 400 "Content Exists Risk" 风控错误
+    - 按概率返回格式损坏的 JSON 内容
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SAMPLE_CODES = [
+    ("sz002405", "四维图新", "自动驾驶"),
+    ("sh600519", "贵州茅台", "白酒"),
+    ("sz300059", "东方财富", "互联网金融"),
+    ("sh601138", "工业富联", "算力"),
+    ("sz000063", "中兴通讯", "通信设备"),
+    ("sz002230", "科大讯飞", "人工智能"),
+]
+
+SAMPLE_REPORT = """### 1. 核心逻辑与地位
+题材契合当前主线，板块内辨识度较高，资金关注度持续提升。
+
+### 2. 盘面深度解析
+量价配合良好，换手充分，主力资金呈现净流入迹象，短线情绪偏强。
+
+### 3. 操盘计划
+- **买入策略**: 分歧低吸，回踩均线企稳后介入
+- **卖出策略**: 跌破5日线止损，冲高分批止盈
+- **胜率预估**: 中
+"""
+
+
+def parse_latency(spec):
+    """解析延迟分布描述，返回无参采样函数"""
+    kind, _, args = spec.partition(':')
+    values = [float(v) for v in args.split(',') if v]
+    if kind == 'fixed':
+        return lambda: values[0]
+    if kind == 'uniform':
+        return lambda: random.uniform(values[0], values[1])
+    if kind == 'lognormal':
+        return lambda: random.lognormvariate(values[0], values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class MockState:
+    def __init__(self, args):
+        self.args = args
+        self.latency = parse_latency(args.latency)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "streams": 0, "risk_errors": 0, "malformed": 0}
+
+    def bump(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+
+def build_json_content(prompt):
+    """根据 prompt 中的新闻条数构造一个结构合法的选股结果"""
+    news_ids = [int(n) for n in re.findall(r'^(\d+)\. ', prompt, re.MULTILINE)] or [0]
+    stocks = []
+    for news_id in news_ids:
+        if random.random() < 0.5:
+            continue
+        code, name, concept = random.choice(SAMPLE_CODES)
+        stocks.append({
+            "code": code,
+            "name": name,
+            "concept": concept,
+            "reason": f"模拟结果: 新闻{news_id}利好{concept}",
+            "score": round(random.uniform(6.0, 9.5), 1),
+            "strategy": random.choice(["Aggressive", "LimitUp"]),
+            "news_id": news_id
+        })
+    return json.dumps({"stocks": stocks, "remove_stocks": []}, ensure_ascii=False)
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            if state.args.verbose:
+                super().log_message(fmt, *args)
+
+        def _send_json(self, status, body):
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip('/') == '/stats':
+                with state.lock:
+                    return self._send_json(200, dict(state.stats))
+            self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                return self._send_json(404, {"error": "not found"})
+
+            length = int(self.headers.get('Content-Length', 0))
+            try:
+                payload = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                return self._send_json(400, {"error": {"message": "invalid json", "type": "invalid_request_error"}})
+
+            state.bump("requests")
+            prompt = "\n".join(str(m.get('content', '')) for m in payload.get('messages', []))
+
+            if random.random() < state.args.risk_rate:
+                state.bump("risk_errors")
+                time.sleep(min(state.latency(), 1.0))
+                return self._send_json(400, {"error": {"message": "Content Exists Risk", "type": "invalid_request_error"}})
+
+            wants_json = payload.get('response_format', {}).get('type') == 'json_object' or '"stocks"' in prompt
+            content = build_json_content(prompt) if wants_json else SAMPLE_REPORT
+
+            if random.random() < state.args.malformed_rate:
+                state.bump("malformed")
+                content = content[:max(1, len(content) // 2)]
+
+            if payload.get('stream'):
+                state.bump("streams")
+                return self._stream(content)
+
+            time.sleep(state.latency())
+            self._send_json(200, {
+                "id": "mock-completion",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get('model', 'mock'),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt), "completion_tokens": len(content), "total_tokens": len(prompt) + len(content)}
+            })
+
+        def _stream(self, content):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+
+            time.sleep(state.args.ttft)
+            step = max(1, state.args.chunk_chars)
+            for i in range(0, len(content), step):
+                chunk = {"choices": [{"index": 0, "delta": {"content": content[i:i+step]}}]}
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+                time.sleep(state.args.token_delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible chat/completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="lognormal:0.5,0.4", help="fixed:S | uniform:A,B | lognormal:MU,SIGMA")
+    parser.add_argument("--ttft", type=float, default=0.3, help="stream: seconds before first token")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="stream: seconds between chunks")
+    parser.add_argument("--chunk-chars", type=int, default=4, help="stream: characters per chunk")
+    parser.add_argument("--risk-rate", type=float, default=0.0, help="probability of 400 Content Exists Risk")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="probability of truncated JSON content")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true")
+    return parser
+
+
+def start_server(args):
+    """启动服务 (后台线程)，返回 (server, state)"""
+    if args.seed is not None:
+        random.seed(args.seed)
+    state = MockState(args)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-llm", daemon=True).start()
+    return server, state
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    server, state = start_server(args)
+    print(f"Mock LLM server listening on http://{args.host}:{server.server_address[1]}/chat/completions")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
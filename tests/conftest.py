@@ -0,0 +1,8 @@
+import os
+import sys
+
+# 与 run.py 一样把项目根目录加入 sys.path，使 'app' 可以被导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 以下脚本需要联网与 akshare / pandas，导入时即执行，手动运行而不参与 pytest 收集
+collect_ignore = ["test_ak_functions.py", "test_dtp.py", "test_metrics.py", "test_scan.py"]
@@ -0,0 +1,105 @@
+import json
+import time
+from datetime import datetime
+
+from app.core.analysis_store import AnalysisStore, compute_expiry, prompt_type_from_key
+
+
+def ts(*args):
+    return datetime(*args).timestamp()
+
+
+def make_store(tmp_path):
+    return AnalysisStore(path=tmp_path / "analysis_cache.jsonl", legacy_path=tmp_path / "analysis_cache.json")
+
+
+def read_lines(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+
+def test_compute_expiry_by_prompt_type():
+    # 盘前写入的分时信号开盘即失效，盘中写入的当日有效
+    assert compute_expiry("min_trading_signal", ts(2026, 10, 19, 9, 0)) == ts(2026, 10, 19, 9, 30)
+    assert compute_expiry("min_trading_signal", ts(2026, 10, 19, 10, 0)) == ts(2026, 10, 20)
+    assert compute_expiry("day_trading_signal", ts(2026, 10, 19, 8, 0)) == ts(2026, 10, 20)
+    # 其他类型: 收盘前写入的收盘后失效
+    assert compute_expiry("default", ts(2026, 10, 19, 14, 59)) == ts(2026, 10, 19, 15, 0)
+    assert compute_expiry("default", ts(2026, 10, 19, 15, 0)) == ts(2026, 10, 20)
+
+
+def test_prompt_type_from_key():
+    assert prompt_type_from_key("sh600519_min_trading_signal") == "min_trading_signal"
+    assert prompt_type_from_key("sh600519") == "default"
+
+
+def test_get_respects_expiry(tmp_path):
+    store = make_store(tmp_path)
+    written = ts(2026, 10, 19, 10, 0)
+    entry = store.set("sh600519_default", "分析内容", timestamp=written)
+    assert entry["expires_at"] == ts(2026, 10, 19, 15, 0)
+    assert store.get("sh600519_default", now=ts(2026, 10, 19, 14, 0))["content"] == "分析内容"
+    assert store.get("sh600519_default", now=ts(2026, 10, 19, 15, 0)) is None
+    store.flush(timeout=5)
+
+
+def test_purge_expired_skips_overwritten_heap_entries_and_compacts(tmp_path):
+    store = make_store(tmp_path)
+    store.set("a_default", "old", timestamp=ts(2026, 10, 19, 10, 0))
+    store.set("b_day_trading_signal", "keep", timestamp=ts(2026, 10, 19, 10, 0))
+    # 覆盖写入: 新记录当日有效，堆中残留的旧条目 (15:00 到期) 不能把它删掉
+    store.set("a_default", "new", timestamp=ts(2026, 10, 19, 16, 0))
+    store.set("c_default", "gone", timestamp=ts(2026, 10, 19, 11, 0))
+    store.flush(timeout=5)
+    assert len(read_lines(store.path)) == 4
+
+    assert store.purge_expired(now=ts(2026, 10, 19, 15, 30)) == 1
+    assert sorted(store.entries) == ["a_default", "b_day_trading_signal"]
+    assert store.entries["a_default"]["content"] == "new"
+    store.flush(timeout=5)
+    assert sorted(r["key"] for r in read_lines(store.path)) == ["a_default", "b_day_trading_signal"]
+
+    assert store.purge_expired(now=ts(2026, 10, 20, 0, 0)) == 2
+    assert len(store) == 0
+
+
+def test_load_drops_expired_and_migrates_legacy(tmp_path):
+    now = time.time()
+    legacy = {
+        "sh600519_day_trading_signal": {"content": "fresh", "timestamp": now},
+        "sz000001_default": {"content": "stale", "timestamp": now - 3 * 86400},
+    }
+    (tmp_path / "analysis_cache.json").write_text(json.dumps(legacy), encoding="utf-8")
+    store = make_store(tmp_path)
+    store.load()
+    assert list(store.entries) == ["sh600519_day_trading_signal"]
+    store.flush(timeout=5)
+    # 迁移后写出 JSONL 快照，之后从新文件加载
+    assert [r["key"] for r in read_lines(store.path)] == ["sh600519_day_trading_signal"]
+    reloaded = make_store(tmp_path)
+    reloaded.load()
+    assert reloaded.get("sh600519_day_trading_signal")["content"] == "fresh"
+
+
+def test_set_persist_merges_newer_disk_records(tmp_path):
+    now = time.time()
+    follower = make_store(tmp_path)
+    follower.persist = False
+    follower.set("a_day_trading_signal", "local-new", timestamp=now)
+    follower.set("b_day_trading_signal", "local-old", timestamp=now - 10)
+    assert not follower.path.exists()  # 非 leader 不写文件
+
+    # 上一任 leader 写入的文件
+    leader = make_store(tmp_path)
+    leader.set("a_day_trading_signal", "disk-old", timestamp=now - 5)
+    leader.set("b_day_trading_signal", "disk-new", timestamp=now - 1)
+    leader.set("c_day_trading_signal", "disk-only", timestamp=now - 1)
+    leader.flush(timeout=5)
+
+    follower.set_persist(True)
+    follower.flush(timeout=5)
+    assert follower.get("a_day_trading_signal")["content"] == "local-new"
+    assert follower.get("b_day_trading_signal")["content"] == "disk-new"
+    assert follower.get("c_day_trading_signal")["content"] == "disk-only"
+    on_disk = {r["key"]: r["content"] for r in read_lines(follower.path)}
+    assert on_disk == {"a_day_trading_signal": "local-new", "b_day_trading_signal": "disk-new",
+                       "c_day_trading_signal": "disk-only"}
@@ -0,0 +1,93 @@
+import time
+
+from app.core import ai_cache as ai_cache_module
+from app.core.analysis_store import AnalysisStore
+from app.core.persistence import persistence
+from app.core.shared_state import SharedState
+
+
+def make_ai_cache(tmp_path, monkeypatch, persist):
+    monkeypatch.setattr(ai_cache_module, "CACHE_FILE", tmp_path / "ai_cache.json")
+    cache = ai_cache_module.AICache()
+    cache.persist = persist
+    return cache
+
+
+def publish(cache, state, prefix):
+    # 与 main.collect_shared_push / exchange_shared_state 相同的流程
+    unsynced = cache.unsynced_changes()
+    if unsynced is None:
+        return 0
+    version, entries = unsynced
+    for key, entry in entries.items():
+        state.put(f"{prefix}:{key}", entry)
+    cache.mark_synced(version)
+    return len(entries)
+
+
+def receive(state, known, prefix):
+    return {key[len(prefix) + 1:]: value for key, (_, _, value) in state.changed(known, prefix=prefix + ":").items()
+            if value is not None}
+
+
+def test_follower_ai_cache_writes_reach_leader(tmp_path, monkeypatch):
+    follower = make_ai_cache(tmp_path, monkeypatch, persist=False)
+    follower.set("stock_analysis_sh600519_default", "分析结果")
+    follower.set_many({"news_a": {"stocks": []}, "news_b": {"stocks": [{"code": "sz000001"}]}})
+
+    a, b = SharedState(tmp_path / "shared.db", worker_id="follower"), SharedState(tmp_path / "shared.db", worker_id="leader")
+    assert publish(follower, a, "ai_cache") == 3
+    assert follower.unsynced_changes() is None
+
+    leader = make_ai_cache(tmp_path, monkeypatch, persist=True)
+    leader.apply_shared(receive(b, {}, "ai_cache"))
+    assert leader.get("stock_analysis_sh600519_default") == "分析结果"
+    assert leader.get("news_b") == {"stocks": [{"code": "sz000001"}]}
+    # leader 应用的条目会落盘，但不会再作为本地写入发布
+    assert persistence.is_dirty("ai_cache")
+    assert leader.unsynced_changes() is None
+    persistence.flush("ai_cache")
+    assert "news_a" in make_ai_cache(tmp_path, monkeypatch, persist=False).cache
+    persistence.discard("ai_cache")
+
+
+def test_ai_cache_apply_keeps_newer_entry(tmp_path, monkeypatch):
+    cache = make_ai_cache(tmp_path, monkeypatch, persist=False)
+    cache.set("k", "local")
+    local_ts = cache.cache["k"]["timestamp"]
+    cache.apply_shared({"k": {"timestamp": local_ts - 10, "data": "older"}})
+    assert cache.get("k") == "local"
+    cache.apply_shared({"k": {"timestamp": local_ts + 10, "data": "newer"}})
+    assert cache.get("k") == "newer"
+
+
+def test_leader_writes_are_not_published(tmp_path, monkeypatch):
+    cache = make_ai_cache(tmp_path, monkeypatch, persist=True)
+    cache.set("k", "v")
+    assert cache.unsynced_changes() is None
+    persistence.discard("ai_cache")
+
+
+def test_follower_analysis_writes_reach_leader(tmp_path):
+    follower = AnalysisStore(path=tmp_path / "f.jsonl", legacy_path=tmp_path / "none.json")
+    follower.persist = False
+    follower.set("sh600519_day_trading_signal", "follower 结果")
+    assert not follower.path.exists()
+
+    a, b = SharedState(tmp_path / "shared.db", worker_id="follower"), SharedState(tmp_path / "shared.db", worker_id="leader")
+    assert publish(follower, a, "analysis") == 1
+    # 之后的写入留到下一轮发布
+    follower.set("sz000001_day_trading_signal", "第二条")
+    assert list(follower.unsynced_changes()[1]) == ["sz000001_day_trading_signal"]
+
+    leader = AnalysisStore(path=tmp_path / "leader.jsonl", legacy_path=tmp_path / "none.json")
+    assert leader.apply_shared(receive(b, {}, "analysis")) == 1
+    assert leader.get("sh600519_day_trading_signal")["content"] == "follower 结果"
+    leader.flush(timeout=5)
+    restarted = AnalysisStore(path=tmp_path / "leader.jsonl", legacy_path=tmp_path / "none.json")
+    restarted.load()
+    assert restarted.get("sh600519_day_trading_signal")["content"] == "follower 结果"
+
+    # 过期或较旧的记录不会覆盖
+    expired = {"x_default": {"content": "old", "timestamp": 0, "expires_at": time.time() - 1}}
+    assert leader.apply_shared(expired) == 0
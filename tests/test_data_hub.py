@@ -0,0 +1,143 @@
+import asyncio
+import json
+import random
+
+from app.core import data_hub as data_hub_module
+from app.core.data_hub import DataHub, diff_rows
+
+
+def apply_delta(rows, delta):
+    # 与前端 applyDelta 一致: 删除 -> 字段更新 -> 新行 (已存在则替换) -> 按 order 重排
+    key = delta["key"]
+    by_key = {row[key]: row for row in rows}
+    for k in delta.get("remove", []):
+        by_key.pop(k, None)
+    for k, fields in delta.get("update", {}).items():
+        if k in by_key:
+            by_key[k] = {**by_key[k], **fields}
+    for row in delta.get("insert", []):
+        by_key[row[key]] = row
+    order = delta.get("order") or list(by_key)
+    return [by_key[k] for k in order if k in by_key]
+
+
+def test_diff_rows_minimal_delta():
+    old = [{"code": "sh600519", "price": 1500.0, "name": "贵州茅台"},
+           {"code": "sz000001", "price": 11.2, "name": "平安银行"}]
+    new = [{"code": "sh600519", "price": 1501.0, "name": "贵州茅台"},
+           {"code": "sz000001", "price": 11.2, "name": "平安银行"},
+           {"code": "sz300059", "price": 20.1, "name": "东方财富"}]
+    delta = diff_rows(old, new, "code")
+    assert delta == {"key": "code",
+                     "insert": [new[2]],
+                     "update": {"sh600519": {"price": 1501.0}}}
+    assert apply_delta(old, delta) == new
+
+
+def test_diff_rows_removed_field_sends_whole_row_and_order():
+    old = [{"code": "a", "tag": "x", "v": 1}, {"code": "b", "v": 2}, {"code": "c", "v": 3}]
+    new = [{"code": "c", "v": 3}, {"code": "a", "v": 1}]
+    delta = diff_rows(old, new, "code")
+    assert delta["remove"] == ["b"]
+    assert delta["insert"] == [{"code": "a", "v": 1}]
+    assert delta["order"] == ["c", "a"]
+    assert "update" not in delta
+    assert apply_delta(old, delta) == new
+
+
+def test_diff_rows_rejects_missing_or_duplicate_keys():
+    assert diff_rows([], [{"code": "a"}, {"code": "a"}], "code") is None
+    assert diff_rows([], [{"name": "a"}], "code") is None
+    assert diff_rows([{"code": "a"}, {"code": "a"}], [{"code": "a"}], "code") is None
+
+
+def test_diff_rows_random_roundtrip():
+    rng = random.Random(7)
+    rows = [{"code": f"c{i}", "price": i} for i in range(20)]
+    for _ in range(200):
+        new = [dict(row) for row in rows if rng.random() > 0.1]
+        for row in new:
+            if rng.random() < 0.3:
+                row["price"] = rng.randint(0, 100)
+            if rng.random() < 0.05:
+                row.pop("price", None)
+        new += [{"code": f"n{rng.randint(0, 10 ** 6)}", "price": 1} for _ in range(rng.randint(0, 2))]
+        new = list({row["code"]: row for row in new}.values())
+        if rng.random() < 0.2:
+            rng.shuffle(new)
+        delta = diff_rows(rows, new, "code")
+        assert apply_delta(rows, delta) == new
+        rows = new
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.client = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message):
+        self.sent.append(json.loads(message))
+
+
+def test_publish_seq_delta_and_resync(monkeypatch):
+    monkeypatch.setattr(data_hub_module, "FULL_SNAPSHOT_EVERY", 3)
+
+    async def scenario():
+        hub = DataHub()
+        ws = FakeWebSocket()
+        await hub.connect(ws)
+        await hub.handle(ws, json.dumps({"action": "subscribe", "topics": ["stocks", "bogus"]}))
+
+        rows = [{"code": f"c{i}", "price": i, "name": f"股票{i}" * 5} for i in range(10)]
+        assert await hub.publish("stocks", rows) == 1
+        assert await hub.publish("stocks", rows) == 0  # 内容未变不推送
+        for step in range(3):
+            rows = [dict(row) for row in rows]
+            rows[step]["price"] += 1
+            await hub.publish("stocks", rows)
+        await asyncio.sleep(0.05)
+
+        messages = ws.sent
+        assert [m["seq"] for m in messages] == [1, 2, 3, 4]
+        # seq 3 为定期全量，其余为增量
+        assert [m["type"] for m in messages] == ["data", "delta", "data", "delta"]
+        state = None
+        for m in messages:
+            state = m["data"] if m["type"] == "data" else apply_delta(state, m)
+        assert state == rows
+        assert hub.stats["unchanged"] == 1
+
+        # 客户端发现 seq 不连续时请求重同步，收到最新的全量
+        await hub.handle(ws, json.dumps({"action": "resync", "topics": ["stocks"]}))
+        await asyncio.sleep(0.05)
+        assert ws.sent[-1] == {"type": "data", "topic": "stocks", "seq": 4, "data": rows}
+        assert hub.stats["resyncs"] == 1
+
+        # 新订阅者直接拿到最新全量
+        late = FakeWebSocket()
+        await hub.connect(late)
+        await hub.handle(late, json.dumps({"action": "subscribe", "topics": ["stocks"]}))
+        await asyncio.sleep(0.05)
+        assert late.sent == [{"type": "data", "topic": "stocks", "seq": 4, "data": rows}]
+
+        hub.disconnect(ws)
+        hub.disconnect(late)
+
+    asyncio.run(scenario())
+
+
+def test_publish_copies_state_before_diffing():
+    async def scenario():
+        hub = DataHub()
+        rows = [{"code": "a", "price": 1}]
+        await hub.publish("stocks", rows)
+        # 生产者原地修改后再次发布: 应与上次发布的内容比较，而不是同一个对象
+        rows[0]["price"] = 2
+        await hub.publish("stocks", rows)
+        assert hub.latest["stocks"]["seq"] == 2
+        assert hub.latest["stocks"]["state"] == [{"code": "a", "price": 2}]
+
+    asyncio.run(scenario())
@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import CancelledError
+
+import pytest
+
+from app.core.executors import BoundedExecutor, ExecutorSaturated, TaskBatch
+
+
+def test_queue_bound_rejects_and_counts():
+    executor = BoundedExecutor("test", max_workers=1, max_queue=2)
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    running = executor.submit(block)
+    assert started.wait(5)
+    queued = [executor.submit(lambda i=i: i) for i in range(2)]
+    with pytest.raises(ExecutorSaturated):
+        executor.submit(lambda: None)
+
+    metrics = executor.metrics()
+    assert metrics["active"] == 1 and metrics["queue_depth"] == 2 and metrics["rejected"] == 1
+
+    release.set()
+    running.result(5)
+    assert [f.result(5) for f in queued] == [0, 1]
+    metrics = executor.metrics()
+    assert metrics["completed"] == 3 and metrics["queue_depth"] == 0
+    executor.shutdown()
+
+
+def test_cancelled_queued_task_releases_queue_slot():
+    executor = BoundedExecutor("test", max_workers=1, max_queue=1)
+    release = threading.Event()
+    running = executor.submit(release.wait, 5)
+    queued = executor.submit(lambda: "never")
+    assert queued.cancel()
+    assert executor.metrics()["queue_depth"] == 0
+    # 名额已归还，可以继续提交
+    follow_up = executor.submit(lambda: "ok")
+    release.set()
+    assert running.result(5) is True
+    assert follow_up.result(5) == "ok"
+    executor.shutdown()
+
+
+def test_failures_are_counted_and_run_passes_context():
+    executor = BoundedExecutor("test", max_workers=2, max_queue=4)
+
+    def boom():
+        raise ValueError("bad")
+
+    with pytest.raises(ValueError):
+        executor.submit(boom).result(5)
+    assert executor.metrics()["failed"] == 1
+
+    async def scenario():
+        return await executor.run(lambda a, b=0: a + b, 1, b=2)
+
+    assert asyncio.run(scenario()) == 3
+    executor.shutdown()
+
+
+def test_task_batch_limits_concurrency_and_preserves_results():
+    executor = BoundedExecutor("test", max_workers=8, max_queue=64)
+    batch = TaskBatch(executor, limit=2)
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+
+    def work(i):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.02)
+        with lock:
+            state["running"] -= 1
+        return i * i
+
+    futures = [batch.submit(work, i) for i in range(8)]
+    assert [f.result(5) for f in futures] == [i * i for i in range(8)]
+    assert state["peak"] == 2
+    # 等待中的任务不占共享线程池的排队名额
+    assert executor.metrics()["submitted"] == 8
+    executor.shutdown()
+
+
+def test_task_batch_cancel_and_saturation():
+    executor = BoundedExecutor("test", max_workers=1, max_queue=1)
+    release = threading.Event()
+    batch = TaskBatch(executor, limit=1)
+    first = batch.submit(release.wait, 5)
+    rest = [batch.submit(lambda: "never") for _ in range(3)]
+    batch.cancel()
+    release.set()
+    assert first.result(5) is True
+    assert all(f.cancelled() for f in rest)
+
+    # 共享线程池排队已满时，任务以 ExecutorSaturated 失败，不影响后续任务
+    blocker, started = threading.Event(), threading.Event()
+    executor.submit(lambda: (started.set(), blocker.wait(5)))
+    assert started.wait(5)
+    executor.submit(lambda: None)
+    saturated = TaskBatch(executor, limit=3)
+    futures = [saturated.submit(lambda: "x") for _ in range(2)]
+    for future in futures:
+        with pytest.raises(ExecutorSaturated):
+            future.result(5)
+    blocker.set()
+    deadline = time.time() + 5
+    while executor.metrics()["queue_depth"] and time.time() < deadline:
+        time.sleep(0.01)
+    assert TaskBatch(executor, limit=1).submit(lambda: "ok").result(5) == "ok"
+    executor.shutdown()
+
+
+def test_task_batch_relays_failures():
+    executor = BoundedExecutor("test", max_workers=2, max_queue=4)
+    batch = TaskBatch(executor, limit=1)
+
+    def boom():
+        raise RuntimeError("upstream")
+
+    failing = batch.submit(boom)
+    after = batch.submit(lambda: "next")
+    with pytest.raises(RuntimeError):
+        failing.result(5)
+    assert after.result(5) == "next"
+    assert not isinstance(after.exception(), CancelledError)
+    executor.shutdown()
@@ -0,0 +1,65 @@
+import threading
+import time
+
+from app.core.executors import BoundedExecutor
+from app.core.fanout import fan_out
+
+
+def test_partial_results_on_timeout_and_error():
+    executor = BoundedExecutor("test", max_workers=4, max_queue=8)
+    release = threading.Event()
+    logs = []
+
+    def slow():
+        release.wait(5)
+        return "late"
+
+    def broken():
+        raise RuntimeError("upstream 502")
+
+    started = time.time()
+    results, report = fan_out({
+        "market": (lambda: "市场数据", 1, ""),
+        "slow": (slow, 0.1, "default"),
+        "broken": (broken, 1, []),
+    }, logger=logs.append, executor=executor)
+    elapsed = time.time() - started
+    release.set()
+
+    assert results == {"market": "市场数据", "slow": "default", "broken": []}
+    assert report["market"]["status"] == "ok"
+    assert report["slow"]["status"] == "timeout"
+    assert report["broken"]["status"] == "error"
+    # 总耗时由最慢 (超时) 的源决定，不等待慢源结束
+    assert elapsed < 1
+    assert any("slow 超时" in line for line in logs)
+    assert any("broken 获取失败" in line for line in logs)
+    executor.shutdown()
+
+
+def test_sources_run_concurrently_on_shared_executor():
+    executor = BoundedExecutor("test", max_workers=4, max_queue=8)
+
+    def sleeper(value):
+        return lambda: (time.sleep(0.2), value)[1]
+
+    started = time.time()
+    results, report = fan_out({f"s{i}": (sleeper(i), 2, None) for i in range(3)}, executor=executor)
+    assert results == {"s0": 0, "s1": 1, "s2": 2}
+    assert time.time() - started < 0.5
+    assert all(entry["status"] == "ok" for entry in report.values())
+    assert executor.metrics()["submitted"] == 3
+    executor.shutdown()
+
+
+def test_saturated_executor_marks_source_failed():
+    # max_queue=0: 任何提交都被拒绝
+    executor = BoundedExecutor("test", max_workers=1, max_queue=0)
+    results, report = fan_out({"only": (lambda: 1, 1, "fallback")}, executor=executor)
+    assert results == {"only": "fallback"}
+    assert report["only"]["status"] == "error"
+    executor.shutdown()
+
+
+def test_empty_sources():
+    assert fan_out({}) == ({}, {})
@@ -0,0 +1,153 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core.inflight import InflightCoalescer
+
+
+def test_run_coalesces_concurrent_calls():
+    async def scenario():
+        coalescer = InflightCoalescer()
+        calls = []
+
+        async def factory():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"signal": "buy"}
+
+        results = await asyncio.gather(*[coalescer.run("analyze_stock", "sh600519_default", factory) for _ in range(5)])
+        assert results == [{"signal": "buy"}] * 5
+        assert calls == [1]
+        # 结束后同一 key 会重新执行
+        await coalescer.run("analyze_stock", "sh600519_default", factory)
+        assert calls == [1, 1]
+        assert coalescer.snapshot()["namespaces"]["analyze_stock"] == {"calls": 6, "executed": 2, "coalesced": 4}
+
+    asyncio.run(scenario())
+
+
+def test_run_propagates_errors_to_every_caller():
+    async def scenario():
+        coalescer = InflightCoalescer()
+
+        async def factory():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream 500")
+
+        results = await asyncio.gather(*[coalescer.run("ns", "k", factory) for _ in range(3)], return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) and str(r) == "upstream 500" for r in results)
+        assert coalescer.snapshot()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_caller_does_not_cancel_shared_task():
+    async def scenario():
+        coalescer = InflightCoalescer()
+        release = asyncio.Event()
+
+        async def factory():
+            await release.wait()
+            return "done"
+
+        first = asyncio.ensure_future(coalescer.run("ns", "k", factory))
+        second = asyncio.ensure_future(coalescer.run("ns", "k", factory))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        release.set()
+        assert await second == "done"
+
+    asyncio.run(scenario())
+
+
+def producer_factory(chunks, gate=None, calls=None, error=None):
+    def produce():
+        if calls is not None:
+            calls.append(1)
+        for chunk in chunks:
+            if gate is not None:
+                gate.wait(5)
+            yield chunk
+        if error is not None:
+            raise error
+    return produce
+
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def test_shared_stream_replays_to_late_subscribers():
+    async def scenario():
+        coalescer = InflightCoalescer()
+        gate = threading.Event()
+        calls = []
+        produce = producer_factory(["第一段", "第二段", "第三段"], gate=gate, calls=calls)
+
+        early = asyncio.ensure_future(collect(coalescer.stream("analyze_stock", "k", produce)))
+        await asyncio.sleep(0.01)
+        late = asyncio.ensure_future(collect(coalescer.stream("analyze_stock", "k", produce)))
+        gate.set()
+        assert await early == ["第一段", "第二段", "第三段"]
+        assert await late == ["第一段", "第二段", "第三段"]
+        assert calls == [1]
+        assert coalescer.snapshot()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_shared_stream_failure_reaches_subscribers():
+    async def scenario():
+        coalescer = InflightCoalescer()
+        produce = producer_factory(["部分"], error=RuntimeError("connection reset"))
+        received = []
+        with pytest.raises(RuntimeError, match="connection reset"):
+            async for chunk in coalescer.stream("analyze_stock", "k", produce):
+                received.append(chunk)
+        assert received == ["部分"]
+
+    asyncio.run(scenario())
+
+
+def test_non_streaming_caller_joins_running_stream():
+    async def scenario():
+        coalescer = InflightCoalescer()
+        gate = threading.Event()
+        produce = producer_factory(["A", "B"], gate=gate)
+        factory_calls = []
+
+        async def factory():
+            factory_calls.append(1)
+            return "separate call"
+
+        stream = asyncio.ensure_future(collect(coalescer.stream("analyze_stock", "k", produce)))
+        await asyncio.sleep(0.01)
+        joined = asyncio.ensure_future(coalescer.run("analyze_stock", "k", factory))
+        gate.set()
+        assert await stream == ["A", "B"]
+        assert await joined == "AB"
+        assert factory_calls == []
+
+    asyncio.run(scenario())
+
+
+def test_streaming_caller_joins_running_call():
+    async def scenario():
+        coalescer = InflightCoalescer()
+        release = asyncio.Event()
+        calls = []
+
+        async def factory():
+            await release.wait()
+            return {"signal": "hold"}
+
+        run = asyncio.ensure_future(coalescer.run("analyze_stock", "k", factory))
+        await asyncio.sleep(0)
+        stream = asyncio.ensure_future(collect(coalescer.stream("analyze_stock", "k", producer_factory(["x"], calls=calls))))
+        release.set()
+        assert await run == {"signal": "hold"}
+        assert await stream == ['{"signal": "hold"}']
+        assert calls == []
+
+    asyncio.run(scenario())
@@ -0,0 +1,139 @@
+import threading
+import time
+
+from app.core.job_runner import ExclusiveJobRunner, checkpoint
+
+
+def wait_idle(runner, name, timeout=5):
+    # future 先完成，统计与下一次运行在其后更新
+    deadline = time.time() + timeout
+    while runner.is_running(name) and time.time() < deadline:
+        time.sleep(0.01)
+    assert not runner.is_running(name)
+
+
+def blocking_job(started, release, result="done"):
+    started.set()
+    release.wait(5)
+    return result
+
+
+def test_coalesce_shares_running_result():
+    runner = ExclusiveJobRunner()
+    started, release = threading.Event(), threading.Event()
+    status, first = runner.submit("analysis", blocking_job, started, release)
+    assert status == "started"
+    assert started.wait(5)
+
+    status, second = runner.submit("analysis", blocking_job, started, release, result="other")
+    assert status == "coalesced"
+    assert second is first
+
+    release.set()
+    assert first.result(5) == "done"
+    wait_idle(runner, "analysis")
+    stats = runner.snapshot()["analysis"]
+    assert stats["started"] == 1 and stats["completed"] == 1 and stats["coalesced"] == 1
+
+
+def test_queue_runs_after_current_and_dedupes_identical_requests():
+    runner = ExclusiveJobRunner()
+    started, release = threading.Event(), threading.Event()
+    order = []
+
+    def job(mode):
+        order.append(mode)
+        return mode
+
+    runner.submit("analysis", blocking_job, started, release)
+    assert started.wait(5)
+
+    status, a = runner.submit("analysis", job, "intraday", policy="queue")
+    assert status == "queued"
+    status, b = runner.submit("analysis", job, "intraday", policy="queue")
+    assert status == "queued" and b is a
+    _, c = runner.submit("analysis", job, "after_hours", policy="queue")
+    assert runner.snapshot()["analysis"]["pending"] == 2
+
+    release.set()
+    assert a.result(5) == "intraday"
+    assert c.result(5) == "after_hours"
+    assert order == ["intraday", "after_hours"]
+    wait_idle(runner, "analysis")
+    stats = runner.snapshot()["analysis"]
+    assert stats["started"] == 3 and stats["completed"] == 3
+    assert stats["queued"] == 2 and stats["coalesced"] == 1
+
+
+def test_cancel_stops_at_checkpoint_and_drops_pending():
+    runner = ExclusiveJobRunner()
+    started = threading.Event()
+    reached = []
+
+    def cancellable():
+        started.set()
+        for i in range(500):
+            checkpoint()
+            reached.append(i)
+            threading.Event().wait(0.01)
+        return "finished"
+
+    _, running = runner.submit("lhb_sync", cancellable)
+    assert started.wait(5)
+    _, pending = runner.submit("lhb_sync", cancellable, policy="queue", label="again")
+
+    assert runner.cancel("lhb_sync")
+    assert running.result(5) is None
+    assert pending.cancelled()
+    assert len(reached) < 500
+    wait_idle(runner, "lhb_sync")
+    stats = runner.snapshot()["lhb_sync"]
+    assert stats["cancelled"] == 2 and stats["completed"] == 0
+
+
+def test_failure_is_reported_and_next_run_starts():
+    runner = ExclusiveJobRunner()
+
+    def boom():
+        raise ValueError("bad")
+
+    _, future = runner.submit("analysis", boom)
+    try:
+        future.result(5)
+    except ValueError as e:
+        assert str(e) == "bad"
+    else:
+        raise AssertionError("expected ValueError")
+    wait_idle(runner, "analysis")
+
+    status, future = runner.submit("analysis", lambda: 42)
+    assert status == "started"
+    assert future.result(5) == 42
+    wait_idle(runner, "analysis")
+    stats = runner.snapshot()["analysis"]
+    assert stats["failed"] == 1 and stats["completed"] == 1
+
+
+def test_cancel_without_job_returns_false():
+    runner = ExclusiveJobRunner()
+    assert runner.cancel("missing") is False
+    assert checkpoint() is None  # 不在任务线程中时检查点不做任何事
+
+
+def test_cancel_right_after_submit_is_not_lost():
+    runner = ExclusiveJobRunner()
+    calls = []
+
+    def job():
+        calls.append(1)
+        for _ in range(500):
+            checkpoint()
+            time.sleep(0.01)
+        return "finished"
+
+    for _ in range(20):
+        _, future = runner.submit("lhb_sync", job)
+        assert runner.cancel("lhb_sync") is True
+        assert future.result(5) is None
+        wait_idle(runner, "lhb_sync")
+    assert runner.snapshot()["lhb_sync"]["cancelled"] == 20
@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+from app.core.job_scheduler import CronTrigger, IntervalTrigger, JobScheduler
+
+
+async def wait_for(predicate, timeout=2):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_reschedule_replaces_pending_entry():
+    async def scenario():
+        scheduler = JobScheduler()
+        calls = []
+
+        async def job():
+            calls.append(time.time())
+
+        scheduler.add_job("sync", job, IntervalTrigger(3600))
+        scheduler.start()
+        await asyncio.sleep(0.05)
+        assert calls == []
+
+        # 提前到现在运行: 旧的一小时后的堆条目作废
+        scheduler.reschedule("sync", at=time.time())
+        await wait_for(lambda: calls)
+        await wait_for(lambda: not scheduler.jobs["sync"].running)
+        job_state = scheduler.jobs["sync"]
+        assert job_state.runs == 1
+        # 结束后按触发器重新排期，堆中只有一个有效条目
+        assert job_state.next_run > time.time() + 3000
+        live = [entry for entry in scheduler._heap if entry[3] == job_state.token]
+        assert len(live) == 1
+        scheduler.stop()
+
+    asyncio.run(scenario())
+
+
+def test_reschedule_ignored_while_running():
+    async def scenario():
+        scheduler = JobScheduler()
+        release = asyncio.Event()
+        runs = []
+
+        async def job():
+            runs.append(1)
+            await release.wait()
+
+        scheduler.add_job("analysis", job, IntervalTrigger(3600), run_immediately=True)
+        scheduler.start()
+        await wait_for(lambda: scheduler.jobs["analysis"].running)
+        token = scheduler.jobs["analysis"].token
+        scheduler.reschedule("analysis", at=time.time())
+        assert scheduler.jobs["analysis"].token == token
+        assert scheduler.run_now("analysis") is False
+        assert scheduler.jobs["analysis"].overlaps == 1
+
+        release.set()
+        await wait_for(lambda: not scheduler.jobs["analysis"].running)
+        await asyncio.sleep(0.05)
+        assert runs == [1]
+        scheduler.stop()
+
+    asyncio.run(scenario())
+
+
+def test_condition_skip_and_error_backoff():
+    async def scenario():
+        scheduler = JobScheduler()
+
+        async def failing():
+            raise RuntimeError("upstream down")
+
+        async def never():
+            raise AssertionError("should not run")
+
+        scheduler.add_job("quotes", never, IntervalTrigger(0.02), condition=lambda: False)
+        scheduler.add_job("lhb", failing, IntervalTrigger(0.01), error_backoff=3600, run_immediately=True)
+        scheduler.start()
+        await wait_for(lambda: scheduler.jobs["quotes"].skipped >= 2)
+        await wait_for(lambda: scheduler.jobs["lhb"].errors == 1)
+        await wait_for(lambda: scheduler.jobs["lhb"].next_run is not None)
+
+        lhb = scheduler.jobs["lhb"]
+        assert lhb.last_error == "upstream down"
+        assert lhb.next_run > time.time() + 3000
+        assert scheduler.jobs["quotes"].runs == 0
+        scheduler.stop()
+
+    asyncio.run(scenario())
+
+
+def test_stop_drops_running_job_schedule():
+    async def scenario():
+        scheduler = JobScheduler()
+        release = asyncio.Event()
+
+        async def job():
+            await release.wait()
+
+        scheduler.add_job("analysis", job, IntervalTrigger(0.01), run_immediately=True)
+        scheduler.start()
+        await wait_for(lambda: scheduler.jobs["analysis"].running)
+        job_state = scheduler.jobs["analysis"]
+        scheduler.stop()
+        release.set()
+        await wait_for(lambda: not job_state.running)
+        assert scheduler.jobs == {}
+        assert scheduler._heap == []
+
+    asyncio.run(scenario())
+
+
+def test_cron_trigger_respects_weekdays():
+    trigger = CronTrigger(9, 15, weekdays=range(5))
+    # 2026-10-17 为周六，下一次应为周一 09:15
+    now = time.mktime((2026, 10, 17, 10, 0, 0, 0, 0, -1))
+    next_run = time.localtime(trigger.next_time(now))
+    assert (next_run.tm_year, next_run.tm_mon, next_run.tm_mday) == (2026, 10, 19)
+    assert (next_run.tm_hour, next_run.tm_min) == (9, 15)
@@ -0,0 +1,59 @@
+import json
+import random
+
+from app.core.keyword_matcher import DEFAULT_KEYWORDS, KeywordMatcher, load_keyword_matcher
+
+
+def naive_matches(text, matcher):
+    found = set()
+    for kind, groups in (("theme", matcher.themes), ("exclude", matcher.exclude)):
+        for group, keywords in groups.items():
+            for keyword in keywords:
+                start = text.find(keyword)
+                while keyword and start != -1:
+                    found.add((start + len(keyword), kind, group, keyword))
+                    start = text.find(keyword, start + 1)
+    return found
+
+
+def test_match_groups_in_first_hit_order():
+    matcher = KeywordMatcher(DEFAULT_KEYWORDS["themes"], DEFAULT_KEYWORDS["exclude"])
+    result = matcher.match("证监会发布新规，A股多只个股涨停，板块资金流入；美股收跌")
+    assert result["themes"] == ["监管政策", "大盘", "涨跌停", "板块题材", "资金"]
+    assert result["excluded"] == ["境外市场"]
+    assert result["keywords"] == ["证监会", "A股", "涨停", "板块", "资金", "美股"]
+    assert matcher.match("") == {"themes": [], "excluded": [], "keywords": []}
+    assert matcher.match(None) == {"themes": [], "excluded": [], "keywords": []}
+
+
+def test_overlapping_and_nested_keywords():
+    # 共享前缀 / 后缀与互相包含的关键词都要命中 (依赖失败指针上的输出合并)
+    matcher = KeywordMatcher({"a": ["he", "she", "his", "hers"], "b": ["人工智能", "智能"], "c": ["能源"]})
+    hits = sorted((end, kw) for end, _, _, kw in matcher.iter_matches("ushers"))
+    assert hits == [(4, "he"), (4, "she"), (6, "hers")]
+    result = matcher.match("人工智能源")
+    assert result["keywords"] == ["人工智能", "智能", "能源"]
+    assert result["themes"] == ["b", "c"]
+
+
+def test_matches_naive_search_on_random_text():
+    rng = random.Random(3)
+    alphabet = "涨停跌板块资金证券龙头概念"
+    keywords = {f"g{i}": ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(3)]
+                for i in range(6)}
+    matcher = KeywordMatcher(keywords, {"x": ["停板", "块"]})
+    for _ in range(200):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+        assert set(matcher.iter_matches(text)) == naive_matches(text, matcher)
+
+
+def test_load_keyword_matcher_from_file_and_fallback(tmp_path):
+    path = tmp_path / "news_keywords.json"
+    path.write_text(json.dumps({"themes": {"算力": ["算力", "GPU"]}}, ensure_ascii=False), encoding="utf-8")
+    matcher = load_keyword_matcher(path)
+    assert matcher.match("GPU 算力需求旺盛")["themes"] == ["算力"]
+    assert matcher.match("美股大涨")["excluded"] == []
+
+    path.write_text("{broken", encoding="utf-8")
+    assert load_keyword_matcher(path).match("美股大涨")["excluded"] == ["境外市场"]
+    assert load_keyword_matcher(tmp_path / "missing.json").match("涨停")["themes"] == ["涨跌停"]
@@ -0,0 +1,36 @@
+import time
+
+from app.core.llm_limiter import RateLimiter, estimate_tokens
+
+
+def test_rpm_limit_waits_for_window():
+    limiter = RateLimiter(rpm=2, tpm=10**6, window=0.3)
+    assert limiter.acquire() < 0.05
+    assert limiter.acquire() < 0.05
+    started = time.time()
+    waited = limiter.acquire()
+    assert waited >= 0.25
+    assert time.time() - started >= 0.25
+    assert limiter.stats()["total_requests"] == 3
+
+
+def test_tpm_limit_waits_for_tokens_to_expire():
+    limiter = RateLimiter(rpm=100, tpm=100, window=0.3)
+    assert limiter.acquire(60) < 0.05
+    assert limiter.acquire(30) < 0.05
+    # 60 + 30 + 20 > 100: 需等第一条滑出窗口
+    assert limiter.acquire(20) >= 0.25
+    stats = limiter.stats()
+    assert stats["total_tokens"] == 110
+    assert stats["total_wait_seconds"] > 0
+
+
+def test_oversized_request_passes_when_window_is_empty():
+    limiter = RateLimiter(rpm=10, tpm=100, window=0.3)
+    assert limiter.acquire(500) < 0.05
+    assert limiter.stats()["tokens_in_window"] == 500
+
+
+def test_estimate_tokens_weights_cjk_higher():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("中" * 100) > estimate_tokens("a" * 100)
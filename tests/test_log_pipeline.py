@@ -0,0 +1,72 @@
+import asyncio
+import json
+import threading
+
+from app.core.log_pipeline import LogPipeline
+
+
+def test_burst_from_threads_is_batched_into_one_frame():
+    async def scenario():
+        pipeline = LogPipeline()
+        pipeline.bind(asyncio.get_running_loop())
+        frames = []
+
+        async def broadcast(frame):
+            frames.append(frame)
+
+        task = asyncio.create_task(pipeline.run(broadcast))
+        threads = [threading.Thread(target=lambda i=i: pipeline.emit(f"line {i}")) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        await asyncio.sleep(0.05)
+
+        # 积压的日志合并成一帧 (各线程的先后顺序不确定)
+        assert len(frames) == 1
+        frame = json.loads(frames[0])
+        assert frame["type"] == "logs"
+        assert sorted(frame["lines"]) == sorted(f"line {i}" for i in range(20))
+
+        # 空闲后的单条日志保持纯文本
+        pipeline.emit("single")
+        await asyncio.sleep(0.05)
+        assert frames[-1] == "single"
+        assert pipeline.stats == {"emitted": 21, "frames": 2, "dropped": 0}
+        task.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_logs_before_bind_are_delivered_and_overflow_drops_oldest():
+    async def scenario():
+        pipeline = LogPipeline(queue_size=3)
+        for i in range(5):
+            pipeline.emit(f"early {i}")
+        assert pipeline.snapshot()["queued"] == 5
+        pipeline.bind(asyncio.get_running_loop())
+        assert pipeline.stats["dropped"] == 2
+
+        frames = []
+
+        async def broadcast(frame):
+            frames.append(frame)
+
+        task = asyncio.create_task(pipeline.run(broadcast))
+        await asyncio.sleep(0.05)
+        assert json.loads(frames[0])["lines"] == ["early 2", "early 3", "early 4"]
+        task.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_since_replays_backlog_for_late_clients():
+    pipeline = LogPipeline(backlog_size=3)
+    seq, lines = pipeline.since(0)
+    assert (seq, lines) == (0, [])
+    for i in range(5):
+        pipeline.emit(f"line {i}")
+    assert pipeline.since(3) == (5, ["line 3", "line 4"])
+    # 落后太多时只能回放 backlog 中保留的部分
+    assert pipeline.since(0) == (5, ["line 2", "line 3", "line 4"])
+    assert [item["msg"] for item in pipeline.recent(2)] == ["line 3", "line 4"]
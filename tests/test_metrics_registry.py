@@ -0,0 +1,69 @@
+import pytest
+
+from app.core.metrics import MetricsRegistry
+
+
+def test_counter_and_gauge_exposition():
+    registry = MetricsRegistry()
+    requests = registry.counter("app_requests_total", "Requests", ("path", "status"))
+    requests.inc(path="/api/stocks", status="200")
+    requests.inc(2, path="/api/stocks", status="200")
+    depth = registry.gauge("app_queue_depth", "Queue depth")
+    depth.set(5)
+    depth.dec(2)
+
+    text = registry.render()
+    assert text.endswith("\n")
+    assert text.splitlines() == [
+        "# HELP app_requests_total Requests",
+        "# TYPE app_requests_total counter",
+        'app_requests_total{path="/api/stocks",status="200"} 3',
+        "# HELP app_queue_depth Queue depth",
+        "# TYPE app_queue_depth gauge",
+        "app_queue_depth 3",
+    ]
+    # 同名指标重复注册返回同一个对象
+    assert registry.counter("app_requests_total", "Requests", ("path", "status")) is requests
+    with pytest.raises(ValueError):
+        requests.inc(path="/api/stocks")
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("app_latency_seconds", "Latency", ("op",), buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value, op="scan")
+
+    assert registry.render().splitlines()[2:] == [
+        'app_latency_seconds_bucket{op="scan",le="0.1"} 2',
+        'app_latency_seconds_bucket{op="scan",le="1"} 3',
+        'app_latency_seconds_bucket{op="scan",le="+Inf"} 4',
+        'app_latency_seconds_sum{op="scan"} 3.65',
+        'app_latency_seconds_count{op="scan"} 4',
+    ]
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter("app_errors_total", "Errors", ("message",)).inc(message='bad "quote"\\path\nnext')
+    assert registry.render().splitlines()[-1] == 'app_errors_total{message="bad \\"quote\\"\\\\path\\nnext"} 1'
+
+
+def test_collectors_render_at_scrape_time_and_failures_are_skipped():
+    registry = MetricsRegistry()
+    state = {"depth": 1}
+
+    @registry.register_collector
+    def executor_gauges():
+        return [("app_executor_queue_depth", "gauge", "Queued tasks", [({"pool": "market_io"}, state["depth"])])]
+
+    @registry.register_collector
+    def broken():
+        raise RuntimeError("boom")
+
+    state["depth"] = 7
+    assert registry.render().splitlines() == [
+        "# HELP app_executor_queue_depth Queued tasks",
+        "# TYPE app_executor_queue_depth gauge",
+        'app_executor_queue_depth{pool="market_io"} 7',
+    ]
@@ -0,0 +1,111 @@
+import pytest
+
+from app.core.news_dedup import cluster_news, dedupe_news, normalize_text
+
+# 真实样式的转载对: 财联社快讯 (【标题】财联社X月X日电，正文) 与东方财富快讯 (另拟标题 / 无来源前缀)
+DUPLICATE_PAIRS = {
+    "cls_dateline_prefix": (
+        "【宁德时代：第三季度净利润131.36亿元 同比增长25.97%】财联社10月18日电，宁德时代公告，第三季度营收922.77亿元，同比下降12.72%；净利润131.36亿元，同比增长25.97%。前三季度净利润360.01亿元，同比增长15.59%。",
+        "【宁德时代：第三季度净利润131.36亿元 同比增长25.97%】宁德时代公告，第三季度营收922.77亿元，同比下降12.72%；净利润131.36亿元，同比增长25.97%。前三季度净利润360.01亿元，同比增长15.59%。",
+    ),
+    "cls_dateline_short": (
+        "【工信部：加快推进L3级自动驾驶准入试点】财联社10月19日电，工信部表示，将加快推进智能网联汽车准入和上路通行试点，支持L3级及以上自动驾驶功能商业化应用。",
+        "【工信部：加快推进L3级自动驾驶准入试点】工信部表示，将加快推进智能网联汽车准入和上路通行试点，支持L3级及以上自动驾驶功能商业化应用。",
+    ),
+    "eastmoney_title_wrapper": (
+        "【国家数据局：年内新增智算中心规模超过30%】财联社10月19日电，国家数据局局长在发布会上表示，将加快推进算力基础设施建设，年内新增智算中心规模超过30%，推动算力资源全国一体化调度。",
+        "【国家数据局：加快推进算力基础设施建设】国家数据局局长在发布会上表示，将加快推进算力基础设施建设，年内新增智算中心规模超过30%，推动算力资源全国一体化调度。",
+    ),
+    "one_word_changed": (
+        "【中兴通讯中标运营商5G-A集采大单】中兴通讯签订运营商5G-A集采大单，金额超过百亿元，份额位居行业第一，公司表示将保障按期交付。",
+        "【中兴通讯中标运营商5G-A集采大单】中兴通讯斩获运营商5G-A集采大单，金额超过百亿元，份额位居行业第一，公司表示将保障按期交付。",
+    ),
+    "appended_sentence": (
+        "【固态电池产业化提速】财联社10月19日电，多家头部电池企业固态电池中试线近期陆续投产，业内预计2027年实现小批量装车。",
+        "【固态电池产业化提速】财联社10月19日电，多家头部电池企业固态电池中试线近期陆续投产，业内预计2027年实现小批量装车。机构认为，上游硫化物电解质材料有望率先受益。",
+    ),
+    "reporter_byline": (
+        "【低空经济政策密集落地】财联社10月19日讯（记者 王平）多地发布eVTOL起降场建设规划，深圳计划年内新建起降点超过200个，低空物流航线加速开通。",
+        "多地发布eVTOL起降场建设规划，深圳计划年内新建起降点超过200个，低空物流航线加速开通。",
+    ),
+}
+
+# 同模板但不同事件: 不能合并
+DISTINCT_PAIRS = {
+    "buyback_template": (
+        "【三一重工：拟5亿元至10亿元回购股份】财联社10月19日电，三一重工公告，拟以集中竞价方式回购公司股份，回购金额不低于5亿元且不超过10亿元，回购价格不超过20元/股。",
+        "【中国平安：拟50亿元至100亿元回购股份】财联社10月19日电，中国平安公告，拟以集中竞价方式回购公司股份，回购金额不低于50亿元且不超过100亿元，回购价格不超过65元/股。",
+    ),
+    "same_company_other_event": (
+        "【宁德时代：第三季度净利润131.36亿元 同比增长25.97%】财联社10月18日电，宁德时代公告，第三季度营收922.77亿元，同比下降12.72%；净利润131.36亿元，同比增长25.97%。",
+        "【宁德时代：拟在匈牙利投建电池工厂】财联社10月19日电，宁德时代公告，拟在匈牙利德布勒森投资建设电池产业基地，总投资不超过73.4亿欧元。",
+    ),
+    "sector_move_template": (
+        "【白酒板块午后异动拉升】财联社10月19日电，白酒板块午后异动拉升，贵州茅台涨超3%，五粮液、泸州老窖跟涨。",
+        "【券商板块午后异动拉升】财联社10月19日电，券商板块午后异动拉升，东方财富涨超3%，中信证券、华泰证券跟涨。",
+    ),
+    "holding_change_template": (
+        "【科大讯飞：股东拟减持不超过1%股份】财联社10月19日电，科大讯飞公告，持股5%以上股东拟在未来三个月内通过集中竞价方式减持不超过1%公司股份。",
+        "【四维图新：股东拟减持不超过2%股份】财联社10月19日电，四维图新公告，持股5%以上股东拟在未来三个月内通过大宗交易方式减持不超过2%公司股份。",
+    ),
+}
+
+
+def news(text, source="财联社"):
+    return {"text": text, "source": source}
+
+
+def test_normalize_strips_source_boilerplate():
+    text = "【低空经济政策密集落地】财联社10月19日讯（记者 王平）多地发布eVTOL起降场建设规划，深圳计划年内新建起降点超过200个。"
+    assert normalize_text(text) == "多地发布eVTOL起降场建设规划，深圳计划年内新建起降点超过200个。"
+    # 正文过短时保留标题
+    assert normalize_text("【央行宣布降准0.5个百分点】") == "【央行宣布降准0.5个百分点】"
+
+
+@pytest.mark.parametrize("name", sorted(DUPLICATE_PAIRS))
+def test_duplicate_pairs_cluster(name):
+    a, b = DUPLICATE_PAIRS[name]
+    assert cluster_news([news(a), news(b, "东方财富")]) == [[0, 1]]
+
+
+@pytest.mark.parametrize("name", sorted(DISTINCT_PAIRS))
+def test_distinct_pairs_stay_apart(name):
+    a, b = DISTINCT_PAIRS[name]
+    assert cluster_news([news(a), news(b)]) == [[0], [1]]
+
+
+def test_dedupe_keeps_longest_in_original_order():
+    short, long_ = DUPLICATE_PAIRS["appended_sentence"]
+    other = DISTINCT_PAIRS["buyback_template"][0]
+    items = [news(short), news(other), news(long_, "东方财富")]
+
+    result, report = dedupe_news(items)
+
+    assert [item["text"] for item in result] == [other, long_]
+    assert result[1]["duplicate_count"] == 1
+    assert result[1]["sources"] == ["东方财富", "财联社"]
+    assert "duplicate_count" not in items[2]
+    assert report["items_before"] == 3
+    assert report["items_after"] == 2
+    assert report["clusters_merged"] == 1
+    assert report["tokens_saved"] == report["tokens_before"] - report["tokens_after"] > 0
+
+
+def test_mixed_feed_clusters_each_story():
+    items = []
+    for a, b in DUPLICATE_PAIRS.values():
+        items += [news(a), news(b, "东方财富")]
+    for a, b in DISTINCT_PAIRS.values():
+        items += [news(a), news(b)]
+
+    result, report = dedupe_news(items)
+
+    # same_company_other_event 的三季报一条是 cls_dateline_prefix 的删节版，归入同一簇
+    assert report["clusters_merged"] == len(DUPLICATE_PAIRS)
+    assert len(result) == len(DUPLICATE_PAIRS) + 2 * len(DISTINCT_PAIRS) - 1
+
+
+def test_empty_input():
+    assert dedupe_news([]) == ([], {"items_before": 0, "items_after": 0, "clusters_merged": 0,
+                                    "tokens_before": 0, "tokens_after": 0, "tokens_saved": 0})
+    assert cluster_news([news(""), news("")]) == [[0], [1]]
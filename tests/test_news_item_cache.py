@@ -0,0 +1,59 @@
+import time
+
+import pytest
+
+from app.core import ai_cache as ai_cache_module
+from app.core import news_item_cache
+from app.core.news_item_cache import lookup_news_cache, news_item_cache_key, store_news_item_results
+from app.core.persistence import persistence
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_cache_module, "CACHE_FILE", tmp_path / "ai_cache.json")
+    cache = ai_cache_module.AICache()
+    monkeypatch.setattr(news_item_cache, "ai_cache", cache)
+    yield cache
+    persistence.discard("ai_cache")
+
+
+def test_batch_result_is_split_per_news_item(cache):
+    batch = [{"text": "甲公司中标大单"}, {"text": "乙公司业绩预增"}, {"text": "宏观数据公布"}]
+    store_news_item_results(batch, {
+        "stocks": [
+            {"code": "sh600001", "news_id": 1},
+            {"code": "sz000002", "news_id": "2"},
+            {"code": "sh600000", "news_id": 0},  # 来自市场数据，不归属新闻
+        ],
+        "remove_stocks": [{"code": "sz000003", "news_id": 2}],
+    }, "after_hours")
+
+    # 换一个批次组合 (顺序不同、混入新新闻) 仍能逐条命中
+    items = [{"text": "丙公司重组"}, batch[1], batch[0], batch[2]]
+    merged, hits, fresh = lookup_news_cache(items, "after_hours")
+    assert hits == 3
+    assert fresh == [{"text": "丙公司重组"}]
+    assert merged["stocks"] == [{"code": "sz000002"}, {"code": "sh600001"}]
+    assert merged["remove_stocks"] == [{"code": "sz000003"}]
+
+    # 不同模式互不共享
+    assert lookup_news_cache(items, "intraday")[1] == 0
+
+
+def test_unattributable_batch_is_not_cached(cache):
+    batch = [{"text": "甲公司中标大单"}, {"text": "乙公司业绩预增"}]
+    store_news_item_results(batch, {"stocks": [{"code": "sh600001"}, {"code": "sz000002", "news_id": 1}]}, "after_hours")
+    store_news_item_results(batch, {"stocks": [{"code": "sh600001", "news_id": 5}]}, "after_hours")
+    store_news_item_results(batch, "not a dict", "after_hours")
+    assert lookup_news_cache(batch, "after_hours")[1] == 0
+
+
+def test_no_cache_items_and_expired_entries_miss(cache):
+    placeholder = {"text": "无新闻", "no_cache": True}
+    store_news_item_results([placeholder, {"text": "甲公司中标大单"}], {"stocks": []}, "after_hours")
+    assert news_item_cache_key(placeholder, "after_hours") not in cache.cache
+    assert lookup_news_cache([placeholder], "after_hours")[2] == [placeholder]
+
+    key = news_item_cache_key({"text": "甲公司中标大单"}, "after_hours")
+    cache.cache[key]["timestamp"] = int(time.time()) - 2 * 86400
+    assert lookup_news_cache([{"text": "甲公司中标大单"}], "after_hours")[1] == 0
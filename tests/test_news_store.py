@@ -0,0 +1,119 @@
+import json
+import time
+
+from app.core import news_store as news_store_module
+from app.core.news_store import NewsStore
+
+
+def make_store(tmp_path):
+    return NewsStore(directory=tmp_path / "news", legacy_path=tmp_path / "news_history.json")
+
+
+def make_items(count, start, step=60, same_ts_every=1):
+    return [{"timestamp": start + (i // same_ts_every) * step, "text": f"新闻{i:03d}", "source": "CLS"}
+            for i in range(count)]
+
+
+def page_through(store, limit, **kwargs):
+    pages, cursor = [], None
+    while True:
+        items, cursor = store.query(limit=limit, cursor=cursor, **kwargs)
+        pages.append(items)
+        if cursor is None:
+            return pages
+
+
+def test_append_dedupes_and_query_newest_first(tmp_path):
+    store = make_store(tmp_path)
+    now = int(time.time())
+    items = make_items(5, now - 300)
+    assert len(store.append(items)) == 5
+    assert store.append([dict(items[0])]) == []
+    result, cursor = store.query()
+    assert [item["text"] for item in result] == ["新闻004", "新闻003", "新闻002", "新闻001", "新闻000"]
+    assert cursor is None
+    assert store.query(source="EastMoney")[0] == []
+
+
+def test_cursor_pagination_with_shared_timestamps_across_segments(tmp_path):
+    store = make_store(tmp_path)
+    # 三天的新闻，每 3 条共用一个时间戳，分页边界会落在同一时间戳中间
+    start = int(time.time()) - 3 * 86400
+    items = make_items(60, start, step=4 * 3600, same_ts_every=3)
+    store.append(items)
+    assert len(store.segments) >= 3
+
+    full, _ = store.query()
+    for limit in (1, 2, 4, 7):
+        pages = page_through(store, limit)
+        flat = [item["text"] for page in pages for item in page]
+        assert flat == [item["text"] for item in full]
+
+
+def test_clear_before_keeps_order_of_same_timestamp_items(tmp_path):
+    store = make_store(tmp_path)
+    base = int(time.time()) - 600
+    store.append([{"timestamp": base, "text": "旧"}])
+    store.append([{"timestamp": base + 100, "text": f"同时{i}"} for i in range(4)])
+    before, _ = store.query()
+
+    assert store.clear_before(base + 1) == 1
+    after, _ = store.query()
+    assert [item["text"] for item in after] == [item["text"] for item in before if item["text"] != "旧"]
+    # 重写后重新加载，顺序不变
+    reloaded = make_store(tmp_path)
+    reloaded.load()
+    assert [item["text"] for item in reloaded.query()[0]] == [item["text"] for item in after]
+    # 被删除的条目可以重新写入
+    assert len(store.append([{"timestamp": base, "text": "旧"}])) == 1
+
+
+def test_retention_drops_whole_segments(tmp_path):
+    store = make_store(tmp_path)
+    now = int(time.time())
+    store.append([{"timestamp": now - 10 * 86400, "text": "十天前"},
+                  {"timestamp": now - 86400, "text": "昨天"},
+                  {"timestamp": now, "text": "今天"}])
+    assert store.apply_retention(3) == 1
+    assert [item["text"] for item in store.query()[0]] == ["今天", "昨天"]
+    assert len(list((tmp_path / "news").glob("*.jsonl"))) == 2
+
+
+def test_legacy_migrated_once(tmp_path):
+    now = int(time.time())
+    legacy = make_items(5, now - 300)
+    (tmp_path / "news_history.json").write_text(json.dumps(legacy, ensure_ascii=False), encoding="utf-8")
+
+    store = make_store(tmp_path)
+    store.load()
+    assert store.stats()["items"] == 5
+    assert not (tmp_path / "news_history.json").exists()
+    assert (tmp_path / "news_history.json.migrated").exists()
+
+    # 清空后重启，旧文件不会再被导入
+    assert store.clear_all() == 5
+    restarted = make_store(tmp_path)
+    restarted.load()
+    assert restarted.stats() == {"segments": 0, "items": 0, "cached_segments": 0}
+
+
+def test_legacy_file_with_existing_segments_is_not_reimported(tmp_path):
+    now = int(time.time())
+    store = make_store(tmp_path)
+    store.append([{"timestamp": now, "text": "已迁移"}])
+    (tmp_path / "news_history.json").write_text(json.dumps(make_items(3, now - 300)), encoding="utf-8")
+
+    restarted = make_store(tmp_path)
+    restarted.load()
+    assert restarted.stats()["items"] == 1
+    assert (tmp_path / "news_history.json.migrated").exists()
+
+
+def test_segment_cache_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(news_store_module, "SEGMENT_CACHE_SIZE", 2)
+    store = make_store(tmp_path)
+    start = int(time.time()) - 6 * 86400
+    store.append(make_items(7, start, step=86400))
+    pages = page_through(store, 1)
+    assert len([page for page in pages if page]) == 7
+    assert store.stats()["cached_segments"] <= 2
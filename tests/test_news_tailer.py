@@ -0,0 +1,96 @@
+import json
+import time
+
+import pytest
+
+from app.core import news_tailer as news_tailer_module
+from app.core.news_store import NewsStore
+from app.core.news_tailer import NewsTailer
+from app.core.persistence import persistence
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = NewsStore(directory=tmp_path / "news", legacy_path=tmp_path / "news_history.json")
+    monkeypatch.setattr(news_tailer_module, "news_store", store)
+    yield store
+    persistence.discard("news_cursors")
+
+
+def make_tailer(tmp_path, store, sources):
+    tailer = NewsTailer(cursor_file=tmp_path / "news_cursors.json")
+    tailer._sources = lambda: sources
+    # 与 save_news_history 相同：新条目写入新闻历史存储
+    tailer._save = store.append
+    return tailer
+
+
+class FakeSource:
+    def __init__(self, items=()):
+        self.items = list(items)
+        self.calls = []
+        self.error = None
+
+    def __call__(self, since, logger=None):
+        self.calls.append(since)
+        if self.error:
+            raise self.error
+        return [dict(item) for item in self.items if item["timestamp"] >= since]
+
+
+def test_poll_advances_cursor_and_dedupes(tmp_path, store):
+    now = int(time.time())
+    cls = FakeSource([{"timestamp": now - 60, "text": "a"}, {"timestamp": now - 30, "text": "b"}])
+    em = FakeSource()
+    tailer = make_tailer(tmp_path, store, {"CLS": cls, "EM": em})
+
+    added = tailer.poll()
+    assert [item["text"] for item in added] == ["b", "a"]
+    assert all(item["source"] == "CLS" for item in added)
+    assert tailer.cursors == {"CLS": now - 30}
+    assert abs(em.calls[0] - (now - news_tailer_module.NEWS_TAIL_BACKFILL_HOURS * 3600)) <= 1
+
+    # 同一秒内新到的条目仍能抓到，已见过的条目不会重复
+    cls.items.append({"timestamp": now - 30, "text": "c"})
+    added = tailer.poll()
+    assert cls.calls[-1] == now - 30
+    assert [item["text"] for item in added] == ["c"]
+    assert [item["text"] for item in tailer.recent(1)] == ["b", "c", "a"]
+    assert len(store.query()[0]) == 3
+
+
+def test_restart_resumes_from_cursor_file_and_history(tmp_path, store):
+    now = int(time.time())
+    cls = FakeSource([{"timestamp": now - 60, "text": "a"}])
+    tailer = make_tailer(tmp_path, store, {"CLS": cls})
+    tailer.poll()
+    persistence.flush("news_cursors")
+    assert json.loads((tmp_path / "news_cursors.json").read_text(encoding="utf-8")) == {"CLS": now - 60}
+
+    restarted = make_tailer(tmp_path, store, {"CLS": cls})
+    restarted.load()
+    assert restarted.cursors == {"CLS": now - 60}
+    assert [item["text"] for item in restarted.recent(1)] == ["a"]
+    # 重启后从游标继续抓取，历史中已有的条目不再视为新增
+    assert restarted.poll() == []
+    assert cls.calls[-1] == now - 60
+
+
+def test_failed_source_is_not_fresh(tmp_path, store):
+    cls, em = FakeSource(), FakeSource()
+    tailer = make_tailer(tmp_path, store, {"CLS": cls, "EM": em})
+    assert not tailer.is_fresh(1)
+
+    tailer.poll()
+    assert tailer.is_fresh(1)
+    assert not tailer.is_fresh(news_tailer_module.NEWS_TAIL_RETENTION_HOURS + 1)
+
+    # 上游故障期间 last_success 不再前进，超过阈值后回退到全量抓取
+    em.error = ConnectionError("upstream down")
+    stale = time.time() - 10 * max(3 * news_tailer_module.NEWS_TAIL_INTERVAL, 120)
+    tailer.last_success = {"CLS": stale, "EM": stale}
+    tailer.poll()
+    assert tailer.last_success["EM"] == stale
+    assert tailer.last_success["CLS"] > stale
+    assert "EM" not in tailer.cursors
+    assert not tailer.is_fresh(1)
@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+
+from app.core.persistence import PersistenceService, write_json_atomic
+
+
+def test_write_json_atomic_leaves_no_temp_files(tmp_path):
+    path = tmp_path / "state.json"
+    size = write_json_atomic(path, {"a": 1, "名称": "测试"})
+    assert json.loads(path.read_text(encoding="utf-8")) == {"a": 1, "名称": "测试"}
+    assert size == path.stat().st_size
+    assert [p.name for p in tmp_path.iterdir()] == ["state.json"]
+
+
+def test_write_json_atomic_concurrent_writers(tmp_path):
+    path = tmp_path / "state.json"
+    errors = []
+
+    def writer(n):
+        try:
+            for i in range(50):
+                write_json_atomic(path, {"writer": n, "i": i, "pad": "x" * 1000})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["i"] == 49
+    assert [p.name for p in tmp_path.iterdir()] == ["state.json"]
+
+
+def test_write_json_atomic_failure_keeps_old_file(tmp_path):
+    path = tmp_path / "state.json"
+    write_json_atomic(path, {"ok": True})
+    try:
+        write_json_atomic(path, {"bad": object()})
+    except TypeError:
+        pass
+    assert json.loads(path.read_text(encoding="utf-8")) == {"ok": True}
+    assert [p.name for p in tmp_path.iterdir()] == ["state.json"]
+
+
+def test_flush_skips_unchanged_content(tmp_path):
+    data = {"items": [1, 2, 3]}
+    service = PersistenceService(debounce=60)
+    service.register("state", tmp_path / "state.json", lambda: dict(data))
+
+    service.mark_dirty("state")
+    assert service.flush() == 1
+    service.mark_dirty("state")
+    assert service.flush() == 0
+
+    data["items"] = [4]
+    service.mark_dirty("state")
+    assert service.flush("state") == 1
+    assert json.loads((tmp_path / "state.json").read_text(encoding="utf-8")) == {"items": [4]}
+
+    stats = service.stats()["state"]
+    assert stats["writes"] == 2
+    assert stats["skipped"] == 1
+    assert stats["dirty"] is False
+
+
+def test_first_write_compares_with_existing_file(tmp_path):
+    path = tmp_path / "state.json"
+    write_json_atomic(path, {"a": 1})
+    mtime = path.stat().st_mtime_ns
+
+    service = PersistenceService(debounce=60)
+    service.register("state", path, lambda: {"a": 1})
+    service.mark_dirty("state")
+    assert service.flush() == 0
+    assert path.stat().st_mtime_ns == mtime
+
+
+def test_debounce_coalesces_marks(tmp_path):
+    calls = []
+
+    def snapshot():
+        calls.append(time.time())
+        return {"n": len(calls)}
+
+    service = PersistenceService(debounce=0.2)
+    service.register("state", tmp_path / "state.json", snapshot)
+    for _ in range(20):
+        service.mark_dirty("state")
+
+    # 合并窗口内不写盘
+    time.sleep(0.05)
+    assert calls == []
+    assert service.is_dirty("state")
+
+    deadline = time.time() + 3
+    while service.is_dirty("state") and time.time() < deadline:
+        time.sleep(0.02)
+    time.sleep(0.05)
+    assert len(calls) == 1
+    assert service.stats()["state"]["writes"] == 1
+
+
+def test_discard_drops_pending_write(tmp_path):
+    service = PersistenceService(debounce=60)
+    service.register("state", tmp_path / "state.json", lambda: {"a": 1})
+    service.mark_dirty("state")
+    service.discard("state")
+    assert not service.is_dirty("state")
+    assert service.flush() == 0
+    assert not (tmp_path / "state.json").exists()
+
+
+def test_snapshot_error_keeps_file_dirty(tmp_path):
+    state = {"fail": True}
+
+    def snapshot():
+        if state["fail"]:
+            raise RuntimeError("boom")
+        return {"ok": True}
+
+    service = PersistenceService(debounce=60)
+    service.register("state", tmp_path / "state.json", snapshot)
+    service.mark_dirty("state")
+    assert service.flush() == 0
+    assert service.is_dirty("state")
+    assert service.stats()["state"]["errors"] == 1
+
+    state["fail"] = False
+    assert service.flush() == 1
+    assert json.loads((tmp_path / "state.json").read_text(encoding="utf-8")) == {"ok": True}
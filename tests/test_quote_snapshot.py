@@ -0,0 +1,67 @@
+import asyncio
+import threading
+
+from app.core.quote_snapshot import QuoteSnapshot
+
+
+class FakeFetch:
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+        self._lock = threading.Lock()
+
+    def __call__(self, codes):
+        with self._lock:
+            self.calls.append(list(codes))
+        if self.delay:
+            threading.Event().wait(self.delay)
+        return [{"code": code, "price": len(self.calls)} for code in codes]
+
+
+def test_reads_reuse_snapshot_until_version_or_codes_change():
+    async def scenario():
+        snapshot = QuoteSnapshot()
+        fetch = FakeFetch()
+        first = await snapshot.get(fetch, ["sh600519", "sz000001"], version=1)
+        # 同一版本、同一组代码 (顺序无关) 直接读快照
+        assert await snapshot.get(fetch, ["sz000001", "sh600519"], version=1) is first
+        assert len(fetch.calls) == 1
+
+        # 监控列表版本变化 (策略信息更新) 时补抓一次
+        second = await snapshot.get(fetch, ["sh600519", "sz000001"], version=2)
+        assert second is not first and len(fetch.calls) == 2
+        # 代码集合变化同样补抓
+        await snapshot.get(fetch, ["sh600519"], version=2)
+        assert len(fetch.calls) == 3
+        assert snapshot.stats()["reads"] == 4
+        assert snapshot.stats()["refreshes"] == 3
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_stale_reads_share_one_fetch():
+    async def scenario():
+        snapshot = QuoteSnapshot()
+        fetch = FakeFetch(delay=0.05)
+        results = await asyncio.gather(*[snapshot.get(fetch, ["sh600519"], version=1) for _ in range(5)])
+        assert len(fetch.calls) == 1
+        assert all(result is results[0] for result in results)
+
+        # 生产者的周期刷新 (force=True) 总是重新抓取
+        await snapshot.refresh(fetch, ["sh600519"], version=1)
+        assert len(fetch.calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_adopted_snapshot_serves_reads_without_fetching():
+    async def scenario():
+        snapshot = QuoteSnapshot()
+        fetch = FakeFetch()
+        leader_stocks = [{"code": "sh600519", "price": 1700}]
+        snapshot.adopt(leader_stocks, ["sh600519"], version=3)
+        assert await snapshot.get(fetch, ["sh600519"], version=3) is leader_stocks
+        assert fetch.calls == []
+        assert snapshot.stats()["adopted"] == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,88 @@
+from app.core.shared_state import LeaderElection, SharedState
+
+
+def make_pair(tmp_path):
+    path = tmp_path / "shared.db"
+    return SharedState(path, worker_id="a"), SharedState(path, worker_id="b")
+
+
+def test_changed_reports_other_writers_only(tmp_path):
+    a, b = make_pair(tmp_path)
+    known_a, known_b = {}, {}
+
+    a.put("watchlist:item:sh600001", {"code": "sh600001"})
+    assert a.changed(known_a) == {}
+    assert b.changed(known_b) == {"watchlist:item:sh600001": (1, "a", {"code": "sh600001"})}
+    # 内容未变的写入被跳过，版本号不变
+    assert a.put("watchlist:item:sh600001", {"code": "sh600001"}) is False
+    assert b.changed(known_b) == {}
+
+
+def test_deleted_key_can_be_written_again(tmp_path):
+    a, b = make_pair(tmp_path)
+    known_a, known_b = {}, {}
+    a.put("k", {"v": 1})
+    b.changed(known_b)
+    a.changed(known_a)
+
+    b.delete("k")
+    assert a.changed(known_a) == {"k": (None, None, None)}
+    # 删除后重新写入相同内容不能被当作"未变化"跳过
+    assert a.put("k", {"v": 1}) is True
+    assert b.get("k") == {"v": 1}
+
+
+def test_seed_only_once(tmp_path):
+    a, b = make_pair(tmp_path)
+    assert a.seed("watchlist:seeded", {"watchlist:item:sh600001": {"code": "sh600001"}, "watchlist:order": ["sh600001"]})
+    assert not b.seed("watchlist:seeded", {"watchlist:order": []})
+    assert b.get("watchlist:order") == ["sh600001"]
+    assert set(b.changed({}, prefix="watchlist:item:")) == {"watchlist:item:sh600001"}
+
+
+def test_commands_and_logs(tmp_path):
+    a, b = make_pair(tmp_path)
+    b.enqueue("analyze", {"mode": "intraday"})
+    b.enqueue("cancel", {"name": "analysis"})
+    assert a.take_commands() == [("analyze", {"mode": "intraday"}), ("cancel", {"name": "analysis"})]
+    assert a.take_commands() == []
+
+    cursor, lines = b.logs_since(None)
+    assert lines == []
+    a.append_logs(["one", "two"])
+    cursor, lines = b.logs_since(cursor)
+    assert lines == ["one", "two"]
+    assert b.logs_since(cursor) == (cursor, [])
+
+
+def test_lease_failover(tmp_path):
+    a, b = make_pair(tmp_path)
+    assert a.acquire_lease("background", "a", ttl=60)
+    assert not b.acquire_lease("background", "b", ttl=60)
+    assert b.lease_holder("background") == "a"
+    a.release_lease("background", "a")
+    assert b.acquire_lease("background", "b", ttl=60)
+
+
+def test_standalone_leader_skips_sqlite(tmp_path):
+    state = SharedState(tmp_path / "unused.db", worker_id="solo")
+    changes = []
+    election = LeaderElection(state, ttl=60)
+    election.start_standalone(changes.append)
+    assert election.is_leader
+    assert changes == [True]
+    assert election.snapshot()["leader"] == "solo"
+    election.stop()
+    assert not (tmp_path / "unused.db").exists()
+
+
+def test_purge_removes_stale_prefixed_entries(tmp_path):
+    a, b = make_pair(tmp_path)
+    known_b = {}
+    a.put("analysis:sh600001_default", {"content": "x"})
+    a.put("system_config", {"k": 1})
+    b.changed(known_b)
+    assert a.purge("analysis:", 3600) == 0
+    assert a.purge("analysis:", -1) == 1
+    assert a.get("system_config") == {"k": 1}
+    assert b.changed(known_b) == {"analysis:sh600001_default": (None, None, None)}
@@ -0,0 +1,75 @@
+import json
+
+from app.core.stock_entities import StockEntityIndex, name_aliases, normalize_code
+
+RECORDS = [
+    ("600519", "贵州茅台"),
+    ("000001", "平安银行"),
+    ("300059", "东方财富"),
+    ("sz002405", "*ST四维"),
+    ("830799", "艾融软件"),
+]
+
+
+def make_index(tmp_path):
+    index = StockEntityIndex(names_file=tmp_path / "stock_names.json")
+    index.build(RECORDS)
+    return index
+
+
+def test_normalize_code():
+    assert normalize_code("600519") == "sh600519"
+    assert normalize_code(" SZ000001 ") == "sz000001"
+    assert normalize_code("830799") == "bj830799"
+    assert normalize_code("12345") is None
+    assert normalize_code("700000") is None
+    assert normalize_code(None) is None
+
+
+def test_name_aliases_strip_prefix_and_suffix():
+    assert name_aliases("*ST四维") == {"*ST四维"}  # 简称不足 3 个字不收录
+    assert name_aliases("N 东方A") == {"N东方A"}
+    assert name_aliases("XD贵州茅") == {"XD贵州茅", "贵州茅"}
+
+
+def test_tag_names_and_codes_in_first_mention_order(tmp_path):
+    index = make_index(tmp_path)
+    text = "东方财富(300059)午后拉升，贵州茅台跟涨；*ST四维公告，000001 成交放量"
+    assert index.tag(text) == ["sz300059", "sh600519", "sz002405", "sz000001"]
+    assert index.tag("") == []
+    assert StockEntityIndex(names_file=tmp_path / "none.json").tag("贵州茅台") == []
+
+
+def test_tag_digit_boundary(tmp_path):
+    index = make_index(tmp_path)
+    # 金额 / 日期 / 更长数字中的 6 位片段不算提及
+    assert index.tag("成交额2600519元") == []
+    assert index.tag("订单编号6005190") == []
+    assert index.tag("20000012日") == []
+    # 前后为非数字 (含行首行尾、字母、标点) 时正常命中
+    assert index.tag("600519") == ["sh600519"]
+    assert index.tag("代码600519.SH") == ["sh600519"]
+    assert index.tag("sz000001涨停") == ["sz000001"]
+    # 同一段文本里一个被数字包住、一个独立出现
+    assert index.tag("1300059 与 300059") == ["sz300059"]
+
+
+def test_resolve_and_name_of(tmp_path):
+    index = make_index(tmp_path)
+    assert index.resolve("600519") == "sh600519"
+    # 代码不存在但名称能对上时按名称纠正
+    assert index.resolve("600518", "贵州茅台") == "sh600519"
+    assert index.resolve("600518", "不存在") is None
+    assert index.name_of("sz300059") == "东方财富"
+    assert "000001" in index and "600518" not in index
+    # 索引未建立时只做格式校验
+    assert StockEntityIndex(names_file=tmp_path / "none.json").resolve("600518") == "sh600518"
+
+
+def test_load_from_names_file(tmp_path):
+    path = tmp_path / "stock_names.json"
+    path.write_text(json.dumps({"sh600519": "贵州茅台"}, ensure_ascii=False), encoding="utf-8")
+    index = StockEntityIndex(names_file=path)
+    assert index.load()
+    assert index.tag("贵州茅台发布公告") == ["sh600519"]
+    assert StockEntityIndex(names_file=tmp_path / "missing.json").load() is False
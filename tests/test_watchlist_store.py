@@ -0,0 +1,145 @@
+from app.core.persistence import persistence
+from app.core.watchlist_store import WatchlistStore
+
+
+def make_store(tmp_path, items=()):
+    store = WatchlistStore(tmp_path / "watchlist.json")
+    # 注册名按文件名，丢弃上一个测试留下的脏标记
+    persistence.discard(store.name)
+    for item in items:
+        store.add(item, front=False)
+    return store
+
+
+def sort_key(item):
+    return item.get('initial_score', 0)
+
+
+def test_merge_applies_picks_and_keeps_added_time(tmp_path):
+    store = make_store(tmp_path, [{"code": "sh600001", "name": "A", "initial_score": 1, "added_time": "t0"}])
+    baseline = store.snapshot_map()
+
+    picks = [
+        {"code": "sh600001", "name": "A", "initial_score": 5},
+        {"code": "sz000002", "name": "B", "initial_score": 7},
+    ]
+    store.merge(picks, baseline, key=sort_key)
+
+    assert store.codes() == ["sz000002", "sh600001"]
+    assert store.get("sh600001") == {"code": "sh600001", "name": "A", "initial_score": 5, "added_time": "t0"}
+    # 存入的是副本，任务之后再改自己的对象不影响 store
+    picks[1]["initial_score"] = 0
+    assert store.get("sz000002")["initial_score"] == 7
+
+
+def test_merge_keeps_concurrent_changes(tmp_path):
+    store = make_store(tmp_path, [
+        {"code": "sh600001", "name": "A", "initial_score": 1},
+        {"code": "sh600002", "name": "B", "initial_score": 1},
+        {"code": "sh600003", "name": "C", "initial_score": 1},
+    ])
+    baseline = store.snapshot_map()
+
+    # 任务运行期间: 删除 A，手动修改 B，盘中扫描新增 D
+    store.remove("sh600001")
+    store.update("sh600002", strategy_type="Manual")
+    store.add({"code": "sh600004", "name": "D", "initial_score": 3})
+
+    picks = [
+        {"code": "sh600001", "name": "A", "initial_score": 9},
+        {"code": "sh600002", "name": "B", "initial_score": 9},
+        {"code": "sh600003", "name": "C", "initial_score": 9},
+    ]
+    store.merge(picks, baseline, key=sort_key)
+
+    assert "sh600001" not in store
+    assert store.get("sh600002") == {"code": "sh600002", "name": "B", "initial_score": 1, "strategy_type": "Manual"}
+    assert store.get("sh600003")["initial_score"] == 9
+    assert store.get("sh600004")["name"] == "D"
+
+
+def test_merge_result_is_next_baseline(tmp_path):
+    store = make_store(tmp_path, [{"code": "sh600001", "name": "A", "initial_score": 1}])
+    baseline = store.snapshot_map()
+
+    baseline = store.merge([{"code": "sh600001", "name": "A", "initial_score": 2}], baseline)
+    baseline = store.merge([{"code": "sh600001", "name": "A", "initial_score": 3, "pe": 10}], baseline)
+    assert store.get("sh600001") == {"code": "sh600001", "name": "A", "initial_score": 3, "pe": 10}
+
+
+def test_merge_marks_dirty_once(tmp_path):
+    store = make_store(tmp_path)
+    version = store.version
+    store.merge([{"code": "sh600001"}, {"code": "sh600001"}], {})
+    assert store.codes() == ["sh600001"]
+    assert store.version == version + 1
+    assert store.flush()
+
+
+def test_unsynced_changes_are_per_code(tmp_path):
+    store = make_store(tmp_path, [{"code": "sh600001"}, {"code": "sh600002"}])
+    version, changes, order = store.unsynced_changes()
+    assert changes == {"sh600001": {"code": "sh600001"}, "sh600002": {"code": "sh600002"}}
+    assert order == ["sh600001", "sh600002"]
+    store.mark_synced(version)
+    assert store.unsynced_changes() is None
+
+    store.update("sh600001", name="A")
+    store.remove("sh600002")
+    version, changes, order = store.unsynced_changes()
+    assert changes == {"sh600001": {"code": "sh600001", "name": "A"}, "sh600002": None}
+    assert order is None
+
+    # 发布期间的新修改保留到下一轮
+    store.update("sh600001", name="B")
+    store.mark_synced(version)
+    assert store.unsynced_changes()[1] == {"sh600001": {"code": "sh600001", "name": "B"}}
+
+
+def test_apply_shared_keeps_unpublished_local_changes(tmp_path):
+    store = make_store(tmp_path, [{"code": "sh600001"}, {"code": "sh600002"}])
+    store.mark_synced(store.unsynced_changes()[0])
+
+    store.add({"code": "sh600003", "name": "local"})
+    store.apply_shared(
+        {"sh600002": None, "sh600003": {"code": "sh600003", "name": "remote"}, "sh600004": {"code": "sh600004"}},
+        order=["sh600004", "sh600001"],
+    )
+
+    # 对方的删除 / 新增生效，本地尚未发布的 sh600003 与顺序不被覆盖
+    assert store.codes() == ["sh600003", "sh600001", "sh600004"]
+    assert store.get("sh600003")["name"] == "local"
+    _, changes, order = store.unsynced_changes()
+    assert changes == {"sh600003": {"code": "sh600003", "name": "local"}}
+    assert order == ["sh600003", "sh600001", "sh600004"]
+
+
+def test_apply_shared_order_when_no_local_changes(tmp_path):
+    store = make_store(tmp_path, [{"code": "sh600001"}, {"code": "sh600002"}])
+    store.mark_synced(store.unsynced_changes()[0])
+    store.apply_shared({}, order=["sh600002", "sh600001"])
+    assert store.codes() == ["sh600002", "sh600001"]
+    assert store.unsynced_changes() is None
+
+
+def test_apply_shared_reset_replaces_list(tmp_path):
+    store = make_store(tmp_path, [{"code": "sh600001"}, {"code": "sh600002"}])
+    store.mark_synced(store.unsynced_changes()[0])
+    store.add({"code": "sh600009"})
+
+    store.apply_shared({"sh600002": {"code": "sh600002", "name": "shared"}}, order=["sh600002"], reset=True)
+
+    assert store.codes() == ["sh600009", "sh600002"]
+    assert store.get("sh600002")["name"] == "shared"
+
+
+def test_persist_flag_controls_file_writes(tmp_path):
+    store = make_store(tmp_path)
+    store.persist = False
+    store.add({"code": "sh600001"})
+    assert not store.flush()
+    assert not (tmp_path / "watchlist.json").exists()
+
+    store.set_persist(True)
+    assert store.flush()
+    assert (tmp_path / "watchlist.json").exists()
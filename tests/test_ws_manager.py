@@ -0,0 +1,90 @@
+import asyncio
+
+from app.core.ws_manager import ConnectionManager
+
+
+class FakeWebSocket:
+    """可控的 WebSocket: gate 未打开前 send_text 一直挂起 (模拟慢客户端)"""
+
+    def __init__(self, blocked=False):
+        self.sent = []
+        self.closed = False
+        self.gate = asyncio.Event()
+        if not blocked:
+            self.gate.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message):
+        await self.gate.wait()
+        self.sent.append(message)
+
+    async def close(self):
+        self.closed = True
+
+
+async def settle(condition=None, timeout=1.0):
+    """让写协程运行；给定 condition 时等到其成立"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        await asyncio.sleep(0.001)
+        if condition is None or condition() or loop.time() > deadline:
+            return
+
+
+def test_drop_policy_keeps_newest_messages():
+    async def scenario():
+        manager = ConnectionManager(name="logs", overflow="drop", maxsize=3)
+        slow = FakeWebSocket(blocked=True)
+        await manager.connect(slow)
+        await manager.broadcast("m0")
+        await settle()  # 写协程取走 m0 后挂在 send_text 上
+        for i in range(1, 6):
+            assert await manager.broadcast(f"m{i}") == 1
+        assert manager.stats["dropped"] == 2
+        assert manager.metrics()["clients"][0]["queue_depth"] == 3
+
+        slow.gate.set()
+        await settle(lambda: len(slow.sent) == 4)
+        assert slow.sent == ["m0", "m3", "m4", "m5"]
+        assert slow in manager.clients
+        manager.disconnect(slow)
+
+    asyncio.run(scenario())
+
+
+def test_disconnect_policy_evicts_only_the_slow_client():
+    async def scenario():
+        manager = ConnectionManager(name="quotes", overflow="disconnect", maxsize=2)
+        slow, fast = FakeWebSocket(blocked=True), FakeWebSocket()
+        await manager.connect(slow)
+        await manager.connect(fast)
+        for i in range(4):
+            await manager.broadcast(f"q{i}")
+            await settle()
+        await settle(lambda: len(fast.sent) == 4)
+        assert slow not in manager.clients
+        assert fast in manager.clients
+        assert manager.stats["evicted"] == 1
+        assert slow.closed
+        assert fast.sent == ["q0", "q1", "q2", "q3"]
+        manager.disconnect(fast)
+
+    asyncio.run(scenario())
+
+
+def test_send_timeout_removes_dead_connection():
+    async def scenario():
+        manager = ConnectionManager(name="quotes", send_timeout=0.05)
+        dead = FakeWebSocket(blocked=True)
+        await manager.connect(dead)
+        manager.send(dead, "hello")
+        await asyncio.sleep(0.15)
+        assert dead not in manager.clients
+        assert dead.closed
+        assert manager.stats["failed"] == 1
+        assert manager.send(dead, "again") is False
+
+    asyncio.run(scenario())